@@ -1,20 +1,37 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Set, AsyncIterator
+import asyncio
 import logging
+import os
+import re
 from app.agent.llm_client import LLMClient
+from app.cache.enhancement_cache import EnhancementCache
 
 logger = logging.getLogger(__name__)
 
+# Word-sized chunks, each keeping its trailing whitespace
+CHUNK_RE = re.compile(r'\S+\s*|\s+')
+
 class AnswerFormatter:
     """
     Step 5: Format raw data into business-friendly answers
     
     Converts technical query results into clear, actionable insights
     Can use LLM to enhance answers with better business language
+    
+    LLM enhancement gets a latency budget (LLM_ENHANCE_TIMEOUT seconds, 0
+    for none). Past it the template answer is returned, and with an
+    enhancement cache the LLM call keeps running in the background so the
+    next identical answer is served enhanced (LLM_ENHANCE_BACKGROUND).
     """
     
-    def __init__(self):
-        """Initialize with LLM client for answer enhancement"""
-        self.llm_client = LLMClient()
+    def __init__(self, llm_client: Optional[LLMClient] = None,
+                 enhancement_cache: Optional[EnhancementCache] = None):
+        """Initialize with LLM client for answer enhancement and an optional cache of its answers"""
+        self.llm_client = llm_client or LLMClient()
+        self.enhancement_cache = enhancement_cache
+        self.enhance_timeout = float(os.getenv('LLM_ENHANCE_TIMEOUT', '3'))
+        self.finish_in_background = os.getenv('LLM_ENHANCE_BACKGROUND', 'true').lower() == 'true'
+        self._background: Set[asyncio.Task] = set()
     
     async def format(self, question: str, intent_result: Dict[str, Any], 
                raw_data: List[Dict], shopifyql: str) -> Dict[str, Any]:
@@ -26,12 +43,28 @@ class AnswerFormatter:
             intent_result: Classified intent
             raw_data: Raw query results
             shopifyql: The executed query
-            
+        
         Returns:
             Dict with 'answer' and 'confidence'
         """
+        result = self.build_answer(question, intent_result, raw_data)
+        
+        # Try to enhance answer with LLM if available
+        try:
+            data_summary = self._data_summary(intent_result, raw_data)
+            enhanced_answer = await self._enhance(result['answer'], question, data_summary)
+            if enhanced_answer != result['answer']:
+                result['answer'] = enhanced_answer
+                logger.info("Answer enhanced with LLM")
+        except Exception as e:
+            logger.debug(f"LLM enhancement skipped: {e}")
+            # Keep original answer if enhancement fails
+        
+        return result
+    
+    def build_answer(self, question: str, intent_result: Dict[str, Any], raw_data: List[Dict]) -> Dict[str, Any]:
+        """Template answer and confidence, before LLM enhancement"""
         category = intent_result['category']
-        metrics = intent_result.get('metrics', [])
         
         # Route to appropriate formatter
         if category == 'sales':
@@ -43,21 +76,108 @@ class AnswerFormatter:
         else:
             result = self._format_general_answer(question, intent_result, raw_data)
         
-        # Try to enhance answer with LLM if available
+        return result
+    
+    @staticmethod
+    def _data_summary(intent_result: Dict[str, Any], raw_data: List[Dict]) -> str:
+        return f"{len(raw_data)} rows, category: {intent_result['category']}, metrics: {intent_result.get('metrics', [])}"
+    
+    async def stream_answer(self, answer: str, question: str, intent_result: Dict[str, Any],
+                            raw_data: List[Dict]) -> AsyncIterator[str]:
+        """
+        Yield the answer in chunks as it becomes available
+        
+        Streams tokens when the LLM client offers stream_enhance_answer,
+        falling back to the template answer if the first token misses the
+        latency budget or the stream fails before it. A stream that fails
+        after its first token re-raises, since part of the answer was already
+        sent, and nothing is cached. Otherwise the cached or budgeted
+        enhanced answer, or the template answer, is sent in word-sized chunks.
+        """
+        data_summary = self._data_summary(intent_result, raw_data)
+        
+        cached = self.enhancement_cache.get(answer, question, data_summary) if self.enhancement_cache else None
+        stream = getattr(self.llm_client, 'stream_enhance_answer', None)
+        
+        if cached is None and stream is not None:
+            tokens = []
+            try:
+                async for token in self._stream_llm(stream(answer, question, data_summary)):
+                    tokens.append(token)
+                    yield token
+            except Exception as e:
+                if tokens:
+                    logger.warning(f"LLM enhancement stream failed after {len(tokens)} tokens: {e}")
+                    raise
+                logger.debug(f"LLM enhancement stream failed: {e}")
+            else:
+                if tokens:
+                    if self.enhancement_cache is not None:
+                        self.enhancement_cache.set(answer, question, data_summary, ''.join(tokens))
+                    return
+            enhanced = answer
+        elif cached is not None:
+            enhanced = cached
+        else:
+            try:
+                enhanced = await self._enhance(answer, question, data_summary)
+            except Exception as e:
+                logger.debug(f"LLM enhancement skipped: {e}")
+                enhanced = answer
+        
+        for chunk in CHUNK_RE.findall(enhanced):
+            yield chunk
+    
+    async def _stream_llm(self, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Relay an LLM token stream, giving up if the first token misses the latency budget"""
+        iterator = tokens.__aiter__()
+        timeout = self.enhance_timeout if self.enhance_timeout > 0 else None
+        
         try:
-            data_summary = f"{len(raw_data)} rows, category: {category}, metrics: {metrics}"
-            enhanced_answer = await self.llm_client.enhance_answer(
-                result['answer'], 
-                question, 
-                data_summary
-            )
-            result['answer'] = enhanced_answer
-            logger.info("Answer enhanced with LLM")
-        except Exception as e:
-            logger.debug(f"LLM enhancement skipped: {e}")
-            # Keep original answer if enhancement fails
+            first = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            logger.info(f"LLM enhancement stream missed the {self.enhance_timeout}s budget, using template answer")
+            return
         
-        return result
+        yield first
+        async for token in iterator:
+            yield token
+    
+    async def _enhance(self, answer: str, question: str, data_summary: str) -> str:
+        """Enhance an answer within the latency budget, or return it unchanged"""
+        if self.enhance_timeout <= 0:
+            return await self._call_llm(answer, question, data_summary)
+        
+        task = asyncio.ensure_future(self._call_llm(answer, question, data_summary))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=self.enhance_timeout)
+        except asyncio.TimeoutError:
+            if self.finish_in_background and self.enhancement_cache is not None:
+                # Let the call land in the cache for the next identical answer
+                self._background.add(task)
+                task.add_done_callback(self._background_done)
+                logger.info(f"LLM enhancement exceeded {self.enhance_timeout}s, finishing in background")
+            else:
+                task.cancel()
+                logger.info(f"LLM enhancement exceeded {self.enhance_timeout}s, using template answer")
+            return answer
+    
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Background LLM enhancement failed: {task.exception()}")
+    
+    async def _call_llm(self, answer: str, question: str, data_summary: str) -> str:
+        """Enhance an answer with the LLM, through the cache when one is configured"""
+        if self.enhancement_cache is None:
+            return await self.llm_client.enhance_answer(answer, question, data_summary)
+        
+        return await self.enhancement_cache.get_or_call(
+            answer, question, data_summary,
+            lambda: self.llm_client.enhance_answer(answer, question, data_summary)
+        )
     
     def _format_sales_answer(self, question: str, intent_result: Dict, raw_data: List[Dict]) -> Dict[str, Any]:
         """Format sales-related answers"""
@@ -134,17 +254,13 @@ class AnswerFormatter:
             product_name = entities[0] if entities else item.get('product_title', 'the product')
             
             total_sold = item.get('total_sold', 0)
-            avg_daily = item.get('avg_daily_sales', 0)
             
             time_period = intent_result.get('time_period', {})
             days = time_period.get('value', 30)
             
-            # Calculate recommendation
-            daily_rate = total_sold / days if days > 0 else 0
-            
-            # For future periods, project demand
-            future_days = 14  # 2-week buffer
-            recommended_qty = int(daily_rate * future_days * 1.2)  # 20% safety buffer
+            # Velocity and the 2-week buffer with a 20% safety margin, as projected by the forecast
+            daily_rate = item.get('avg_daily_sales', 0)
+            recommended_qty = item.get('reorder_quantity', 0)
             
             answer = f"Based on the last {days} days, {product_name} sold an average of {daily_rate:.1f} units per day (total: {total_sold} units).\n\n"
             answer += f"Recommendation: Order at least {recommended_qty} units to maintain a 2-week buffer. This accounts for your typical daily sales velocity and includes a 20% safety margin."
@@ -164,9 +280,9 @@ class AnswerFormatter:
                 product_name = item.get('product_title', 'Unknown')
                 current_stock = item.get('current_stock', 0)
                 avg_daily = item.get('avg_daily_sales', 0)
+                days_remaining = item.get('days_of_cover')
                 
-                if avg_daily > 0:
-                    days_remaining = current_stock / avg_daily
+                if days_remaining is not None:
                     if days_remaining <= 7:
                         at_risk.append({
                             'name': product_name,
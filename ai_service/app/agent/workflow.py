@@ -1,6 +1,7 @@
+import asyncio
 import logging
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 
 from app.models.query import QueryResponse, QueryMetadata, IntentDetails, PlanningDetails, ValidationDetails, DataQuality
 from app.agent.intent_classifier import IntentClassifier
@@ -8,6 +9,9 @@ from app.agent.query_generator import QueryGenerator
 from app.agent.validator import QueryValidator
 from app.agent.answer_formatter import AnswerFormatter
 from app.shopify.client import ShopifyClient
+from app.shopify.http_pool import ShopifyHTTPPool
+from app.cache.query_cache import QueryCache
+from app.cache.intent_cache import IntentCache
 
 logger = logging.getLogger(__name__)
 
@@ -19,27 +23,59 @@ class AgentWorkflow:
     3. Generate ShopifyQL
     4. Validate & execute
     5. Format answer
+    
+    The workflow holds no per-request state, so a single instance can be
+    created at startup and shared by every request. store_id/access_token
+    given here are only defaults for execute().
     """
     
-    def __init__(self, store_id: str, access_token: str):
+    def __init__(self, store_id: Optional[str] = None, access_token: Optional[str] = None,
+                 intent_classifier: Optional[IntentClassifier] = None,
+                 query_generator: Optional[QueryGenerator] = None,
+                 validator: Optional[QueryValidator] = None,
+                 answer_formatter: Optional[AnswerFormatter] = None,
+                 http_pool: Optional[ShopifyHTTPPool] = None,
+                 query_cache: Optional[QueryCache] = None,
+                 intent_cache: Optional[IntentCache] = None):
         self.store_id = store_id
         self.access_token = access_token
-        self.shopify_client = ShopifyClient(store_id, access_token)
+        self.http_pool = http_pool
+        self.query_cache = query_cache
+        self.intent_cache = intent_cache
+        
+        # Initialize workflow components once, shared across executions
+        self.intent_classifier = intent_classifier or IntentClassifier()
+        self.query_generator = query_generator or QueryGenerator()
+        self.validator = validator or QueryValidator()
+        self.answer_formatter = answer_formatter or AnswerFormatter()
+    
+    def _get_shopify_client(self, store_id: Optional[str], access_token: Optional[str]) -> ShopifyClient:
+        """Build the Shopify client for one execution"""
+        store_id = store_id or self.store_id
+        access_token = access_token or self.access_token
+        
+        if not store_id:
+            raise ValueError("store_id is required")
         
-        # Initialize workflow components
-        self.intent_classifier = IntentClassifier()
-        self.query_generator = QueryGenerator()
-        self.validator = QueryValidator()
-        self.answer_formatter = AnswerFormatter()
+        return ShopifyClient(store_id, access_token, http_pool=self.http_pool, query_cache=self.query_cache)
     
-    async def execute(self, question: str) -> QueryResponse:
-        """Execute the complete agentic workflow"""
+    async def execute(self, question: str, store_id: Optional[str] = None,
+                      access_token: Optional[str] = None) -> QueryResponse:
+        """
+        Execute the complete agentic workflow
+        
+        Args:
+            question: Natural language question
+            store_id: Store to query (defaults to the one given at construction)
+            access_token: Shopify access token for the store
+        """
         start_time = time.time()
+        shopify_client = self._get_shopify_client(store_id, access_token)
         
         try:
             # STEP 1: Classify Intent
             logger.info("Step 1: Classifying intent...")
-            intent_result = await self.intent_classifier.classify(question)
+            intent_result = await self._classify(question)
             logger.info(f"Intent classified as: {intent_result['category']}")
             
             # STEP 2: Plan Data Sources
@@ -47,20 +83,11 @@ class AgentWorkflow:
             planning = self._plan_data_sources(intent_result)
             logger.info(f"Data sources needed: {planning['data_sources']}")
             
-            # STEP 3: Generate ShopifyQL
-            logger.info("Step 3: Generating ShopifyQL...")
-            shopifyql = self.query_generator.generate(intent_result, planning)
-            logger.info(f"Generated query: {shopifyql[:100]}...")
-            
-            # STEP 4: Validate & Execute
-            logger.info("Step 4: Validating and executing query...")
-            validation_result = self.validator.validate(shopifyql)
-            
-            if not validation_result['passed']:
-                raise ValueError(f"Query validation failed: {validation_result.get('reason', 'Unknown error')}")
+            # STEP 3 & 4: Generate and validate ShopifyQL
+            shopifyql, validation_result = self._generate_query(intent_result, planning)
             
             # Execute query
-            raw_data = await self.shopify_client.execute_query(shopifyql, intent_result)
+            raw_data = await shopify_client.execute_query(shopifyql, intent_result, planning['data_sources'])
             logger.info(f"Query executed, returned {len(raw_data)} rows")
             
             # STEP 5: Format Answer
@@ -72,37 +99,197 @@ class AgentWorkflow:
                 shopifyql=shopifyql
             )
             
-            # Calculate processing time
-            processing_time_ms = int((time.time() - start_time) * 1000)
-            
-            # Build complete response
-            response = QueryResponse(
-                answer=answer_result['answer'],
-                confidence=answer_result['confidence'],
-                shopifyql=shopifyql,
-                intent=intent_result['category'],
-                used_data_sources=planning['data_sources'],
-                metadata=QueryMetadata(
-                    intent_details=IntentDetails(**intent_result),
-                    planning=PlanningDetails(**planning),
-                    validation=ValidationDetails(**validation_result),
-                    data_quality=DataQuality(
-                        rows_returned=len(raw_data),
-                        completeness=self._calculate_completeness(raw_data)
-                    ),
-                    time_period=intent_result.get('time_period'),
-                    entities=intent_result.get('entities', []),
-                    processing_time_ms=processing_time_ms
-                )
+            response = self._build_response(
+                intent_result, planning, shopifyql, validation_result, raw_data, answer_result, start_time
             )
             
-            logger.info(f"Workflow completed in {processing_time_ms}ms")
+            logger.info(f"Workflow completed in {response.metadata.processing_time_ms}ms")
             return response
             
         except Exception as e:
             logger.error(f"Workflow error: {str(e)}", exc_info=True)
             raise
     
+    async def execute_batch(self, questions: List[str], store_id: Optional[str] = None,
+                            access_token: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Answer several questions for one store from a shared data fetch
+        
+        All questions are classified and planned first, their data sources
+        are fetched once, and each question is answered from that snapshot.
+        A failing question does not fail the others.
+        
+        Args:
+            questions: Natural language questions
+            store_id: Store to query (defaults to the one given at construction)
+            access_token: Shopify access token for the store
+            
+        Returns:
+            Per question, a dict with 'question' and either 'response' or 'error'
+        """
+        start_time = time.time()
+        shopify_client = self._get_shopify_client(store_id, access_token)
+        results: List[Dict[str, Any]] = [{'question': question} for question in questions]
+        
+        # STEP 1: Classify every question concurrently
+        intents = await asyncio.gather(*[self._classify(q) for q in questions], return_exceptions=True)
+        
+        # STEP 2-4: Plan, generate and validate per question
+        prepared = []
+        for i, intent_result in enumerate(intents):
+            try:
+                if isinstance(intent_result, Exception):
+                    raise intent_result
+                planning = self._plan_data_sources(intent_result)
+                shopifyql, validation_result = self._generate_query(intent_result, planning)
+                prepared.append((i, intent_result, planning, shopifyql, validation_result))
+            except Exception as e:
+                results[i]['error'] = self._batch_error(e)
+        
+        # Execute every query against one fetch of the merged data sources
+        try:
+            rows_per_query = await shopify_client.execute_batch([
+                (shopifyql, intent_result, planning['data_sources'])
+                for _, intent_result, planning, shopifyql, _ in prepared
+            ])
+        except Exception as e:
+            rows_per_query = [e] * len(prepared)
+        
+        # STEP 5: Format answers concurrently
+        async def answer(item, raw_data):
+            i, intent_result, planning, shopifyql, validation_result = item
+            if isinstance(raw_data, Exception):
+                raise raw_data
+            answer_result = await self.answer_formatter.format(
+                question=questions[i],
+                intent_result=intent_result,
+                raw_data=raw_data,
+                shopifyql=shopifyql
+            )
+            return self._build_response(
+                intent_result, planning, shopifyql, validation_result, raw_data, answer_result, start_time
+            )
+        
+        responses = await asyncio.gather(
+            *[answer(item, rows) for item, rows in zip(prepared, rows_per_query)],
+            return_exceptions=True
+        )
+        for (i, *_), response in zip(prepared, responses):
+            if isinstance(response, Exception):
+                results[i]['error'] = self._batch_error(response)
+            else:
+                results[i]['response'] = response
+        
+        logger.info(f"Batch of {len(questions)} questions completed in {int((time.time() - start_time) * 1000)}ms")
+        return results
+    
+    @staticmethod
+    def _batch_error(error: Exception) -> str:
+        """Client-facing message for a failed batch question, as the single endpoint reports it"""
+        if isinstance(error, ValueError):
+            return str(error)
+        logger.error(f"Batch question error: {str(error)}", exc_info=error)
+        return "Internal server error"
+    
+    def _build_response(self, intent_result: Dict[str, Any], planning: Dict[str, Any], shopifyql: str,
+                        validation_result: Dict[str, Any], raw_data: List[Dict],
+                        answer_result: Dict[str, Any], start_time: float) -> QueryResponse:
+        """Assemble the QueryResponse for one answered question"""
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        
+        return QueryResponse(
+            answer=answer_result['answer'],
+            confidence=answer_result['confidence'],
+            shopifyql=shopifyql,
+            intent=intent_result['category'],
+            used_data_sources=planning['data_sources'],
+            metadata=QueryMetadata(
+                intent_details=IntentDetails(**intent_result),
+                planning=PlanningDetails(**planning),
+                validation=ValidationDetails(**validation_result),
+                data_quality=DataQuality(
+                    rows_returned=len(raw_data),
+                    completeness=self._calculate_completeness(raw_data)
+                ),
+                time_period=intent_result.get('time_period'),
+                entities=intent_result.get('entities', []),
+                processing_time_ms=processing_time_ms
+            )
+        )
+    
+    async def stream(self, question: str, store_id: Optional[str] = None,
+                     access_token: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Run the workflow, yielding (event, data) pairs as each step finishes
+        
+        Events are 'intent', 'shopifyql', 'data_quality', one 'token' per
+        answer chunk, and finally 'done' with the complete answer.
+        
+        Args:
+            question: Natural language question
+            store_id: Store to query (defaults to the one given at construction)
+            access_token: Shopify access token for the store
+        """
+        start_time = time.time()
+        shopify_client = self._get_shopify_client(store_id, access_token)
+        
+        intent_result = await self._classify(question)
+        yield 'intent', intent_result
+        
+        planning = self._plan_data_sources(intent_result)
+        shopifyql, validation_result = self._generate_query(intent_result, planning)
+        yield 'shopifyql', {'shopifyql': shopifyql, 'validation': validation_result}
+        
+        raw_data = await shopify_client.execute_query(shopifyql, intent_result, planning['data_sources'])
+        yield 'data_quality', {
+            'rows_returned': len(raw_data),
+            'completeness': self._calculate_completeness(raw_data)
+        }
+        
+        answer_result = self.answer_formatter.build_answer(question, intent_result, raw_data)
+        chunks = []
+        async for chunk in self.answer_formatter.stream_answer(answer_result['answer'], question, intent_result, raw_data):
+            chunks.append(chunk)
+            yield 'token', {'text': chunk}
+        
+        processing_time_ms = int((time.time() - start_time) * 1000)
+        logger.info(f"Streamed workflow completed in {processing_time_ms}ms")
+        yield 'done', {
+            'answer': ''.join(chunks),
+            'confidence': answer_result['confidence'],
+            'intent': intent_result['category'],
+            'used_data_sources': planning['data_sources'],
+            'processing_time_ms': processing_time_ms
+        }
+    
+    def _generate_query(self, intent_result: Dict[str, Any], planning: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Steps 3 & 4: Generate ShopifyQL and validate it before execution"""
+        logger.info("Step 3: Generating ShopifyQL...")
+        shopifyql = self.query_generator.generate(intent_result, planning)
+        logger.info(f"Generated query: {shopifyql[:100]}...")
+        
+        logger.info("Step 4: Validating and executing query...")
+        validation_result = self.validator.validate(shopifyql)
+        
+        if not validation_result['passed']:
+            raise ValueError(f"Query validation failed: {validation_result.get('reason', 'Unknown error')}")
+        
+        return shopifyql, validation_result
+    
+    async def _classify(self, question: str) -> Dict[str, Any]:
+        """Step 1: Classify the question, reusing the intent of an equivalent question"""
+        if self.intent_cache is not None:
+            intent_result = self.intent_cache.get(question)
+            if intent_result is not None:
+                logger.info("Intent served from cache")
+                return intent_result
+        
+        intent_result = await self.intent_classifier.classify(question)
+        
+        if self.intent_cache is not None:
+            self.intent_cache.set(question, intent_result)
+        return intent_result
+    
     def _plan_data_sources(self, intent_result: Dict[str, Any]) -> Dict[str, Any]:
         """
         Step 2: Determine which Shopify data sources are needed
@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+class CacheBackend:
+    """
+    Shared cache behind the in-process caches
+    
+    Lets several AI service workers reuse each other's results. Values
+    must be JSON-serializable. Backend failures are logged and treated as
+    misses so a cache outage never fails a query.
+    """
+    
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+    
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+    
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+    
+    async def delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError
+    
+    async def aclose(self) -> None:
+        pass
+
+class RedisCacheBackend(CacheBackend):
+    """
+    CacheBackend on Redis, requires the optional `redis` package
+    
+    Args:
+        url: Redis connection URL
+        prefix: Namespace prepended to every key
+    """
+    
+    def __init__(self, url: str, prefix: str = 'shopify-ai:'):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("RedisCacheBackend requires the 'redis' package")
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+    
+    @classmethod
+    def from_env(cls) -> Optional['RedisCacheBackend']:
+        """Backend for CACHE_REDIS_URL, or None when unset or redis is not installed"""
+        url = os.getenv('CACHE_REDIS_URL')
+        if not url:
+            return None
+        if not REDIS_AVAILABLE:
+            logger.warning("CACHE_REDIS_URL is set but the redis package is not installed")
+            return None
+        return cls(url)
+    
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self._redis.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache get failed: {e}")
+            return None
+        return None if raw is None else json.loads(raw)
+    
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        try:
+            await self._redis.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Redis cache set failed: {e}")
+    
+    async def delete(self, key: str) -> None:
+        try:
+            await self._redis.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache delete failed: {e}")
+    
+    async def delete_prefix(self, prefix: str) -> None:
+        try:
+            keys = [key async for key in self._redis.scan_iter(match=self.prefix + prefix + '*')]
+            if keys:
+                await self._redis.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Redis cache delete by prefix failed: {e}")
+    
+    async def aclose(self) -> None:
+        await self._redis.aclose()
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.cache.ttl_cache import TTLCache
+from app.cache.single_flight import SingleFlight
+
+class EnhancementCache:
+    """
+    Cache of LLM-enhanced answers keyed by (template answer, question, data summary)
+    
+    Repeated answers are served from a TTLCache, and concurrent requests
+    for the same enhancement share a single LLM call. Failed calls are not
+    cached, so the next request tries the LLM again.
+    
+    Args:
+        max_size: Maximum enhanced answers kept
+        ttl: Seconds an enhanced answer is reused
+    """
+    
+    def __init__(self, max_size: int = 2000, ttl: float = 3600.0):
+        self.cache = TTLCache(max_size=max_size, default_ttl=ttl)
+        self.single_flight = SingleFlight()
+    
+    @classmethod
+    def from_env(cls) -> 'EnhancementCache':
+        return cls(
+            max_size=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '2000')),
+            ttl=float(os.getenv('LLM_CACHE_TTL', '3600'))
+        )
+    
+    @staticmethod
+    def make_key(answer: str, question: str, data_summary: str) -> str:
+        payload = json.dumps([answer, question.strip(), data_summary])
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def get(self, answer: str, question: str, data_summary: str) -> Optional[str]:
+        """Cached enhanced answer, or None"""
+        return self.cache.get(self.make_key(answer, question, data_summary))
+    
+    def set(self, answer: str, question: str, data_summary: str, enhanced: str) -> None:
+        self.cache.set(self.make_key(answer, question, data_summary), enhanced)
+    
+    async def get_or_call(self, answer: str, question: str, data_summary: str,
+                          enhance: Callable[[], Awaitable[str]]) -> str:
+        """
+        Return the cached enhancement or run enhance() once for all concurrent callers
+        
+        Args:
+            answer: Template answer being enhanced
+            question: Original user question
+            data_summary: Summary passed to the LLM
+            enhance: Coroutine function making the LLM call
+        """
+        key = self.make_key(answer, question, data_summary)
+        enhanced = self.cache.get(key)
+        if enhanced is not None:
+            return enhanced
+        
+        async def call() -> str:
+            result = await enhance()
+            self.cache.set(key, result)
+            return result
+        
+        return await self.single_flight.do(key, call)
+    
+    def stats(self) -> Dict[str, Any]:
+        flights = self.single_flight.stats()
+        return {
+            **self.cache.stats(),
+            'llm_calls': flights['calls'],
+            'in_flight_shared': flights['shared'],
+            'calls_saved': self.cache.hits + flights['shared']
+        }
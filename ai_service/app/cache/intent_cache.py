@@ -0,0 +1,165 @@
+import copy
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.cache.ttl_cache import TTLCache
+
+NUMBER_WORDS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6',
+    'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10', 'eleven': '11', 'twelve': '12',
+    'fifteen': '15', 'twenty': '20', 'thirty': '30', 'fifty': '50', 'hundred': '100'
+}
+
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+SLOT_RE = re.compile(
+    r'\d{4}-\d{2}-\d{2}|\d+(?:\.\d+)?|\b(?:' + '|'.join(NUMBER_WORDS) + r')\b'
+)
+PUNCTUATION_RE = re.compile(r"[^\w#]+")
+
+# Days implied by period words, which put numbers in an intent without a slot
+PERIOD_DAYS = {'today': 1, 'yesterday': 1, 'week': 7, 'fortnight': 14, 'month': 30, 'quarter': 90, 'year': 365}
+
+# Units the classifier converts to days, so a number before one never reaches the intent unchanged
+UNIT_WORDS = {'week', 'weeks', 'fortnight', 'fortnights', 'month', 'months', 'quarter', 'quarters', 'year', 'years'}
+
+# Mark number and date slots in a normalized question
+SLOT = '#'
+DATE_SLOT = '#date'
+
+def normalize_question(question: str) -> Tuple[str, List[str]]:
+    """
+    Canonical form of a question and the slot values taken out of it
+    
+    Lowercases, turns number words into digits, replaces every number and
+    ISO date with a slot marker and collapses punctuation and whitespace,
+    so "Top 5 products, last week?" becomes ("top # products last week", ['5']).
+    """
+    slots = []
+    
+    def take_slot(match: 're.Match') -> str:
+        value = NUMBER_WORDS.get(match.group(0), match.group(0))
+        slots.append(value)
+        return f' {DATE_SLOT if DATE_RE.match(value) else SLOT} '
+    
+    text = SLOT_RE.sub(take_slot, question.lower().replace(SLOT, ' '))
+    text = ' '.join(PUNCTUATION_RE.sub(' ', text).split())
+    return text, slots
+
+def _find_slot_paths(value: Any, slots: List[str], path: Tuple = ()) -> List[Tuple[Tuple, int]]:
+    """(path, slot index) of every intent leaf that carries a slot value"""
+    found = []
+    if isinstance(value, dict):
+        for key, item in value.items():
+            found.extend(_find_slot_paths(item, slots, path + (key,)))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            found.extend(_find_slot_paths(item, slots, path + (i,)))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        found.extend(
+            (path, i) for i, slot in enumerate(slots)
+            if not DATE_RE.match(slot) and float(slot) == value
+        )
+    elif isinstance(value, str):
+        found.extend(
+            (path, i) for i, slot in enumerate(slots)
+            if re.search(rf'(?<![\w.-]){re.escape(slot)}(?![\w.-])', value)
+        )
+    return found
+
+def _implied_numbers(template: str) -> List[float]:
+    """Numbers the period words of a normalized question stand for"""
+    words = template.split()
+    return [
+        float(PERIOD_DAYS[word]) for word in words + [w[:-1] for w in words if w.endswith('s')]
+        if word in PERIOD_DAYS
+    ]
+
+def _slots_before_units(template: str) -> List[int]:
+    """Indices of the slots directly followed by a unit word in a normalized question"""
+    words = template.split()
+    slot_words = [i for i, word in enumerate(words) if word in (SLOT, DATE_SLOT)]
+    return [
+        n for n, i in enumerate(slot_words)
+        if i + 1 < len(words) and words[i + 1] in UNIT_WORDS
+    ]
+
+def _replace_at(intent: Any, path: Tuple, old: str, new: str) -> None:
+    parent = intent
+    for key in path[:-1]:
+        parent = parent[key]
+    value = parent[path[-1]]
+    
+    if isinstance(value, str):
+        parent[path[-1]] = re.sub(rf'(?<![\w.-]){re.escape(old)}(?![\w.-])', new, value)
+    elif isinstance(value, int) and new.isdigit():
+        parent[path[-1]] = int(new)
+    else:
+        parent[path[-1]] = float(new)
+
+class IntentCache:
+    """
+    Cache of classified intents keyed by normalized question
+    
+    Equivalent questions ("Top 5 products last week?" and "top five
+    products, last week") share an entry. Questions that differ only in a
+    number or date reuse the entry too: the intent fields that carried
+    the cached question's slot values are rewritten with the new ones.
+    When the same value fills several slots, a slot value fills several
+    fields, a field's value could also come from a period word such as
+    "week", or a slot reached the intent converted ("2 weeks" as 14 days)
+    or not at all, the mapping is ambiguous, and the entry only serves
+    questions with identical slot values.
+    
+    Args:
+        max_size: Maximum number of questions kept, least recently used evicted
+        ttl: Seconds before an intent is classified again
+    """
+    
+    def __init__(self, max_size: int = 5000, ttl: float = 3600.0):
+        self.cache = TTLCache(max_size=max_size, default_ttl=ttl)
+    
+    @classmethod
+    def from_env(cls) -> 'IntentCache':
+        return cls(
+            max_size=int(os.getenv('INTENT_CACHE_MAX_ENTRIES', '5000')),
+            ttl=float(os.getenv('INTENT_CACHE_TTL', '3600'))
+        )
+    
+    def get(self, question: str) -> Optional[Dict[str, Any]]:
+        """Intent for an equivalent question, or None on a miss"""
+        template, slots = normalize_question(question)
+        
+        entry = self.cache.get(template)
+        if entry is None or (entry['exact'] and entry['slots'] != slots):
+            return None
+        
+        intent = copy.deepcopy(entry['intent'])
+        for path, i in entry['paths']:
+            _replace_at(intent, path, entry['slots'][i], slots[i])
+        return intent
+    
+    def set(self, question: str, intent_result: Dict[str, Any]) -> None:
+        template, slots = normalize_question(question)
+        intent = copy.deepcopy(intent_result)
+        
+        paths = _find_slot_paths(intent, slots)
+        implied = _implied_numbers(template)
+        ambiguous = (
+            len(set(slots)) < len(slots)
+            or len({path for path, _ in paths}) < len(paths)
+            or len({i for _, i in paths}) < len(paths)
+            or any(not DATE_RE.match(slots[i]) and float(slots[i]) in implied for _, i in paths)
+            or len({i for _, i in paths}) < len(slots)
+            or bool(_slots_before_units(template))
+        )
+        
+        self.cache.set(template, {
+            'intent': intent,
+            'slots': slots,
+            'paths': [] if ambiguous else paths,
+            'exact': ambiguous
+        })
+    
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
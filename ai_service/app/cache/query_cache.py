@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.cache.ttl_cache import TTLCache
+from app.cache.backends import CacheBackend, RedisCacheBackend
+
+logger = logging.getLogger(__name__)
+
+# Seconds a result stays fresh per intent category: stock moves quickly,
+# historical sales barely change
+DEFAULT_TTLS = {
+    'inventory': 60,
+    'customers': 600,
+    'sales': 1800,
+    'general': 300
+}
+
+STRING_LITERAL_RE = re.compile(r"('(?:[^']|'')*')")
+WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_shopifyql(shopifyql: str) -> str:
+    """Lowercase and collapse whitespace outside string literals"""
+    parts = STRING_LITERAL_RE.split((shopifyql or '').strip().rstrip(';'))
+    return ''.join(
+        part if i % 2 else WHITESPACE_RE.sub(' ', part.lower())
+        for i, part in enumerate(parts)
+    ).strip()
+
+class QueryCache:
+    """
+    Cache of query results keyed by store, normalized ShopifyQL and time bucket
+    
+    Results live in an in-process TTLCache and, when configured, a shared
+    CacheBackend so other workers can reuse them. The time bucket is the
+    current wall-clock time divided by the category TTL, so relative
+    windows such as "last 7 days" roll over at most one TTL late.
+    
+    Args:
+        max_size: Maximum results kept in process
+        ttls: Seconds per intent category, see DEFAULT_TTLS
+        backend: Optional shared cache
+        clock: Wall-clock time source for buckets
+    """
+    
+    def __init__(self, max_size: int = 1000, ttls: Optional[Dict[str, float]] = None,
+                 backend: Optional[CacheBackend] = None, clock: Callable[[], float] = time.time):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.local = TTLCache(max_size=max_size, default_ttl=self.ttls['general'])
+        self.backend = backend
+        self.clock = clock
+        self.backend_hits = 0
+    
+    @classmethod
+    def from_env(cls) -> 'QueryCache':
+        ttls = {
+            category: float(os.getenv(f'QUERY_CACHE_TTL_{category.upper()}', str(ttl)))
+            for category, ttl in DEFAULT_TTLS.items()
+        }
+        return cls(
+            max_size=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', '1000')),
+            ttls=ttls,
+            backend=RedisCacheBackend.from_env()
+        )
+    
+    def ttl_for(self, category: str) -> float:
+        return self.ttls.get(category, self.ttls['general'])
+    
+    def make_key(self, store_id: str, shopifyql: str, intent_result: Dict[str, Any]) -> Optional[str]:
+        """Cache key for a query, or None when its category is not cached"""
+        category = intent_result.get('category', 'general')
+        ttl = self.ttl_for(category)
+        if ttl <= 0:
+            return None
+        
+        # Mock mode and the dedicated analytics routes answer from the
+        # intent rather than the query text, so both are part of the key
+        intent = {
+            'category': category,
+            'metrics': sorted(intent_result.get('metrics') or []),
+            'entities': sorted(e.lower() for e in intent_result.get('entities') or []),
+            'time_period': intent_result.get('time_period') or {}
+        }
+        payload = json.dumps([normalize_shopifyql(shopifyql), intent], sort_keys=True)
+        digest = hashlib.sha256(payload.encode()).hexdigest()
+        bucket = int(self.clock() // ttl)
+        
+        return f"query:{store_id}:{category}:{bucket}:{digest}"
+    
+    async def get(self, store_id: str, shopifyql: str, intent_result: Dict[str, Any]) -> Optional[List[Dict]]:
+        """Cached result rows, or None on a miss"""
+        key = self.make_key(store_id, shopifyql, intent_result)
+        if key is None:
+            return None
+        
+        rows = self.local.get(key)
+        if rows is None and self.backend is not None:
+            rows = await self.backend.get(key)
+            if rows is not None:
+                self.backend_hits += 1
+                self.local.set(key, rows, self.ttl_for(intent_result.get('category', 'general')))
+        
+        # Callers get their own row dicts so they cannot alter the cached copy
+        return None if rows is None else [dict(row) for row in rows]
+    
+    async def set(self, store_id: str, shopifyql: str, intent_result: Dict[str, Any], rows: List[Dict]) -> None:
+        key = self.make_key(store_id, shopifyql, intent_result)
+        if key is None:
+            return
+        
+        ttl = self.ttl_for(intent_result.get('category', 'general'))
+        rows = [dict(row) for row in rows]
+        self.local.set(key, rows, ttl)
+        if self.backend is not None:
+            await self.backend.set(key, rows, ttl)
+    
+    async def invalidate(self, store_id: str, categories: Optional[Iterable[str]] = None) -> int:
+        """
+        Drop a store's cached results after its data changed
+        
+        Args:
+            store_id: Store whose results are stale
+            categories: Intent categories affected, None for all of them
+        
+        Returns:
+            Number of in-process entries dropped
+        """
+        prefixes = [f"query:{store_id}:"] if categories is None else [
+            f"query:{store_id}:{category}:" for category in categories
+        ]
+        
+        dropped = 0
+        for prefix in prefixes:
+            dropped += self.local.delete_prefix(prefix)
+            if self.backend is not None:
+                await self.backend.delete_prefix(prefix)
+        
+        logger.info(f"Invalidated {dropped} cached results for {store_id}")
+        return dropped
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.local.stats(),
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'backend_hits': self.backend_hits,
+            'ttls': dict(self.ttls)
+        }
+    
+    async def aclose(self) -> None:
+        if self.backend is not None:
+            await self.backend.aclose()
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries also expire after a TTL
+    
+    Lookups move an entry to the most recently used end; inserting past
+    max_size evicts from the least recently used end. Expired entries are
+    dropped when they are next looked up.
+    
+    Args:
+        max_size: Maximum number of entries kept
+        default_ttl: Seconds an entry lives when set() is not given a ttl
+        clock: Monotonic time source, overridable in tests
+    """
+    
+    def __init__(self, max_size: int = 1000, default_ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value for ttl seconds (default_ttl when None)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every string key starting with prefix, returning how many"""
+        with self._lock:
+            keys = [key for key in self._entries if isinstance(key, str) and key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the /metrics endpoint"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
@@ -1,11 +1,23 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Any, AsyncIterator
+import json
 import os
 import logging
 
 from app.models.query import QueryRequest, QueryResponse
+from app.models.batch import BatchQueryRequest, BatchQueryResponse, BatchQueryResult
 from app.agent.workflow import AgentWorkflow
+from app.shopify.http_pool import ShopifyHTTPPool
+from app.shopify.client import ShopifyClient
+from app.shopify.webhooks import WEBHOOK_TOPICS, verify_webhook
+from app.cache.query_cache import QueryCache
+from app.cache.intent_cache import IntentCache
+from app.cache.enhancement_cache import EnhancementCache
+from app.agent.answer_formatter import AnswerFormatter
 
 logging.basicConfig(
     level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO')),
@@ -13,7 +25,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Shopify Analytics AI Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Persistent connections to Shopify, shared by every request
+    app.state.http_pool = ShopifyHTTPPool.from_env()
+    app.state.query_cache = QueryCache.from_env()
+    app.state.intent_cache = IntentCache.from_env()
+    app.state.enhancement_cache = EnhancementCache.from_env()
+    
+    # Workflow components are stateless, build them once for all requests
+    app.state.workflow = AgentWorkflow(
+        http_pool=app.state.http_pool,
+        query_cache=app.state.query_cache,
+        intent_cache=app.state.intent_cache,
+        answer_formatter=AnswerFormatter(enhancement_cache=app.state.enhancement_cache)
+    )
+    logger.info("Agent workflow initialized")
+    yield
+    await app.state.http_pool.aclose()
+    await app.state.query_cache.aclose()
+
+app = FastAPI(title="Shopify Analytics AI Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,19 +64,30 @@ async def health():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+@app.get("/metrics")
+async def metrics(http_request: Request):
+    return {
+        "http_pool": http_request.app.state.http_pool.stats(),
+        "query_cache": http_request.app.state.query_cache.stats(),
+        "intent_cache": http_request.app.state.intent_cache.stats(),
+        "llm_enhancement": http_request.app.state.enhancement_cache.stats()
+    }
+
+def get_workflow(http_request: Request) -> AgentWorkflow:
+    return http_request.app.state.workflow
+
 @app.post("/agent/query", response_model=QueryResponse)
-async def query(request: QueryRequest):
+async def query(request: QueryRequest, workflow: AgentWorkflow = Depends(get_workflow)):
     try:
         logger.info(f"Processing query for store: {request.store_id}")
         logger.info(f"Question: {request.question}")
         
-        workflow = AgentWorkflow(
+        result = await workflow.execute(
+            request.question,
             store_id=request.store_id,
             access_token=request.access_token
         )
         
-        result = await workflow.execute(request.question)
-        
         logger.info(f"Query completed with confidence: {result.confidence}")
         return result
         
@@ -55,6 +98,102 @@ async def query(request: QueryRequest):
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/agent/query/batch", response_model=BatchQueryResponse)
+async def query_batch(request: BatchQueryRequest, workflow: AgentWorkflow = Depends(get_workflow)):
+    """Answer several questions for one store from a single fetch of their data"""
+    max_questions = int(os.getenv('BATCH_MAX_QUESTIONS', '20'))
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="questions must not be empty")
+    if len(request.questions) > max_questions:
+        raise HTTPException(status_code=400, detail=f"At most {max_questions} questions per batch")
+    
+    try:
+        logger.info(f"Processing batch of {len(request.questions)} questions for store: {request.store_id}")
+        start_time = datetime.utcnow()
+        
+        results = await workflow.execute_batch(
+            request.questions,
+            store_id=request.store_id,
+            access_token=request.access_token
+        )
+        
+        used_data_sources = sorted({
+            source
+            for result in results if result.get('response') is not None
+            for source in result['response'].used_data_sources
+        })
+        return BatchQueryResponse(
+            results=[BatchQueryResult(**result) for result in results],
+            used_data_sources=used_data_sources,
+            processing_time_ms=int((datetime.utcnow() - start_time).total_seconds() * 1000)
+        )
+        
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def sse_event(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/agent/query/stream")
+async def query_stream(request: QueryRequest, workflow: AgentWorkflow = Depends(get_workflow)):
+    """Same as /agent/query, streamed as Server-Sent Events while each step finishes"""
+    logger.info(f"Streaming query for store: {request.store_id}")
+    logger.info(f"Question: {request.question}")
+    
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event, data in workflow.stream(
+                request.question,
+                store_id=request.store_id,
+                access_token=request.access_token
+            ):
+                yield sse_event(event, data)
+        except ValueError as e:
+            logger.error(f"Validation error: {str(e)}")
+            yield sse_event('error', {'status_code': 400, 'detail': str(e)})
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+            yield sse_event('error', {'status_code': 500, 'detail': "Internal server error"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/webhooks/{resource}/{event}")
+async def shopify_webhook(resource: str, event: str, http_request: Request):
+    """Apply a Shopify webhook to the shop's local data and drop its stale cached results"""
+    topic = f"{resource}/{event}"
+    if topic not in WEBHOOK_TOPICS:
+        raise HTTPException(status_code=404, detail=f"Unsupported webhook topic: {topic}")
+    
+    body = await http_request.body()
+    if not verify_webhook(body, http_request.headers.get('X-Shopify-Hmac-Sha256'),
+                          os.getenv('SHOPIFY_API_SECRET', '')):
+        logger.warning(f"Rejected {topic} webhook with an invalid signature")
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    
+    shop = http_request.headers.get('X-Shopify-Shop-Domain')
+    if not shop:
+        raise HTTPException(status_code=400, detail="Missing X-Shopify-Shop-Domain header")
+    
+    try:
+        client = ShopifyClient(shop, '', http_pool=http_request.app.state.http_pool)
+        applied = await client.apply_webhook(topic, json.loads(body))
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(f"Malformed {topic} webhook from {shop}: {str(e)}")
+        raise HTTPException(status_code=400, detail="Malformed webhook payload")
+    
+    await http_request.app.state.query_cache.invalidate(shop, WEBHOOK_TOPICS[topic])
+    logger.info(f"Processed {topic} webhook for {shop}")
+    return {"status": "ok", "topic": topic, "applied": applied}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,21 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.models.query import QueryResponse
+
+class BatchQueryRequest(BaseModel):
+    """Several questions for one store, answered from a shared data fetch"""
+    store_id: str
+    access_token: Optional[str] = None
+    questions: List[str]
+
+class BatchQueryResult(BaseModel):
+    """Answer to one question of a batch, or why it failed"""
+    question: str
+    response: Optional[QueryResponse] = None
+    error: Optional[str] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryResult]
+    used_data_sources: List[str]
+    processing_time_ms: int
@@ -0,0 +1,133 @@
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Dict, Optional, Tuple
+
+from app.shopify.order_store import OrderStore, to_epoch, NULL_ID
+from app.shopify.forecast import InventoryForecast
+from app.shopify.rollups import SECONDS_PER_DAY
+
+class ShopAnalytics:
+    """
+    Analytics queries over a shop's data
+    
+    Orders live in a columnar OrderStore; inventory, products and customers
+    are small lists of dicts. Used for both the mock dataset and data
+    fetched from Shopify in real mode.
+    
+    Product, customer and daily sales totals are read from the store's
+    daily rollups, so longer windows do not mean scanning more line items.
+    """
+    
+    def __init__(self, orders: OrderStore, inventory: Optional[List[Dict]] = None,
+                 customers: Optional[List[Dict]] = None, products: Optional[List[Dict]] = None):
+        self.orders = orders
+        self.inventory = inventory or []
+        self.customers = customers or []
+        self.products = products or []
+    
+    def _rollups(self, days: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """(day, rollup) pairs covering the last `days` days"""
+        return self.orders.rollups().window(to_epoch(datetime.utcnow() - timedelta(days=days)))
+    
+    def get_top_products(self, time_period: Dict, entities: List[str]) -> List[Dict]:
+        """Get top selling products"""
+        days = time_period.get('value', 7) if time_period else 7
+        title_codes = self.orders.titles.codes_containing(entities) if entities else None
+        
+        # Aggregate by product
+        product_sales = {}
+        for _, rollup in self._rollups(days):
+            for (pid, title_code), (quantity, revenue) in rollup['products'].items():
+                if title_codes is not None and title_code not in title_codes:
+                    continue
+                sales = product_sales.get(pid)
+                if sales is None:
+                    sales = product_sales[pid] = {
+                        'product_id': None if pid == NULL_ID else pid,
+                        'product_title': self.orders.titles.decode(title_code),
+                        'total_sold': 0,
+                        'revenue': 0
+                    }
+                sales['total_sold'] += quantity
+                sales['revenue'] += revenue
+        
+        # Top 5 by quantity sold, without sorting every product
+        return heapq.nlargest(5, product_sales.values(), key=lambda x: x['total_sold'])
+    
+    def _forecast(self) -> InventoryForecast:
+        return InventoryForecast(self.orders, self.inventory)
+    
+    def get_sales_velocity(self, time_period: Dict, entities: List[str]) -> List[Dict]:
+        """Get sales velocity, days of cover and reorder quantity per product"""
+        days = time_period.get('value', 30) if time_period else 30
+        title_codes = self.orders.titles.codes_containing(entities) if entities else None
+        
+        return self._forecast().project(days, title_codes)
+    
+    def get_stockout_risks(self, time_period: Dict) -> List[Dict]:
+        """Identify products at risk of stockout within a week at last week's sales velocity"""
+        at_risk = self._forecast().project(7, max_days_of_cover=7)
+        return sorted(at_risk, key=lambda x: x['days_of_cover'])
+    
+    def _aggregate_customers(self, days: int) -> List[Dict]:
+        """Order count and spend per customer over the last `days` days"""
+        orders = self.orders
+        
+        customer_orders = {}
+        for _, rollup in self._rollups(days):
+            for cid, (line_items, spent, email_code, name_code) in rollup['customers'].items():
+                customer = customer_orders.get(cid)
+                if customer is None:
+                    customer = customer_orders[cid] = {
+                        'customer_id': None if cid == NULL_ID else cid,
+                        'customer_email': orders.emails.decode(email_code),
+                        'customer_name': orders.names.decode(name_code),
+                        'order_count': 0,
+                        'total_spent': 0
+                    }
+                customer['order_count'] += line_items
+                customer['total_spent'] += spent
+        
+        return list(customer_orders.values())
+    
+    def get_repeat_customers(self, time_period: Dict) -> List[Dict]:
+        """Get customers with repeat orders"""
+        days = time_period.get('value', 90) if time_period else 90
+        
+        # Filter for repeat customers only (>1 order)
+        repeat = [c for c in self._aggregate_customers(days) if c['order_count'] > 1]
+        
+        return sorted(repeat, key=lambda x: x['order_count'], reverse=True)
+    
+    def get_sales_summary(self, time_period: Dict) -> List[Dict]:
+        """Get overall sales summary"""
+        days = time_period.get('value', 7) if time_period else 7
+        
+        # One rollup per UTC day, converted to a date once per day
+        daily_sales = []
+        for day, rollup in self._rollups(days):
+            if not rollup['line_items']:
+                continue
+            date = datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc).date()
+            daily_sales.append({
+                'date': date.isoformat(),
+                'order_count': rollup['line_items'],
+                'total_revenue': rollup['revenue']
+            })
+        
+        return sorted(daily_sales, key=lambda x: x['date'], reverse=True)
+    
+    def get_inventory_levels(self, entities: List[str]) -> List[Dict]:
+        """Get current inventory levels"""
+        if entities:
+            return [
+                dict(i) for i in self.inventory
+                if any(entity.lower() in i['product_title'].lower() for entity in entities)
+            ]
+        return [dict(i) for i in self.inventory]
+    
+    def get_top_customers(self, time_period: Dict) -> List[Dict]:
+        """Get top customers by spending"""
+        days = time_period.get('value', 30) if time_period else 30
+        
+        return heapq.nlargest(10, self._aggregate_customers(days), key=lambda x: x['total_spent'])
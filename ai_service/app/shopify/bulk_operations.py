@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RUN_BULK_QUERY_MUTATION = """
+mutation bulkOperationRunQuery($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+CURRENT_BULK_OPERATION_QUERY = """
+query {
+  currentBulkOperation {
+    id
+    status
+    errorCode
+    objectCount
+    url
+  }
+}
+"""
+
+ORDERS_BULK_QUERY = """
+{
+  orders(query: "created_at:>='%s'") {
+    edges {
+      node {
+        id
+        createdAt
+        customer { id email firstName lastName }
+        lineItems {
+          edges {
+            node {
+              id
+              title
+              quantity
+              product { id }
+              originalUnitPriceSet { shopMoney { amount } }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+FINISHED_STATUSES = {'COMPLETED', 'FAILED', 'CANCELED', 'EXPIRED'}
+
+class BulkOperationError(Exception):
+    """Raised when a bulk operation cannot be started or does not complete"""
+
+def build_orders_bulk_query(created_at_min: str) -> str:
+    """Bulk query selecting orders and their line items created since a date"""
+    return ORDERS_BULK_QUERY % created_at_min.replace("'", '')
+
+def gid_to_id(gid: Optional[str]) -> Optional[int]:
+    """Convert 'gid://shopify/Order/123' to the numeric REST id"""
+    if not gid:
+        return None
+    try:
+        return int(gid.rsplit('/', 1)[-1])
+    except ValueError:
+        return None
+
+def _to_rest_order(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Reshape a GraphQL order node like a REST order without line items"""
+    customer = node.get('customer') or {}
+    return {
+        'id': gid_to_id(node['id']),
+        'created_at': node.get('createdAt'),
+        'customer': {
+            'id': gid_to_id(customer.get('id')),
+            'email': customer.get('email'),
+            'first_name': customer.get('firstName'),
+            'last_name': customer.get('lastName')
+        } if customer else {},
+        'line_items': []
+    }
+
+def _to_rest_line_item(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Reshape a GraphQL line item node like a REST line item"""
+    price_set = node.get('originalUnitPriceSet') or {}
+    return {
+        'product_id': gid_to_id((node.get('product') or {}).get('id')),
+        'title': node.get('title'),
+        'quantity': node.get('quantity', 1),
+        'price': (price_set.get('shopMoney') or {}).get('amount', 0)
+    }
+
+async def iter_bulk_orders(lines: AsyncIterator[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream-parse an orders bulk result into REST-shaped orders
+    
+    Bulk results are JSONL where every order is followed by its line items,
+    each carrying a __parentId back to the order. Orders are yielded as
+    soon as their line items are complete, so only one order is held at once.
+    """
+    current: Optional[Dict[str, Any]] = None
+    current_gid: Optional[str] = None
+    
+    async for line in lines:
+        if not line.strip():
+            continue
+        node = json.loads(line)
+        parent_gid = node.get('__parentId')
+        
+        if parent_gid is None:
+            if current is not None:
+                yield current
+            current = _to_rest_order(node)
+            current_gid = node['id']
+        elif parent_gid == current_gid:
+            current['line_items'].append(_to_rest_line_item(node))
+        else:
+            logger.warning(f"Skipping bulk line item for unexpected parent {parent_gid}")
+    
+    if current is not None:
+        yield current
+
+class BulkOperationRunner:
+    """
+    Runs a GraphQL bulk query for a shop and streams its JSONL result
+    
+    Args:
+        client: HTTP client for the shop
+        graphql_url: Shop's Admin GraphQL endpoint
+        headers: Auth headers for the shop
+        post: Coroutine sending a POST, e.g. through the shop's rate limiter
+    """
+    
+    def __init__(self, client: httpx.AsyncClient, graphql_url: str, headers: Dict[str, str],
+                 post: Callable[..., Awaitable[httpx.Response]]):
+        self.client = client
+        self.graphql_url = graphql_url
+        self.headers = headers
+        self.post = post
+        self.poll_interval = float(os.getenv('SHOPIFY_BULK_POLL_INTERVAL', '2'))
+        self.timeout = float(os.getenv('SHOPIFY_BULK_TIMEOUT', '600'))
+    
+    async def _graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        response = await self.post(
+            self.client,
+            self.graphql_url,
+            headers=self.headers,
+            json={'query': query, 'variables': variables or {}},
+            timeout=30.0
+        )
+        response.raise_for_status()
+        payload = response.json()
+        
+        if payload.get('errors'):
+            raise BulkOperationError(f"GraphQL errors: {payload['errors']}")
+        return payload['data']
+    
+    async def start(self, bulk_query: str) -> str:
+        """Submit the bulk query and return the operation id"""
+        data = await self._graphql(RUN_BULK_QUERY_MUTATION, {'query': bulk_query})
+        result = data['bulkOperationRunQuery']
+        
+        if result.get('userErrors'):
+            raise BulkOperationError(f"Bulk operation rejected: {result['userErrors']}")
+        return result['bulkOperation']['id']
+    
+    async def wait(self, operation_id: str) -> Optional[str]:
+        """
+        Poll until the operation finishes
+        
+        Returns:
+            URL of the JSONL result, or None when the query matched nothing
+        """
+        deadline = time.monotonic() + self.timeout
+        
+        while True:
+            data = await self._graphql(CURRENT_BULK_OPERATION_QUERY)
+            operation = data.get('currentBulkOperation') or {}
+            
+            if operation.get('id') != operation_id:
+                raise BulkOperationError(f"Bulk operation {operation_id} is no longer current")
+            
+            status = operation.get('status')
+            if status in FINISHED_STATUSES:
+                if status != 'COMPLETED':
+                    raise BulkOperationError(f"Bulk operation {status}: {operation.get('errorCode')}")
+                logger.info(f"Bulk operation completed with {operation.get('objectCount')} objects")
+                return operation.get('url')
+            
+            if time.monotonic() > deadline:
+                raise BulkOperationError(f"Bulk operation {operation_id} timed out")
+            await asyncio.sleep(self.poll_interval)
+    
+    async def iter_orders(self, bulk_query: str) -> AsyncIterator[Dict[str, Any]]:
+        """Run an orders bulk query and stream the resulting orders"""
+        operation_id = await self.start(bulk_query)
+        logger.info(f"Started bulk operation {operation_id}")
+        
+        url = await self.wait(operation_id)
+        if not url:
+            return
+        
+        # The result lives on Shopify's storage bucket, not the shop, so no auth headers
+        async with self.client.stream('GET', url, timeout=None) as response:
+            response.raise_for_status()
+            async for order in iter_bulk_orders(response.aiter_lines()):
+                yield order
@@ -1,217 +1,696 @@
+import asyncio
 import os
+import re
 import logging
-from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Iterable, Set, Tuple, Union
 import httpx
 
-from app.shopify.mock_data import MockShopifyData
+from app.shopify.mock_data import get_mock_data
+from app.shopify.analytics import ShopAnalytics
+from app.shopify.query_engine import QueryEngine, UnsupportedQueryError
+from app.shopify.order_store import OrderStore, to_epoch, to_utc_iso
+from app.shopify.order_sync import OrderSync
+from app.shopify.resource_store import ResourceStore
+from app.shopify.fetch_coalescer import FetchCoalescer
+from app.shopify.http_pool import ShopifyHTTPPool
+from app.shopify.rate_limiter import ShopifyRateLimiter, INTERACTIVE
+from app.shopify.bulk_operations import BulkOperationRunner, BulkOperationError, build_orders_bulk_query
+from app.cache.query_cache import QueryCache
 
 logger = logging.getLogger(__name__)
 
+# Largest page size the REST Admin API allows
+PAGE_SIZE = 250
+
+# Most inventory_item_ids one inventory_levels request accepts
+INVENTORY_LEVELS_BATCH = 50
+
+# Inventory metrics answered by joining the inventory with the orders
+STOCK_METRICS = {'reorder_quantity', 'stockout_prediction'}
+
+# Customer metrics answered from the orders rather than the customer list
+ORDER_CUSTOMER_METRICS = {'repeat_customers'}
+
 class ShopifyClient:
     """
     Shopify API client with two modes:
     - mock: Returns deterministic mock data (default)
     - real: Makes actual API calls to Shopify
+    
+    In real mode, pass the application's ShopifyHTTPPool so connections to
+    the shop, its rate limit bucket, its in-flight fetches and its locally
+    synced orders are shared across requests. Use
+    priority=BACKGROUND for syncs that should yield to interactive queries.
+    Pass the application's QueryCache to reuse results of identical queries.
     """
     
-    def __init__(self, store_id: str, access_token: str):
+    def __init__(self, store_id: str, access_token: str, http_pool: Optional[ShopifyHTTPPool] = None,
+                 priority: int = INTERACTIVE, query_cache: Optional[QueryCache] = None):
         self.store_id = store_id
         self.access_token = access_token
+        self.http_pool = http_pool
+        self.query_cache = query_cache
+        self.priority = priority
         self.mode = os.getenv('SHOPIFY_MODE', 'mock')
         
         if self.mode == 'mock':
-            self.mock_data = MockShopifyData()
+            self.mock_data = get_mock_data(store_id)
             logger.info(f"ShopifyClient initialized in MOCK mode for store: {store_id}")
         else:
             self.api_version = '2024-01'
             self.base_url = f"https://{store_id}/admin/api/{self.api_version}"
+            self.max_pages = int(os.getenv('SHOPIFY_MAX_PAGES', '40'))
+            self.bulk_min_days = int(os.getenv('SHOPIFY_BULK_MIN_DAYS', '90'))
+            # Seconds local data is served without asking Shopify for changes;
+            # raise it when webhooks keep the local data current
+            self.local_max_age = float(os.getenv('SHOPIFY_LOCAL_MAX_AGE', '0'))
+            if http_pool is not None:
+                self.rate_limiter = http_pool.get_rate_limiter(store_id)
+                self.coalescer = http_pool.get_fetch_coalescer(store_id)
+                self.order_sync = http_pool.get_order_sync(store_id)
+                self.inventory_store = http_pool.get_resource_store(store_id, 'inventory')
+                self.customer_store = http_pool.get_resource_store(store_id, 'customers')
+            else:
+                self.rate_limiter = ShopifyRateLimiter.from_env()
+                self.coalescer = FetchCoalescer()
+                self.order_sync = OrderSync()
+                self.inventory_store = ResourceStore('product_id')
+                self.customer_store = ResourceStore('customer_id')
             logger.info(f"ShopifyClient initialized in REAL mode for store: {store_id}")
     
-    async def execute_query(self, shopifyql: str, intent_result: Dict[str, Any]) -> List[Dict]:
+    async def execute_query(self, shopifyql: str, intent_result: Dict[str, Any],
+                            data_sources: Optional[Iterable[str]] = None) -> List[Dict]:
         """
         Execute a ShopifyQL query
         
         Args:
             shopifyql: The query to execute
             intent_result: Intent classification result for context
-            
+            data_sources: Planned sources to fetch in real mode, else the category's own
+        
         Returns:
             List of result rows
         """
+        if self.query_cache is not None:
+            cached = await self.query_cache.get(self.store_id, shopifyql, intent_result)
+            if cached is not None:
+                logger.info("Query result served from cache")
+                return cached
+        
         if self.mode == 'mock':
-            return self._execute_mock_query(shopifyql, intent_result)
+            rows = self._execute_mock_query(shopifyql, intent_result)
         else:
-            return await self._execute_real_query(shopifyql)
+            rows = await self._execute_real_query(shopifyql, intent_result, data_sources)
+        
+        if self.query_cache is not None:
+            await self.query_cache.set(self.store_id, shopifyql, intent_result, rows)
+        return rows
+    
+    async def execute_batch(self, queries: List[Tuple[str, Dict[str, Any], List[str]]]
+                            ) -> List[Union[List[Dict], Exception]]:
+        """
+        Execute several queries from one shared fetch of their data sources
+        
+        Cached results are used first. The remaining queries' data sources
+        are merged and fetched once, over the widest time period, and every
+        query is answered from that snapshot.
+        
+        Args:
+            queries: (shopifyql, intent_result, data_sources) per query
+        
+        Returns:
+            Result rows per query, or the exception that query raised
+        """
+        results: List[Union[List[Dict], Exception, None]] = [None] * len(queries)
+        pending = []
+        
+        for i, (shopifyql, intent_result, _) in enumerate(queries):
+            cached = None
+            if self.query_cache is not None:
+                cached = await self.query_cache.get(self.store_id, shopifyql, intent_result)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+        
+        if not pending:
+            return results
+        
+        data_sources = set()
+        for i in pending:
+            data_sources.update(self._sources_to_fetch(queries[i][1], queries[i][2]))
+        time_period = max(
+            (queries[i][1].get('time_period') or {} for i in pending),
+            key=lambda period: period.get('value', 7)
+        )
+        
+        snapshot = await self.fetch_snapshot(data_sources, time_period)
+        logger.info(f"Answering {len(pending)} queries from one snapshot of {sorted(data_sources)}")
+        
+        for i in pending:
+            shopifyql, intent_result, _ = queries[i]
+            try:
+                rows = self._query_snapshot(snapshot, shopifyql, intent_result)
+            except Exception as e:
+                logger.error(f"Batch query failed: {str(e)}", exc_info=True)
+                results[i] = e
+                continue
+            
+            if self.query_cache is not None:
+                await self.query_cache.set(self.store_id, shopifyql, intent_result, rows)
+            results[i] = rows
+        
+        return results
+    
+    async def fetch_snapshot(self, data_sources: Iterable[str], time_period: Dict[str, Any],
+                             shopifyql: str = 'SELECT * FROM orders') -> ShopAnalytics:
+        """
+        Fetch each requested resource once into a ShopAnalytics snapshot
+        
+        The resources are fetched concurrently, bounded by the shop's rate
+        limiter, so a question needing several of them waits for the slowest
+        fetch rather than for all of them in turn.
+        
+        Args:
+            data_sources: Planned sources, e.g. 'orders', 'inventory_levels', 'customers'
+            time_period: Widest time period any query needs
+            shopifyql: Orders query whose created_at bound a bulk operation uses
+        """
+        if self.mode == 'mock':
+            return self.mock_data
+        
+        data_sources = set(data_sources)
+        
+        async with self._http_client() as client:
+            headers = {
+                'X-Shopify-Access-Token': self.access_token,
+                'Content-Type': 'application/json'
+            }
+            
+            async def orders() -> OrderStore:
+                if self._needs_bulk(time_period):
+                    try:
+                        return await self._bulk_fetch_orders(client, headers, shopifyql, time_period)
+                    except BulkOperationError as e:
+                        logger.warning(f"Bulk operation unavailable, falling back to REST paging: {e}")
+                return await self._fetch_orders(client, self.base_url, headers, time_period)
+            
+            async def unplanned(empty: Any) -> Any:
+                return empty
+            
+            fetched_orders, inventory, customers = await asyncio.gather(
+                orders() if 'orders' in data_sources else unplanned(OrderStore()),
+                self._fetch_inventory(client, self.base_url, headers, time_period)
+                if 'inventory_levels' in data_sources else unplanned([]),
+                self._fetch_customers(client, self.base_url, headers, time_period)
+                if 'customers' in data_sources else unplanned([])
+            )
+        
+        return ShopAnalytics(fetched_orders, inventory=inventory, customers=customers)
+    
+    def _query_snapshot(self, snapshot: ShopAnalytics, shopifyql: str, intent_result: Dict[str, Any]) -> List[Dict]:
+        """Answer one query from a snapshot, with the same rows execute_query returns"""
+        category = intent_result.get('category', 'general')
+        
+        # Real mode answers these categories with the fetched rows as-is,
+        # except stock projections, which join the inventory to the orders,
+        # and repeat customers, which are counted from the orders
+        metrics = set(intent_result.get('metrics', []))
+        if self.mode != 'mock' and category == 'inventory' and not STOCK_METRICS & metrics:
+            return [dict(item) for item in snapshot.inventory]
+        if self.mode != 'mock' and category == 'customers' and not ORDER_CUSTOMER_METRICS & metrics:
+            return [dict(customer) for customer in snapshot.customers]
+        
+        return self._run_analytics(snapshot, intent_result, shopifyql)
     
     def _execute_mock_query(self, shopifyql: str, intent_result: Dict[str, Any]) -> List[Dict]:
         """Execute query against mock data"""
         category = intent_result.get('category', 'general')
         metrics = intent_result.get('metrics', [])
-        time_period = intent_result.get('time_period', {})
-        entities = intent_result.get('entities', [])
         
         logger.info(f"Executing mock query for category: {category}, metrics: {metrics}")
         
-        # Route to appropriate mock data method
+        return self._run_analytics(self.mock_data, intent_result, shopifyql)
+    
+    def _run_analytics(self, analytics: ShopAnalytics, intent_result: Dict[str, Any],
+                       shopifyql: str = '') -> List[Dict]:
+        """
+        Answer an intent from local data
+        
+        Metrics with derived fields (revenue, per-day velocity, stock cover)
+        keep their dedicated analytics methods. Everything else runs the
+        generated ShopifyQL on the local query engine, falling back to the
+        category's analytics method when the query is not supported.
+        """
+        category = intent_result.get('category', 'general')
+        metrics = intent_result.get('metrics', [])
+        time_period = intent_result.get('time_period', {})
+        entities = intent_result.get('entities', [])
+        
+        # Route to appropriate analytics method
         if category == 'sales' and 'top_products' in metrics:
-            return self.mock_data.get_top_products(time_period, entities)
+            return analytics.get_top_products(time_period, entities)
         
         elif category == 'inventory' and 'reorder_quantity' in metrics:
-            return self.mock_data.get_sales_velocity(time_period, entities)
+            return analytics.get_sales_velocity(time_period, entities)
         
         elif category == 'inventory' and 'stockout_prediction' in metrics:
-            return self.mock_data.get_stockout_risks(time_period)
+            return analytics.get_stockout_risks(time_period)
         
         elif category == 'customers' and 'repeat_customers' in metrics:
-            return self.mock_data.get_repeat_customers(time_period)
+            return analytics.get_repeat_customers(time_period)
+        
+        try:
+            return QueryEngine(analytics).execute(shopifyql)
+        except UnsupportedQueryError as e:
+            logger.info(f"Query engine cannot run query, using analytics fallback: {e}")
         
-        elif category == 'sales':
-            return self.mock_data.get_sales_summary(time_period)
+        if category == 'sales':
+            return analytics.get_sales_summary(time_period)
         
         elif category == 'inventory':
-            return self.mock_data.get_inventory_levels(entities)
+            return analytics.get_inventory_levels(entities)
         
         elif category == 'customers':
-            return self.mock_data.get_top_customers(time_period)
+            return analytics.get_top_customers(time_period)
         
         else:
             # Default: return general analytics
-            return self.mock_data.get_top_products(time_period, entities)
+            return analytics.get_top_products(time_period, entities)
+    
+    @staticmethod
+    def _answer_sources(intent_result: Dict[str, Any]) -> Set[str]:
+        """Sources _query_snapshot reads to answer an intent in real mode"""
+        category = intent_result.get('category', 'general')
+        metrics = set(intent_result.get('metrics', []))
+        if category == 'inventory':
+            return {'inventory_levels', 'orders'} if STOCK_METRICS & metrics else {'inventory_levels'}
+        elif category == 'customers':
+            return {'orders'} if ORDER_CUSTOMER_METRICS & metrics else {'customers'}
+        return {'orders'}
+    
+    def _sources_to_fetch(self, intent_result: Dict[str, Any], data_sources: Optional[Iterable[str]]) -> Set[str]:
+        """Planned sources the answer reads, or every source it reads without a plan"""
+        sources = self._answer_sources(intent_result)
+        return sources if data_sources is None else sources & set(data_sources)
     
-    async def _execute_real_query(self, shopifyql: str, intent_result: Dict[str, Any]) -> List[Dict]:
+    async def _execute_real_query(self, shopifyql: str, intent_result: Dict[str, Any],
+                                  data_sources: Optional[Iterable[str]] = None) -> List[Dict]:
         """
         Execute query against real Shopify API
-        Converts ShopifyQL to Shopify Admin API calls
+        
+        The planned data sources the answer reads are fetched concurrently
+        into one snapshot, and the query is answered from it locally.
         """
         logger.info("Executing REAL Shopify query")
         
         category = intent_result.get('category', 'general')
         time_period = intent_result.get('time_period', {})
+        data_sources = self._sources_to_fetch(intent_result, data_sources)
+        
+        # Only order queries carry the created_at bound of a bulk operation
+        orders_query = shopifyql if category in ('sales', 'general') else 'SELECT * FROM orders'
         
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    'X-Shopify-Access-Token': self.access_token,
-                    'Content-Type': 'application/json'
-                }
-                
-                base_url = f"https://{self.store_id}/admin/api/{self.api_version}"
-                
-                # Convert ShopifyQL intent to appropriate API endpoint
-                if category == 'sales':
-                    return await self._fetch_orders(client, base_url, headers, time_period)
-                elif category == 'inventory':
-                    return await self._fetch_inventory(client, base_url, headers, time_period)
-                elif category == 'customers':
-                    return await self._fetch_customers(client, base_url, headers, time_period)
-                else:
-                    return await self._fetch_orders(client, base_url, headers, time_period)
-                    
+            snapshot = await self.fetch_snapshot(data_sources, time_period, orders_query)
         except httpx.HTTPError as e:
             logger.error(f"Shopify API error: {str(e)}")
             raise
+        return self._query_snapshot(snapshot, shopifyql, intent_result)
+    
+    @asynccontextmanager
+    async def _http_client(self):
+        """Yield the pooled client for this shop, or a one-off client without a pool"""
+        if self.http_pool is not None:
+            yield self.http_pool.get_client(self.store_id)
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
+    
+    async def _get(self, client, url: str, **kwargs) -> httpx.Response:
+        """GET through the shop's rate limiter"""
+        return await self.rate_limiter.request(client, 'GET', url, priority=self.priority, **kwargs)
+    
+    async def _post(self, client, url: str, **kwargs) -> httpx.Response:
+        """POST through the shop's rate limiter"""
+        return await self.rate_limiter.request(client, 'POST', url, priority=self.priority, **kwargs)
+    
+    async def _iter_pages(self, client, url: str, headers: dict, params: dict,
+                          resource_key: str) -> AsyncIterator[List[Dict]]:
+        """
+        Stream pages of a REST resource using Link header cursors
+        
+        Shopify returns a rel="next" link carrying a page_info cursor for
+        the following page. Paging stops when there is no next link or when
+        the page budget (SHOPIFY_MAX_PAGES) is used up.
+        
+        Yields:
+            The list of records from each page
+        """
+        next_url: Optional[str] = url
+        next_params: Optional[dict] = {**params, 'limit': PAGE_SIZE}
+        pages = 0
+        
+        while next_url and pages < self.max_pages:
+            response = await self._get(
+                client,
+                next_url,
+                headers=headers,
+                params=next_params,
+                timeout=30.0
+            )
+            
+            response.raise_for_status()
+            pages += 1
+            yield response.json()[resource_key]
+            
+            # The next link already carries page_info and limit; Shopify
+            # rejects any other filter alongside page_info
+            next_url = response.links.get('next', {}).get('url')
+            next_params = None
+        
+        if next_url:
+            logger.warning(f"Stopped paging {resource_key} after {pages} pages, page budget reached")
     
-    async def _fetch_orders(self, client, base_url: str, headers: dict, time_period: dict) -> List[Dict]:
-        """Fetch orders from Shopify API"""
-        # Calculate date range
-        from datetime import datetime, timedelta
+    @staticmethod
+    def _order_to_rows(order: Dict) -> List[Dict]:
+        """Flatten a Shopify order into one row per line item"""
+        customer = order.get('customer') or {}
+        customer_name = f"{customer.get('first_name') or ''} {customer.get('last_name') or ''}".strip()
         
+        return [
+            {
+                'order_id': order['id'],
+                'product_id': item.get('product_id'),
+                'product_title': item.get('title'),
+                'customer_id': customer.get('id'),
+                'customer_email': customer.get('email'),
+                'customer_name': customer_name,
+                'quantity': item.get('quantity', 1),
+                'total_price': float(item.get('price', 0)),
+                'created_at': order['created_at']
+            }
+            for item in order.get('line_items', [])
+        ]
+    
+    @staticmethod
+    def _orders_start_date(time_period: dict) -> str:
+        """Earliest created_at covered by the question's time period"""
         days = time_period.get('value', 7) if time_period else 7
-        start_date = (datetime.utcnow() - timedelta(days=days)).isoformat()
-        
-        # Fetch orders
-        response = await client.get(
-            f"{base_url}/orders.json",
-            headers=headers,
-            params={
-                'status': 'any',
-                'created_at_min': start_date,
-                'limit': 250
-            },
-            timeout=30.0
-        )
+        return to_utc_iso(datetime.utcnow() - timedelta(days=days))
+    
+    def _needs_bulk(self, time_period: dict) -> bool:
+        """Whether orders for the period are a long history not yet synced locally"""
+        days = time_period.get('value', 7) if time_period else 7
+        since = to_epoch(self._orders_start_date(time_period))
+        return days >= self.bulk_min_days and not self.order_sync.covers(since)
+    
+    async def _merge_order_pages(self, client, base_url: str, headers: dict, params: dict) -> bool:
+        """
+        Upsert every order matching params into the shop's synced orders
         
-        response.raise_for_status()
-        orders_data = response.json()['orders']
+        Returns:
+            False when the page budget may have cut the listing short
+        """
+        rows: List[Dict] = []
+        order_ids = []
+        pages = 0
+        async for orders_page in self._iter_pages(client, f"{base_url}/orders.json", headers, params, 'orders'):
+            for order in orders_page:
+                rows.extend(self._order_to_rows(order))
+                order_ids.append(order['id'])
+            pages += 1
         
-        # Transform to our format
-        results = []
-        for order in orders_data:
-            for item in order.get('line_items', []):
-                results.append({
-                    'order_id': order['id'],
-                    'product_id': item.get('product_id'),
-                    'product_title': item.get('title'),
-                    'customer_id': order.get('customer', {}).get('id'),
-                    'customer_email': order.get('customer', {}).get('email'),
-                    'customer_name': f"{order.get('customer', {}).get('first_name', '')} {order.get('customer', {}).get('last_name', '')}".strip(),
-                    'quantity': item.get('quantity', 1),
-                    'total_price': float(item.get('price', 0)),
-                    'created_at': order['created_at']
-                })
+        await self.order_sync.merge(rows, order_ids)
+        logger.info(f"Merged {len(order_ids)} orders ({len(rows)} line items) from Shopify")
+        return pages < self.max_pages
+    
+    async def _sync_orders(self, client, base_url: str, headers: dict, since: float) -> None:
+        """
+        Bring the shop's local orders up to date for a window starting at since
         
-        logger.info(f"Fetched {len(results)} order line items from Shopify")
-        return results
+        Orders already held are refreshed with the ones updated since the
+        high-water mark; orders created before what is held are backfilled.
+        The mark and the covered window only advance after a complete listing.
+        """
+        sync = self.order_sync
+        await sync.load()
+        started_at = datetime.utcnow()
+        
+        if sync.updated_at_min is not None and not sync.fresh(self.local_max_age):
+            # Marks stored without an offset by earlier versions are UTC too
+            params = {'status': 'any', 'updated_at_min': to_utc_iso(sync.updated_at_min)}
+            if await self._merge_order_pages(client, base_url, headers, params):
+                sync.advance(started_at)
+            sync.incremental_syncs += 1
+        
+        if not sync.covers(since):
+            params = {'status': 'any', 'created_at_min': to_utc_iso(since)}
+            if sync.since is not None:
+                params['created_at_max'] = to_utc_iso(sync.since)
+            if await self._merge_order_pages(client, base_url, headers, params):
+                if sync.since is None:
+                    sync.advance(started_at)
+                sync.since = since
+            sync.backfills += 1
+        
+        await sync.save()
+    
+    async def _fetch_orders(self, client, base_url: str, headers: dict, time_period: dict) -> OrderStore:
+        """Orders for the period from the shop's incrementally synced local store"""
+        since = to_epoch(self._orders_start_date(time_period))
+        
+        async def run() -> OrderStore:
+            async with self.order_sync.lock:
+                await self._sync_orders(client, base_url, headers, since)
+            return self.order_sync.orders
+        
+        return await self.coalescer.fetch('orders', since, run, narrow=self._narrow_orders)
+    
+    @staticmethod
+    def _narrow_orders(orders: OrderStore, since: Optional[float]) -> OrderStore:
+        """A caller's own copy of shared orders, limited to its window"""
+        # Rollups kept on the shared orders are inherited by every copy
+        orders.rollups()
+        return orders.subset(since=since)
+    
+    @staticmethod
+    def _copy_rows(rows: List[Dict], since: Optional[float]) -> List[Dict]:
+        return [dict(row) for row in rows]
+    
+    async def _fetch_local(self, store: ResourceStore, resource: str,
+                           page: Callable[[], Awaitable[List[Dict]]]) -> List[Dict]:
+        """Rows of a resource from its local copy while fresh, otherwise fetched into it"""
+        await store.load()
+        if store.fresh(self.local_max_age):
+            return store.rows()
+        
+        async def run() -> List[Dict]:
+            rows = await page()
+            await store.replace(rows)
+            return rows
+        
+        return await self.coalescer.fetch(resource, None, run, narrow=self._copy_rows)
     
     async def _fetch_inventory(self, client, base_url: str, headers: dict, time_period: dict) -> List[Dict]:
         """Fetch inventory from Shopify API"""
-        # First get products
-        response = await client.get(
-            f"{base_url}/products.json",
-            headers=headers,
-            params={'limit': 250},
-            timeout=30.0
+        return await self._fetch_local(
+            self.inventory_store, 'inventory',
+            lambda: self._page_inventory(client, base_url, headers)
         )
+    
+    @staticmethod
+    def _product_to_rows(product: Dict) -> List[Dict]:
+        """
+        Flatten a Shopify product into one inventory row per variant
         
-        response.raise_for_status()
-        products = response.json()['products']
-        
+        quantity starts as the variant's inventory_quantity; _set_locations
+        replaces it with the total of the variant's inventory levels.
+        """
+        return [
+            {
+                'product_id': product['id'],
+                'product_title': product['title'],
+                'variant_id': variant.get('id'),
+                'inventory_item_id': variant.get('inventory_item_id'),
+                'sku': variant.get('sku'),
+                'quantity': variant.get('inventory_quantity', 0),
+                'locations': []
+            }
+            for variant in product.get('variants', [])
+        ]
+    
+    @staticmethod
+    def _set_locations(row: Dict, locations: List[Dict]) -> None:
+        """Give an inventory row its per-location levels and their total"""
+        row['locations'] = locations
+        row['quantity'] = sum(location['available'] for location in locations)
+    
+    @classmethod
+    def _set_level(cls, row: Dict, location_id: Any, available: int) -> None:
+        """Change one location's level of an inventory row"""
+        locations = [location for location in row['locations'] if location['location_id'] != location_id]
+        locations.append({'location_id': location_id, 'available': available})
+        cls._set_locations(row, locations)
+    
+    async def _page_inventory(self, client, base_url: str, headers: dict) -> List[Dict]:
         results = []
-        for product in products:
-            for variant in product.get('variants', []):
-                results.append({
-                    'product_id': product['id'],
-                    'product_title': product['title'],
-                    'sku': variant.get('sku'),
-                    'quantity': variant.get('inventory_quantity', 0)
+        params = {'fields': 'id,title,variants'}
+        async for products in self._iter_pages(client, f"{base_url}/products.json", headers, params, 'products'):
+            for product in products:
+                results.extend(self._product_to_rows(product))
+        
+        # Levels per location for every variant, in concurrent batches under the rate limiter
+        item_ids = [row['inventory_item_id'] for row in results if row['inventory_item_id'] is not None]
+        batches = [item_ids[i:i + INVENTORY_LEVELS_BATCH] for i in range(0, len(item_ids), INVENTORY_LEVELS_BATCH)]
+        levels: Dict[Any, List[Dict]] = {}
+        for batch in await asyncio.gather(*(
+            self._fetch_inventory_levels(client, base_url, headers, batch) for batch in batches
+        )):
+            for level in batch:
+                levels.setdefault(level['inventory_item_id'], []).append({
+                    'location_id': level['location_id'],
+                    'available': level.get('available') or 0
                 })
         
-        logger.info(f"Fetched {len(results)} inventory items from Shopify")
+        for row in results:
+            if row['inventory_item_id'] in levels:
+                self._set_locations(row, levels[row['inventory_item_id']])
+        
+        logger.info(f"Fetched {len(results)} inventory items with {len(batches)} inventory level requests from Shopify")
         return results
     
+    async def _fetch_inventory_levels(self, client, base_url: str, headers: dict, item_ids: List[Any]) -> List[Dict]:
+        """Inventory levels at every location of a batch of inventory items"""
+        params = {'inventory_item_ids': ','.join(str(item_id) for item_id in item_ids)}
+        levels = []
+        async for page in self._iter_pages(client, f"{base_url}/inventory_levels.json", headers, params,
+                                           'inventory_levels'):
+            levels.extend(page)
+        return levels
+    
     async def _fetch_customers(self, client, base_url: str, headers: dict, time_period: dict) -> List[Dict]:
         """Fetch customers from Shopify API"""
-        response = await client.get(
-            f"{base_url}/customers.json",
-            headers=headers,
-            params={'limit': 250},
-            timeout=30.0
+        return await self._fetch_local(
+            self.customer_store, 'customers',
+            lambda: self._page_customers(client, base_url, headers)
         )
-        
-        response.raise_for_status()
-        customers = response.json()['customers']
-        
+    
+    @staticmethod
+    def _customer_to_row(customer: Dict) -> Dict:
+        return {
+            'customer_id': customer['id'],
+            'customer_email': customer.get('email'),
+            'customer_name': f"{customer.get('first_name', '')} {customer.get('last_name', '')}".strip(),
+            'total_spent': float(customer.get('total_spent', 0)),
+            'order_count': customer.get('orders_count', 0)
+        }
+    
+    async def _page_customers(self, client, base_url: str, headers: dict) -> List[Dict]:
         results = []
-        for customer in customers:
-            results.append({
-                'customer_id': customer['id'],
-                'customer_email': customer.get('email'),
-                'customer_name': f"{customer.get('first_name', '')} {customer.get('last_name', '')}".strip(),
-                'total_spent': float(customer.get('total_spent', 0)),
-                'order_count': customer.get('orders_count', 0)
-            })
+        async for customers in self._iter_pages(client, f"{base_url}/customers.json", headers, {}, 'customers'):
+            for customer in customers:
+                results.append(self._customer_to_row(customer))
         
         logger.info(f"Fetched {len(results)} customers from Shopify")
         return results
     
-    def _convert_to_graphql(self, shopifyql: str) -> str:
+    async def apply_webhook(self, topic: str, payload: Dict[str, Any]) -> bool:
+        """
+        Apply a webhook delta to the shop's local data
+        
+        Args:
+            topic: Webhook topic, e.g. 'orders/updated'
+            payload: Webhook body, the changed resource in REST format
+        
+        Returns:
+            Whether local data was changed
+        """
+        if self.mode == 'mock':
+            return False
+        
+        if topic in ('orders/create', 'orders/updated'):
+            await self.order_sync.apply(self._order_to_rows(payload), payload['id'])
+        elif topic == 'products/update':
+            # The product payload has no levels; keep the ones held per variant
+            held = {row['inventory_item_id']: row for row in self.inventory_store.get(payload['id'])}
+            rows = self._product_to_rows(payload)
+            for row in rows:
+                previous = held.get(row['inventory_item_id'])
+                if previous and previous.get('locations'):
+                    self._set_locations(row, previous['locations'])
+            await self.inventory_store.upsert(payload['id'], rows)
+        elif topic == 'customers/update':
+            await self.customer_store.upsert(payload['id'], [self._customer_to_row(payload)])
+        elif topic == 'inventory_levels/update':
+            updated = await self.inventory_store.update_rows(
+                'inventory_item_id', payload['inventory_item_id'],
+                lambda row: self._set_level(row, payload['location_id'], payload.get('available') or 0)
+            )
+            # A level of an item not held locally, refetch the inventory on the next read
+            if not updated:
+                await self.inventory_store.invalidate()
+        else:
+            return False
+        return True
+    
+    async def _bulk_fetch_orders(self, client, headers: dict, shopifyql: str, time_period: dict) -> OrderStore:
+        """Fetch orders with a GraphQL bulk operation into the same store as _fetch_orders"""
+        runner = BulkOperationRunner(
+            client,
+            f"https://{self.store_id}/admin/api/{self.api_version}/graphql.json",
+            headers,
+            self._post
+        )
+        default_start = self._orders_start_date(time_period)
+        bulk_query = self._convert_to_graphql(shopifyql, default_start)
+        
+        try:
+            since = to_epoch(self._bulk_start(shopifyql, default_start))
+        except ValueError:
+            since = None
+        
+        async def run() -> OrderStore:
+            started_at = datetime.utcnow()
+            orders = OrderStore()
+            async for order in runner.iter_orders(bulk_query):
+                orders.extend(self._order_to_rows(order))
+            
+            logger.info(f"Fetched {len(orders)} order line items from Shopify bulk operation")
+            
+            # A finished bulk export is a complete history, so it can seed the local store
+            if since is not None:
+                async with self.order_sync.lock:
+                    if not self.order_sync.covers(since):
+                        await self.order_sync.replace(orders, since, started_at)
+                        self.order_sync.backfills += 1
+            return orders
+        
+        if since is None:
+            return await run()
+        return await self.coalescer.fetch('orders:bulk', since, run, narrow=self._narrow_orders)
+    
+    def _convert_to_graphql(self, shopifyql: str, default_start: str) -> str:
         """
-        Convert ShopifyQL to Shopify GraphQL
+        Convert ShopifyQL to a Shopify GraphQL bulk query
         
-        This is a placeholder - real implementation would need proper query translation
+        Only order queries are supported: the created_at lower bound is taken
+        from the ShopifyQL WHERE clause when present, else default_start.
+        Filtering, grouping and sorting still happen locally on the rows.
         """
-        # TODO: Implement ShopifyQL -> GraphQL conversion
-        pass
+        table = re.search(r'\bFROM\s+(\w+)', shopifyql or '', re.IGNORECASE)
+        if table and table.group(1).lower() not in ('orders', 'order_line_items'):
+            raise BulkOperationError(f"No bulk query for table '{table.group(1)}'")
+        
+        return build_orders_bulk_query(self._bulk_start(shopifyql, default_start))
+    
+    @staticmethod
+    def _bulk_start(shopifyql: str, default_start: str) -> str:
+        """created_at lower bound of a bulk orders query"""
+        start = re.search(r"\bcreated_at\s*>=?\s*'([^']+)'", shopifyql or '', re.IGNORECASE)
+        return start.group(1) if start else default_start
     
     # Methods for OAuth flow (real mode)
     
@@ -237,7 +716,8 @@ class ShopifyClient:
         )
     
     @staticmethod
-    async def exchange_code_for_token(shop_domain: str, api_key: str, api_secret: str, code: str) -> str:
+    async def exchange_code_for_token(shop_domain: str, api_key: str, api_secret: str, code: str,
+                                      http_pool: Optional[ShopifyHTTPPool] = None) -> str:
         """
         Exchange authorization code for access token
         
@@ -246,22 +726,26 @@ class ShopifyClient:
             api_key: Your app's API key
             api_secret: Your app's API secret
             code: Authorization code from OAuth callback
-            
+            http_pool: Optional shared pool to send the request through
+        
         Returns:
             Access token
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://{shop_domain}/admin/oauth/access_token",
-                json={
-                    'client_id': api_key,
-                    'client_secret': api_secret,
-                    'code': code
-                }
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data['access_token']
-            else:
-                raise Exception(f"Failed to exchange code: {response.text}")
+        payload = {
+            'client_id': api_key,
+            'client_secret': api_secret,
+            'code': code
+        }
+        url = f"https://{shop_domain}/admin/oauth/access_token"
+        
+        if http_pool is not None:
+            response = await http_pool.get_client(shop_domain).post(url, json=payload)
+        else:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(url, json=payload)
+        
+        if response.status_code == 200:
+            data = response.json()
+            return data['access_token']
+        else:
+            raise Exception(f"Failed to exchange code: {response.text}")
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class FetchCoalescer:
+    """
+    Single-flight for a shop's Shopify fetches, keyed by resource and window
+    
+    A caller whose window starts at or after the window of a fetch already
+    in flight for the same resource awaits that fetch instead of starting
+    its own, and narrows the shared result to its own window. Windowless
+    resources (since=None) are shared between all concurrent callers.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[str, List[Tuple[Optional[float], asyncio.Future]]] = {}
+        self.fetches = 0
+        self.coalesced = 0
+    
+    def _find(self, resource: str, since: Optional[float]) -> Optional[Tuple[Optional[float], asyncio.Future]]:
+        """Widest in-flight fetch covering the window"""
+        for entry_since, future in self._inflight.get(resource, []):
+            if entry_since is None or (since is not None and entry_since <= since):
+                return entry_since, future
+        return None
+    
+    async def fetch(self, resource: str, since: Optional[float], fetch: Callable[[], Awaitable[Any]],
+                    narrow: Optional[Callable[[Any, Optional[float]], Any]] = None) -> Any:
+        """
+        Run fetch() or join an in-flight fetch covering the same window
+        
+        Args:
+            resource: Resource name, e.g. 'orders'
+            since: Epoch start of the window, None for the whole resource
+            fetch: Coroutine function performing the fetch
+            narrow: Makes a caller's own copy of a shared result, given its window
+        """
+        entry = self._find(resource, since)
+        if entry is not None:
+            self.coalesced += 1
+            logger.info(f"Joining in-flight {resource} fetch")
+            future = entry[1]
+        else:
+            future = asyncio.ensure_future(fetch())
+            entries = self._inflight.setdefault(resource, [])
+            entries.append((since, future))
+            # Keep the widest windows first so joiners find them
+            entries.sort(key=lambda e: float('-inf') if e[0] is None else e[0])
+            future.add_done_callback(lambda done: self._forget(resource, done))
+            self.fetches += 1
+        
+        result = await asyncio.shield(future)
+        return narrow(result, since) if narrow else result
+    
+    def _forget(self, resource: str, future: asyncio.Future) -> None:
+        entries = [e for e in self._inflight.get(resource, []) if e[1] is not future]
+        if entries:
+            self._inflight[resource] = entries
+        else:
+            self._inflight.pop(resource, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'fetches': self.fetches,
+            'coalesced': self.coalesced,
+            'in_flight': sum(len(entries) for entries in self._inflight.values())
+        }
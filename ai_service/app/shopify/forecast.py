@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from app.shopify.order_store import OrderStore, to_epoch, NULL_ID
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Days of demand a reorder covers, and the safety margin on top of it
+REORDER_COVER_DAYS = 14
+SAFETY_FACTOR = 1.2
+
+def reorder_quantity(avg_daily_sales: float) -> int:
+    """Units to order to cover REORDER_COVER_DAYS of demand plus the safety margin"""
+    return int(avg_daily_sales * REORDER_COVER_DAYS * SAFETY_FACTOR)
+
+class InventoryForecast:
+    """
+    Stock projections for every product from sales velocity and inventory
+    
+    Inventory is indexed by product_id once (variant quantities summed per
+    product, since line items only carry the product), and each projection
+    aggregates the window's line items in one pass and joins them to the
+    index with a lookup per product. With numpy installed the aggregation
+    runs as array operations over the OrderStore columns without copying
+    them.
+    
+    Args:
+        orders: Order line items
+        inventory: Inventory rows with product_id, product_title and quantity
+    """
+    
+    def __init__(self, orders: OrderStore, inventory: List[Dict]):
+        self.orders = orders
+        self.stock: Dict[int, int] = {}
+        for item in inventory:
+            pid = NULL_ID if item.get('product_id') is None else int(item['product_id'])
+            self.stock[pid] = self.stock.get(pid, 0) + int(item.get('quantity') or 0)
+    
+    def project(self, days: int, title_codes: Optional[Set[int]] = None,
+                max_days_of_cover: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Velocity, days of cover, stockout date and reorder quantity per product
+        
+        Args:
+            days: Sales window the velocity is measured over
+            title_codes: Only products whose title code is in this set
+            max_days_of_cover: Only stocked products running out within this many days
+        
+        Returns:
+            One row per product sold in the window, in order of first sale
+        """
+        now = datetime.utcnow()
+        indices = self.orders.select(since=to_epoch(now - timedelta(days=days)), title_codes=title_codes)
+        
+        if NUMPY_AVAILABLE:
+            pids, title_of, totals = self._aggregate_numpy(indices)
+        else:
+            pids, title_of, totals = self._aggregate(indices)
+        
+        rows = []
+        for pid, title_code, total_sold in zip(pids, title_of, totals):
+            stock = self.stock.get(pid)
+            avg_daily_sales = total_sold / days
+            days_of_cover = stock / avg_daily_sales if stock is not None and avg_daily_sales > 0 else None
+            if max_days_of_cover is not None and (days_of_cover is None or days_of_cover > max_days_of_cover):
+                continue
+            
+            rows.append({
+                'product_id': None if pid == NULL_ID else pid,
+                'product_title': self.orders.titles.decode(title_code),
+                'total_sold': total_sold,
+                'avg_daily_sales': avg_daily_sales,
+                'current_stock': stock,
+                'days_of_cover': days_of_cover,
+                'stockout_date': (now + timedelta(days=days_of_cover)).date().isoformat()
+                                 if days_of_cover is not None else None,
+                'reorder_quantity': reorder_quantity(avg_daily_sales)
+            })
+        return rows
+    
+    def _aggregate(self, indices: Sequence[int]):
+        """Units sold and first title code per product, in order of first sale"""
+        orders = self.orders
+        totals: Dict[int, int] = {}
+        title_of: Dict[int, int] = {}
+        for i in indices:
+            pid = orders.product_ids[i]
+            if pid not in totals:
+                totals[pid] = 0
+                title_of[pid] = orders.title_codes[i]
+            totals[pid] += orders.quantities[i]
+        return list(totals), [title_of[pid] for pid in totals], list(totals.values())
+    
+    def _aggregate_numpy(self, indices: Sequence[int]):
+        """_aggregate() as array operations"""
+        orders = self.orders
+        if isinstance(indices, range):
+            window = slice(indices.start, indices.stop)
+        else:
+            window = np.asarray(indices, dtype=np.intp)
+        
+        pids = np.asarray(memoryview(orders.product_ids))[window]
+        quantities = np.asarray(memoryview(orders.quantities))[window]
+        title_codes = np.asarray(memoryview(orders.title_codes))[window]
+        
+        unique, first, inverse = np.unique(pids, return_index=True, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=quantities, minlength=len(unique))
+        by_first_sale = np.argsort(first, kind='stable')
+        return (
+            unique[by_first_sale].tolist(),
+            title_codes[first[by_first_sale]].tolist(),
+            totals[by_first_sale].astype(np.int64).tolist()
+        )
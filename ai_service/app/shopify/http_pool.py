@@ -0,0 +1,193 @@
+import os
+import logging
+import time
+from typing import Dict, Any, Optional
+import httpx
+
+from app.shopify.rate_limiter import ShopifyRateLimiter
+from app.shopify.fetch_coalescer import FetchCoalescer
+from app.shopify.order_sync import OrderSync
+from app.shopify.resource_store import ResourceStore
+from app.shopify.shop_db import ShopDatabase
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 support in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Field grouping the rows of each locally kept resource
+RESOURCE_KEYS = {
+    'inventory': 'product_id',
+    'customers': 'customer_id'
+}
+
+class ShopifyHTTPPool:
+    """
+    Application-scoped pool of persistent HTTP clients, one per shop host
+    
+    Reusing a client per host keeps TCP/TLS connections alive between
+    requests instead of paying a new handshake for every Shopify call.
+    The pool is created and closed by the FastAPI lifespan.
+    """
+    
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0, timeout: float = 30.0, http2: bool = True,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, db_dir: Optional[str] = None,
+                 snapshot_interval: float = 600.0):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.transport = transport
+        self.db_dir = db_dir
+        self.snapshot_interval = snapshot_interval
+        self._databases: Dict[str, ShopDatabase] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._rate_limiters: Dict[str, ShopifyRateLimiter] = {}
+        self._coalescers: Dict[str, FetchCoalescer] = {}
+        self._order_syncs: Dict[str, OrderSync] = {}
+        self._resource_stores: Dict[str, Dict[str, ResourceStore]] = {}
+        
+        if http2 and not HTTP2_AVAILABLE:
+            logger.info("HTTP/2 requested but 'h2' is not installed, using HTTP/1.1")
+    
+    @classmethod
+    def from_env(cls) -> 'ShopifyHTTPPool':
+        """Build a pool from SHOPIFY_HTTP_* environment variables"""
+        return cls(
+            max_connections=int(os.getenv('SHOPIFY_HTTP_MAX_CONNECTIONS', '20')),
+            max_keepalive_connections=int(os.getenv('SHOPIFY_HTTP_MAX_KEEPALIVE', '10')),
+            keepalive_expiry=float(os.getenv('SHOPIFY_HTTP_KEEPALIVE_EXPIRY', '30')),
+            timeout=float(os.getenv('SHOPIFY_HTTP_TIMEOUT', '30')),
+            http2=os.getenv('SHOPIFY_HTTP2', 'true').lower() == 'true',
+            db_dir=os.getenv('ANALYTICS_DB_DIR') or None,
+            snapshot_interval=float(os.getenv('ANALYTICS_SNAPSHOT_INTERVAL', '600'))
+        )
+    
+    def get_client(self, host: str) -> httpx.AsyncClient:
+        """
+        Get the persistent client for a shop host, creating it on first use
+        
+        Args:
+            host: Shop domain, e.g. 'example.myshopify.com'
+        """
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            stats = self._stats.setdefault(host, {
+                'requests': 0,
+                'responses': 0,
+                'error_responses': 0,
+                'clients_created': 0,
+                'last_used': None
+            })
+            stats['clients_created'] += 1
+            
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                transport=self.transport,
+                event_hooks={
+                    'request': [self._make_request_hook(stats)],
+                    'response': [self._make_response_hook(stats)]
+                }
+            )
+            self._clients[host] = client
+            logger.info(f"Opened HTTP client for {host} (http2={self.http2})")
+        return client
+    
+    def get_rate_limiter(self, host: str) -> ShopifyRateLimiter:
+        """Get the rate limiter tracking a shop host's API call bucket"""
+        limiter = self._rate_limiters.get(host)
+        if limiter is None:
+            limiter = ShopifyRateLimiter.from_env()
+            self._rate_limiters[host] = limiter
+        return limiter
+    
+    def get_fetch_coalescer(self, host: str) -> FetchCoalescer:
+        """Get the coalescer sharing a shop host's in-flight fetches"""
+        coalescer = self._coalescers.get(host)
+        if coalescer is None:
+            coalescer = self._coalescers[host] = FetchCoalescer()
+        return coalescer
+    
+    def get_shop_database(self, host: str) -> Optional[ShopDatabase]:
+        """Get a shop host's on-disk analytics store, None without ANALYTICS_DB_DIR"""
+        if self.db_dir is None:
+            return None
+        
+        db = self._databases.get(host)
+        if db is None:
+            os.makedirs(self.db_dir, exist_ok=True)
+            db = self._databases[host] = ShopDatabase(ShopDatabase.path_for(self.db_dir, host))
+        return db
+    
+    def get_order_sync(self, host: str) -> OrderSync:
+        """Get a shop host's locally synced orders"""
+        sync = self._order_syncs.get(host)
+        if sync is None:
+            snapshot_path = None
+            if self.db_dir is not None:
+                snapshot_path = ShopDatabase.path_for(self.db_dir, host, '.orders.snapshot')
+            sync = self._order_syncs[host] = OrderSync(
+                self.get_shop_database(host), snapshot_path, self.snapshot_interval
+            )
+        return sync
+    
+    def get_resource_store(self, host: str, resource: str) -> ResourceStore:
+        """Get a shop host's local copy of 'inventory' or 'customers'"""
+        stores = self._resource_stores.setdefault(host, {})
+        store = stores.get(resource)
+        if store is None:
+            store = stores[resource] = ResourceStore(
+                RESOURCE_KEYS[resource], resource, self.get_shop_database(host)
+            )
+        return store
+    
+    def _make_request_hook(self, stats: Dict[str, Any]):
+        async def on_request(request: httpx.Request):
+            stats['requests'] += 1
+            stats['last_used'] = time.time()
+        return on_request
+    
+    def _make_response_hook(self, stats: Dict[str, Any]):
+        async def on_response(response: httpx.Response):
+            stats['responses'] += 1
+            if response.status_code >= 400:
+                stats['error_responses'] += 1
+        return on_response
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for monitoring"""
+        return {
+            'http2': self.http2,
+            'max_connections': self.limits.max_connections,
+            'max_keepalive_connections': self.limits.max_keepalive_connections,
+            'open_clients': sum(1 for c in self._clients.values() if not c.is_closed),
+            'hosts': {host: dict(stats) for host, stats in self._stats.items()},
+            'rate_limits': {host: limiter.stats() for host, limiter in self._rate_limiters.items()},
+            'coalesced_fetches': {host: coalescer.stats() for host, coalescer in self._coalescers.items()},
+            'order_sync': {host: sync.stats() for host, sync in self._order_syncs.items()},
+            'local_resources': {
+                host: {resource: store.stats() for resource, store in stores.items()}
+                for host, stores in self._resource_stores.items()
+            }
+        }
+    
+    async def aclose(self) -> None:
+        """Close every client in the pool"""
+        for host, client in list(self._clients.items()):
+            await client.aclose()
+            logger.info(f"Closed HTTP client for {host}")
+        self._clients.clear()
+        
+        for db in self._databases.values():
+            db.close()
+        self._databases.clear()
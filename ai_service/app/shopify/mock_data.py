@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+import random
+import threading
+import zlib
+
+from app.shopify.analytics import ShopAnalytics
+from app.shopify.order_store import OrderStore
+
+class MockShopifyData(ShopAnalytics):
+    """
+    Provides deterministic mock data for development and testing
+    Simulates realistic Shopify store data
+    
+    Instances are shared across requests through get_mock_data(), so the
+    generated data must be treated as read-only. The get_* methods always
+    return fresh rows that callers are free to modify. Orders are dated
+    relative to generated_at, and get_mock_data() regenerates a dataset
+    once its day has passed.
+    """
+    
+    def __init__(self, seed: Optional[int] = None):
+        self._rng = random.Random(seed)
+        self.generated_at = datetime.utcnow()
+        products = self._generate_products()
+        self.products = products
+        super().__init__(
+            orders=OrderStore.from_rows(self._generate_orders()),
+            inventory=self._generate_inventory(),
+            customers=self._generate_customers(),
+            products=products
+        )
+    
+    def _generate_products(self) -> List[Dict]:
+        """Generate sample products"""
+        return [
+            {'product_id': 1, 'product_title': 'Wireless Bluetooth Headphones', 'sku': 'WBH-001', 'price': 79.99},
+            {'product_id': 2, 'product_title': 'Organic Cotton T-Shirt', 'sku': 'OCT-001', 'price': 29.99},
+            {'product_id': 3, 'product_title': 'Stainless Steel Water Bottle', 'sku': 'SSWB-001', 'price': 24.99},
+            {'product_id': 4, 'product_title': 'Yoga Mat Pro', 'sku': 'YMP-001', 'price': 49.99},
+            {'product_id': 5, 'product_title': 'Smart Watch Series 5', 'sku': 'SWS5-001', 'price': 299.99},
+            {'product_id': 6, 'product_title': 'Leather Laptop Bag', 'sku': 'LLB-001', 'price': 89.99},
+            {'product_id': 7, 'product_title': 'Portable Phone Charger', 'sku': 'PPC-001', 'price': 34.99},
+            {'product_id': 8, 'product_title': 'Bamboo Sunglasses', 'sku': 'BS-001', 'price': 59.99},
+            {'product_id': 9, 'product_title': 'Ceramic Coffee Mug Set', 'sku': 'CCMS-001', 'price': 39.99},
+            {'product_id': 10, 'product_title': 'Fitness Resistance Bands', 'sku': 'FRB-001', 'price': 19.99},
+        ]
+    
+    def _generate_orders(self) -> List[Dict]:
+        """Generate sample orders over the last 90 days"""
+        orders = []
+        now = self.generated_at
+        
+        # Generate orders with realistic distribution
+        for day in range(90):
+            date = now - timedelta(days=day)
+            
+            # More recent orders
+            num_orders = self._rng.randint(3, 8) if day < 30 else self._rng.randint(1, 4)
+            
+            for _ in range(num_orders):
+                product = self._rng.choice(self.products)
+                customer_id = self._rng.randint(1, 20)
+                quantity = self._rng.randint(1, 3)
+                
+                orders.append({
+                    'order_id': len(orders) + 1,
+                    'product_id': product['product_id'],
+                    'product_title': product['product_title'],
+                    'customer_id': customer_id,
+                    'customer_email': f'customer{customer_id}@email.com',
+                    'customer_name': f'Customer {customer_id}',
+                    'quantity': quantity,
+                    'total_price': product['price'] * quantity,
+                    'created_at': date.isoformat()
+                })
+        
+        return orders
+    
+    def _generate_customers(self) -> List[Dict]:
+        """Generate sample customers"""
+        names = [
+            'Sarah Johnson', 'Michael Chen', 'Emily Davis', 'James Wilson',
+            'Lisa Anderson', 'David Martinez', 'Jennifer Taylor', 'Robert Brown',
+            'Maria Garcia', 'William Lee', 'Amanda White', 'Christopher Moore',
+            'Jessica Thomas', 'Daniel Jackson', 'Ashley Harris', 'Matthew Martin',
+            'Stephanie Thompson', 'Andrew Robinson', 'Michelle Clark', 'Kevin Lewis'
+        ]
+        
+        return [
+            {
+                'customer_id': i + 1,
+                'customer_name': names[i],
+                'customer_email': f"{names[i].lower().replace(' ', '.')}@email.com"
+            }
+            for i in range(len(names))
+        ]
+    
+    def _generate_inventory(self) -> List[Dict]:
+        """Generate current inventory levels"""
+        inventory_levels = [45, 15, 78, 22, 12, 34, 56, 28, 41, 67]
+        
+        return [
+            {
+                'product_id': product['product_id'],
+                'product_title': product['product_title'],
+                'sku': product['sku'],
+                'quantity': inventory_levels[i]
+            }
+            for i, product in enumerate(self.products)
+        ]
+
+
+# Process-wide registry of mock datasets, one per store
+_datasets: Dict[str, MockShopifyData] = {}
+_datasets_lock = threading.Lock()
+
+
+def _seed_for_store(store_id: str) -> int:
+    """Stable seed so a store gets the same data in every process"""
+    return zlib.crc32(store_id.encode('utf-8'))
+
+
+def get_mock_data(store_id: str) -> MockShopifyData:
+    """
+    Get the shared mock dataset for a store, generating it on first use
+    and again on the first use of each later UTC day, so "last N days"
+    windows keep covering the data
+    
+    Args:
+        store_id: Store domain the dataset belongs to
+        
+    Returns:
+        MockShopifyData shared read-only by every request for this store
+    """
+    today = datetime.utcnow().date()
+    dataset = _datasets.get(store_id)
+    if dataset is None or dataset.generated_at.date() != today:
+        with _datasets_lock:
+            dataset = _datasets.get(store_id)
+            if dataset is None or dataset.generated_at.date() != today:
+                dataset = MockShopifyData(seed=_seed_for_store(store_id))
+                _datasets[store_id] = dataset
+    return dataset
+
+
+def reset_mock_data() -> None:
+    """Drop all cached datasets (mainly for tests)"""
+    with _datasets_lock:
+        _datasets.clear()
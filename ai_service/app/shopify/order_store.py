@@ -0,0 +1,299 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Set
+
+from app.shopify.rollups import DailyRollups, day_of
+
+# Stand-in for missing ids (e.g. guest checkouts) in integer columns
+NULL_ID = -1
+
+def to_epoch(value: Any) -> float:
+    """Convert an ISO timestamp or datetime to epoch seconds, naive values are UTC"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def from_epoch(timestamp: float) -> str:
+    """Convert epoch seconds back to a naive UTC ISO timestamp"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
+
+def to_utc_iso(value: Any) -> str:
+    """
+    ISO timestamp with an explicit +00:00 offset, naive values are UTC
+    
+    Use for timestamps sent to Shopify, which reads ones without an
+    offset in the shop's own timezone.
+    """
+    return datetime.fromtimestamp(to_epoch(value), timezone.utc).isoformat()
+
+class StringDictionary:
+    """
+    Dictionary encoding for repeated strings
+    
+    Each distinct value is stored once and rows keep its integer code.
+    """
+    
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self._codes: Dict[Optional[str], int] = {}
+    
+    def encode(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+    
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code]
+    
+    def codes_containing(self, needles: Iterable[str]) -> Set[int]:
+        """Codes of values containing any of the needles, case-insensitive"""
+        needles = [n.lower() for n in needles]
+        return {
+            code for code, value in enumerate(self.values)
+            if value and any(n in value.lower() for n in needles)
+        }
+    
+    def __len__(self) -> int:
+        return len(self.values)
+
+class OrderStore:
+    """
+    Columnar store of order line items
+    
+    Each field is a typed array with one entry per line item instead of a
+    dict per row. Product titles, customer emails and customer names are
+    dictionary-encoded, and created_at is kept as epoch seconds.
+    
+    Rows are kept sorted by created_at, so a date window is found with a
+    binary search and returned as a range of row indices instead of
+    scanning every row. Filters work on the dictionaries first (e.g. a
+    title match is decided once per distinct title) and then on the
+    integer codes.
+    
+    Columns may also be read-only memoryviews over a memory-mapped
+    snapshot (see from_buffers). They are copied into private arrays on
+    the first change.
+    
+    Daily rollups (see rollups()) are built on first use and then kept
+    current by every append and removal.
+    """
+    
+    # Column attribute and array typecode, in _columns() order
+    COLUMNS = (
+        ('order_ids', 'q'), ('product_ids', 'q'), ('customer_ids', 'q'), ('quantities', 'q'),
+        ('prices', 'd'), ('created_at', 'd'), ('title_codes', 'l'), ('email_codes', 'l'), ('name_codes', 'l')
+    )
+    
+    def __init__(self):
+        self.order_ids = array('q')
+        self.product_ids = array('q')
+        self.customer_ids = array('q')
+        self.quantities = array('q')
+        self.prices = array('d')
+        self.created_at = array('d')
+        self.title_codes = array('l')
+        self.email_codes = array('l')
+        self.name_codes = array('l')
+        
+        self.titles = StringDictionary()
+        self.emails = StringDictionary()
+        self.names = StringDictionary()
+        
+        self._sorted = True
+        self.mapped = False
+        self._rollups: Optional[DailyRollups] = None
+    
+    def _columns(self) -> List[Sequence]:
+        return [getattr(self, name) for name, _ in self.COLUMNS]
+    
+    @classmethod
+    def from_buffers(cls, columns: Dict[str, memoryview], titles: List[Optional[str]],
+                     emails: List[Optional[str]], names: List[Optional[str]]) -> 'OrderStore':
+        """
+        Build a store over existing column buffers without copying them
+        
+        Args:
+            columns: Typed memoryview per column attribute, rows sorted by created_at
+            titles: Product title dictionary values, in code order
+            emails: Customer email dictionary values, in code order
+            names: Customer name dictionary values, in code order
+        """
+        store = cls()
+        for name, _ in cls.COLUMNS:
+            setattr(store, name, columns[name])
+        for dictionary, values in ((store.titles, titles), (store.emails, emails), (store.names, names)):
+            for value in values:
+                dictionary.encode(value)
+        store.mapped = True
+        return store
+    
+    def _make_writable(self) -> None:
+        """Copy memory-mapped columns into private arrays before the first change"""
+        if not self.mapped:
+            return
+        for name, typecode in self.COLUMNS:
+            column = array(typecode)
+            column.frombytes(_raw(getattr(self, name)))
+            setattr(self, name, column)
+        self.mapped = False
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'OrderStore':
+        """Build a store from order line item dicts"""
+        store = cls()
+        store.extend(rows)
+        return store
+    
+    def append(self, row: Dict[str, Any]) -> None:
+        """Add one line item in the row format produced by _fetch_orders"""
+        self._make_writable()
+        created_at = to_epoch(row['created_at'])
+        if self._sorted and self.created_at and created_at < self.created_at[-1]:
+            self._sorted = False
+        
+        self.order_ids.append(_id(row.get('order_id')))
+        self.product_ids.append(_id(row.get('product_id')))
+        self.customer_ids.append(_id(row.get('customer_id')))
+        self.quantities.append(int(row.get('quantity') or 0))
+        self.prices.append(float(row.get('total_price') or 0))
+        self.created_at.append(created_at)
+        self.title_codes.append(self.titles.encode(row.get('product_title')))
+        self.email_codes.append(self.emails.encode(row.get('customer_email')))
+        self.name_codes.append(self.names.encode(row.get('customer_name')))
+        if self._rollups is not None:
+            self._rollups.touch(day_of(created_at))
+    
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self.append(row)
+        self._ensure_sorted()
+    
+    def remove_orders(self, order_ids: Iterable[Any]) -> None:
+        """Drop every line item of the given orders"""
+        ids = {_id(order_id) for order_id in order_ids}
+        keep = [i for i, order_id in enumerate(self.order_ids) if order_id not in ids]
+        if len(keep) == len(self):
+            return
+        
+        if self._rollups is not None:
+            for i, order_id in enumerate(self.order_ids):
+                if order_id in ids:
+                    self._rollups.touch(day_of(self.created_at[i]))
+        
+        self._make_writable()
+        for column in self._columns():
+            column[:] = array(column.typecode, [column[i] for i in keep])
+    
+    def upsert(self, rows: Iterable[Dict[str, Any]], order_ids: Iterable[Any] = ()) -> None:
+        """
+        Replace the line items of changed orders
+        
+        Args:
+            rows: Current line item rows of the changed orders
+            order_ids: Changed orders, including any that no longer have line items
+        """
+        rows = list(rows)
+        self.remove_orders({row['order_id'] for row in rows} | set(order_ids))
+        self.extend(rows)
+    
+    def __len__(self) -> int:
+        return len(self.order_ids)
+    
+    def _ensure_sorted(self) -> None:
+        """Reorder every column by created_at after out-of-order appends"""
+        if self._sorted:
+            return
+        
+        # Stable, so rows with equal timestamps keep their insertion order
+        order = sorted(range(len(self)), key=self.created_at.__getitem__)
+        for column in self._columns():
+            column[:] = array(column.typecode, [column[i] for i in order])
+        self._sorted = True
+    
+    def window(self, since: Optional[float] = None, until: Optional[float] = None) -> range:
+        """
+        Row indices created in [since, until), found by binary search
+        
+        Args:
+            since: Epoch timestamp of the window start, None for no lower bound
+            until: Epoch timestamp of the window end, None for no upper bound
+        """
+        self._ensure_sorted()
+        start = 0 if since is None else bisect_left(self.created_at, since)
+        end = len(self) if until is None else bisect_left(self.created_at, until)
+        return range(start, max(start, end))
+    
+    def select(self, since: Optional[float] = None, until: Optional[float] = None,
+               title_codes: Optional[Set[int]] = None) -> Sequence[int]:
+        """
+        Row indices matching the filters
+        
+        Args:
+            since: Keep rows created at or after this epoch timestamp
+            until: Keep rows created before this epoch timestamp
+            title_codes: Keep rows whose product title code is in this set
+        """
+        indices = self.window(since, until)
+        
+        if title_codes is not None:
+            codes = self.title_codes
+            return [i for i in indices if codes[i] in title_codes]
+        
+        return indices
+    
+    def subset(self, since: Optional[float] = None, until: Optional[float] = None) -> 'OrderStore':
+        """Rows created in [since, until) as a new store sharing the string dictionaries"""
+        indices = self.window(since, until)
+        subset = OrderStore()
+        for column, source in zip(subset._columns(), self._columns()):
+            column.frombytes(_raw(source)[indices.start * column.itemsize:indices.stop * column.itemsize])
+        subset.titles, subset.emails, subset.names = self.titles, self.emails, self.names
+        if self._rollups is not None:
+            subset._rollups = self._rollups.subset(subset, since, until)
+        return subset
+    
+    def rollups(self) -> DailyRollups:
+        """Daily rollups of the rows, built on first use"""
+        if self._rollups is None:
+            self._rollups = DailyRollups.build(self)
+        return self._rollups
+    
+    def row(self, i: int) -> Dict[str, Any]:
+        """Materialize one line item as a dict"""
+        return {
+            'order_id': _null(self.order_ids[i]),
+            'product_id': _null(self.product_ids[i]),
+            'product_title': self.titles.decode(self.title_codes[i]),
+            'customer_id': _null(self.customer_ids[i]),
+            'customer_email': self.emails.decode(self.email_codes[i]),
+            'customer_name': self.names.decode(self.name_codes[i]),
+            'quantity': self.quantities[i],
+            'total_price': self.prices[i],
+            'created_at': from_epoch(self.created_at[i])
+        }
+    
+    def iter_rows(self, indices: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        self._ensure_sorted()
+        for i in (range(len(self)) if indices is None else indices):
+            yield self.row(i)
+    
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return list(self.iter_rows())
+
+def _raw(column: Sequence) -> memoryview:
+    """Byte view of an array or typed memoryview column"""
+    return memoryview(column).cast('B')
+
+def _id(value: Any) -> int:
+    return NULL_ID if value is None else int(value)
+
+def _null(value: int) -> Optional[int]:
+    return None if value == NULL_ID else value
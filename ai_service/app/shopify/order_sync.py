@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.shopify.order_store import OrderStore, from_epoch, to_utc_iso
+from app.shopify.shop_db import ShopDatabase
+from app.shopify.snapshot import open_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Re-read changes this far before the high-water mark, so clock skew
+# between us and Shopify cannot drop an update; upserts are idempotent
+MARK_OVERLAP = timedelta(minutes=1)
+
+class OrderSync:
+    """
+    A shop's local copy of its orders, kept current incrementally
+    
+    orders holds every order created at or after since, as of the
+    updated_at_min high-water mark. A question whose window is covered
+    only fetches orders updated since the mark and merges them in; a
+    wider window first backfills the missing created_at range. Callers
+    hold lock while syncing so concurrent syncs of a shop do not interleave.
+    
+    Webhook deltas are upserted directly, and while fresh() the orders
+    held are served without asking Shopify for changes.
+    
+    With a ShopDatabase every change is also written to disk, and load()
+    restores the orders and the mark in a restarted process, so only the
+    changes since then are fetched.
+    
+    With a snapshot path, load() prefers memory-mapping the columnar
+    snapshot over reading the database, so a new worker is ready at once
+    and shares the snapshot's pages with the other workers. The snapshot
+    is rewritten after the covered window changes and otherwise at most
+    every snapshot_interval seconds, which bounds the changes a new
+    worker has to fetch.
+    
+    Args:
+        db: Optional on-disk store of the shop
+        snapshot_path: Optional orders snapshot file of the shop
+        snapshot_interval: Minimum seconds between snapshot rewrites
+    """
+    
+    def __init__(self, db: Optional[ShopDatabase] = None, snapshot_path: Optional[str] = None,
+                 snapshot_interval: float = 600.0):
+        self.db = db
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._loaded = db is None and snapshot_path is None
+        self._snapshot_since: Optional[float] = None
+        self._snapshot_written_at = 0.0
+        self.orders = OrderStore()
+        self.since: Optional[float] = None
+        self.updated_at_min: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+        # Keeps webhook writes to the database in arrival order
+        self._writes = asyncio.Lock()
+        
+        self.backfills = 0
+        self.incremental_syncs = 0
+        self.deltas = 0
+    
+    async def load(self) -> None:
+        """Restore the orders persisted by an earlier process, once"""
+        if self._loaded:
+            return
+        self._loaded = True
+        
+        state = await asyncio.to_thread(self.db.get_state) if self.db is not None else {}
+        stored_since = state.get('orders_since')
+        
+        snapshot = await asyncio.to_thread(open_snapshot, self.snapshot_path) if self.snapshot_path else None
+        if snapshot is not None:
+            orders, header = snapshot
+            # The database may cover a wider window if the snapshot is older
+            if stored_since is None or header['since'] <= float(stored_since):
+                self.orders = orders
+                self.since = self._snapshot_since = header['since']
+                self.updated_at_min = header['updated_at_min']
+                self._snapshot_written_at = header['written_at']
+                logger.info(f"Mapped {len(orders)} order line items from {self.snapshot_path}")
+                return
+        
+        if stored_since is None or state.get('orders_updated_at_min') is None:
+            return
+        
+        rows = await asyncio.to_thread(self.db.load_orders)
+        self.orders = OrderStore.from_rows(rows)
+        self.since = float(state['orders_since'])
+        self.updated_at_min = state['orders_updated_at_min']
+        logger.info(f"Loaded {len(self.orders)} order line items from {self.db.path}")
+    
+    async def save(self) -> None:
+        """Persist the covered window and the mark, and the snapshot when it is due"""
+        if self.db is not None:
+            await asyncio.to_thread(
+                self.db.set_state, orders_since=self.since, orders_updated_at_min=self.updated_at_min
+            )
+        
+        if self.snapshot_path is None or self.since is None or self.updated_at_min is None:
+            return
+        if self._snapshot_since == self.since and time.time() - self._snapshot_written_at < self.snapshot_interval:
+            return
+        
+        # Write a private copy so changes made meanwhile cannot tear the snapshot
+        orders = self.orders.subset()
+        await asyncio.to_thread(write_snapshot, self.snapshot_path, orders, self.since, self.updated_at_min)
+        self._snapshot_since = self.since
+        self._snapshot_written_at = time.time()
+        logger.info(f"Wrote {len(orders)} order line items to {self.snapshot_path}")
+    
+    async def merge(self, rows: List[Dict[str, Any]], order_ids: List[Any]) -> None:
+        """Upsert fetched orders, see OrderStore.upsert"""
+        self.orders.upsert(rows, order_ids)
+        if self.db is not None:
+            await asyncio.to_thread(self.db.upsert_orders, rows, order_ids)
+    
+    def covers(self, since: float) -> bool:
+        """Whether every order created at or after since is held locally"""
+        return self.since is not None and self.since <= since
+    
+    def fresh(self, max_age: float) -> bool:
+        """Whether the mark advanced within max_age seconds"""
+        return self.synced_at is not None and time.monotonic() - self.synced_at < max_age
+    
+    @staticmethod
+    def next_mark(started_at: datetime) -> str:
+        """High-water mark for a sync that started at started_at, with its UTC offset"""
+        return to_utc_iso(started_at - MARK_OVERLAP)
+    
+    def advance(self, started_at: datetime) -> None:
+        """Record that every change before started_at is held"""
+        self.updated_at_min = self.next_mark(started_at)
+        self.synced_at = time.monotonic()
+    
+    async def replace(self, orders: OrderStore, since: float, started_at: datetime) -> None:
+        """Take over a complete fetch, started at started_at, of the orders created at or after since"""
+        self.orders = orders
+        self.since = since
+        self.advance(started_at)
+        if self.db is not None:
+            await asyncio.to_thread(self.db.replace_orders, list(orders.iter_rows()))
+        await self.save()
+    
+    async def apply(self, rows: List[Dict[str, Any]], order_id: Any) -> None:
+        """Upsert one order delivered by a webhook, ignored until orders are held"""
+        if self.since is None:
+            return
+        self.orders.upsert(rows, [order_id])
+        self.deltas += 1
+        if self.db is not None:
+            async with self._writes:
+                await asyncio.to_thread(self.db.upsert_orders, rows, [order_id])
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'line_items': len(self.orders),
+            'since': from_epoch(self.since) if self.since is not None else None,
+            'updated_at_min': self.updated_at_min,
+            'backfills': self.backfills,
+            'incremental_syncs': self.incremental_syncs,
+            'deltas': self.deltas
+        }
@@ -0,0 +1,693 @@
+import heapq
+import re
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Callable, Optional, Sequence, Set, Tuple
+
+from app.shopify.order_store import OrderStore, StringDictionary, to_epoch, from_epoch, NULL_ID
+
+SECONDS_PER_DAY = 86400
+
+DATE_LITERAL_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+AGGREGATES = {'SUM', 'COUNT', 'AVG', 'MIN', 'MAX'}
+
+KEYWORDS = {
+    'SELECT', 'FROM', 'WHERE', 'GROUP', 'BY', 'HAVING', 'ORDER', 'LIMIT', 'AS', 'AND', 'OR',
+    'NOT', 'LIKE', 'IN', 'BETWEEN', 'ASC', 'DESC', 'DISTINCT', 'JOIN', 'ON', 'SINCE', 'UNTIL'
+}
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^']|'')*')
+      | (?P<number>\d+(?:\.\d+)?)
+      | (?P<op><=|>=|!=|<>|=|<|>)
+      | (?P<punct>[(),*])
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)?)
+    )""", re.VERBOSE)
+
+class UnsupportedQueryError(Exception):
+    """Raised when a query uses syntax or columns the local engine cannot run"""
+
+# Parsing
+
+def tokenize(query: str) -> List[Tuple[str, Any]]:
+    """Split a query into (kind, value) tokens"""
+    tokens = []
+    position = 0
+    query = query.strip().rstrip(';')
+    
+    while position < len(query):
+        match = TOKEN_RE.match(query, position)
+        if not match or match.end() == position:
+            if query[position:].strip() == '':
+                break
+            raise UnsupportedQueryError(f"Unexpected input at: {query[position:position + 20]!r}")
+        position = match.end()
+        
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'string':
+            tokens.append(('string', text[1:-1].replace("''", "'")))
+        elif kind == 'number':
+            tokens.append(('number', float(text) if '.' in text else int(text)))
+        elif kind == 'name' and text.upper() in KEYWORDS:
+            tokens.append(('keyword', text.upper()))
+        elif kind == 'name':
+            # Drop table aliases, e.g. p.product_id -> product_id
+            tokens.append(('name', text.rsplit('.', 1)[-1].lower()))
+        else:
+            tokens.append((kind, text))
+    
+    return tokens
+
+class _Parser:
+    """Recursive descent parser for single-table ShopifyQL SELECT queries"""
+    
+    def __init__(self, query: str):
+        self.tokens = tokenize(query)
+        self.position = 0
+    
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Any]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+    
+    def next(self) -> Tuple[Optional[str], Any]:
+        token = self.peek()
+        self.position += 1
+        return token
+    
+    def accept(self, kind: str, value: Any = None) -> bool:
+        token_kind, token_value = self.peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.position += 1
+            return True
+        return False
+    
+    def expect(self, kind: str, value: Any = None) -> Any:
+        token_kind, token_value = self.next()
+        if token_kind != kind or (value is not None and token_value != value):
+            raise UnsupportedQueryError(f"Expected {value or kind}, found {token_value!r}")
+        return token_value
+    
+    def parse(self) -> Dict[str, Any]:
+        self.expect('keyword', 'SELECT')
+        select = [self.select_item()]
+        while self.accept('punct', ','):
+            select.append(self.select_item())
+        
+        self.expect('keyword', 'FROM')
+        table = self.expect('name')
+        if self.peek()[0] == 'name':
+            self.next()  # table alias
+        if self.peek() == ('keyword', 'JOIN'):
+            raise UnsupportedQueryError("JOIN is not supported")
+        
+        query = {
+            'select': select,
+            'table': table,
+            'where': [],
+            'group_by': [],
+            'having': [],
+            'order_by': [],
+            'limit': None
+        }
+        
+        if self.accept('keyword', 'WHERE'):
+            query['where'] = self.conditions()
+        if self.accept('keyword', 'GROUP'):
+            self.expect('keyword', 'BY')
+            query['group_by'] = [self.expression()]
+            while self.accept('punct', ','):
+                query['group_by'].append(self.expression())
+        if self.accept('keyword', 'HAVING'):
+            query['having'] = self.conditions()
+        if self.accept('keyword', 'ORDER'):
+            self.expect('keyword', 'BY')
+            query['order_by'] = [self.order_item()]
+            while self.accept('punct', ','):
+                query['order_by'].append(self.order_item())
+        if self.accept('keyword', 'LIMIT'):
+            limit = self.expect('number')
+            if not isinstance(limit, int) or limit < 0:
+                raise UnsupportedQueryError(f"LIMIT must be a non-negative integer, got {limit!r}")
+            query['limit'] = limit
+        
+        if self.peek()[0] is not None:
+            raise UnsupportedQueryError(f"Unexpected {self.peek()[1]!r}")
+        return query
+    
+    def expression(self) -> Dict[str, Any]:
+        """Column, DATE(column) or aggregate"""
+        kind, value = self.next()
+        if kind == 'punct' and value == '*':
+            return {'type': 'star'}
+        if kind != 'name':
+            raise UnsupportedQueryError(f"Unsupported expression {value!r}")
+        
+        if not self.accept('punct', '('):
+            return {'type': 'column', 'column': value}
+        
+        function = value.upper()
+        if self.peek() == ('keyword', 'SELECT'):
+            raise UnsupportedQueryError("Subqueries are not supported")
+        
+        distinct = self.accept('keyword', 'DISTINCT')
+        if self.accept('punct', '*'):
+            argument = '*'
+        else:
+            argument = self.expect('name')
+        self.expect('punct', ')')
+        
+        if function in AGGREGATES:
+            return {'type': 'aggregate', 'function': function, 'column': argument, 'distinct': distinct}
+        if function == 'DATE' and argument != '*':
+            return {'type': 'date', 'column': argument}
+        raise UnsupportedQueryError(f"Unsupported function {function}")
+    
+    def select_item(self) -> Dict[str, Any]:
+        expression = self.expression()
+        if self.accept('keyword', 'AS'):
+            expression['alias'] = self.expect('name')
+        elif self.peek()[0] == 'name':
+            expression['alias'] = self.next()[1]
+        return expression
+    
+    def order_item(self) -> Dict[str, Any]:
+        expression = self.expression()
+        descending = False
+        if self.accept('keyword', 'DESC'):
+            descending = True
+        else:
+            self.accept('keyword', 'ASC')
+        return {'expression': expression, 'descending': descending}
+    
+    def literal(self) -> Any:
+        kind, value = self.next()
+        if kind not in ('string', 'number'):
+            raise UnsupportedQueryError(f"Expected a literal, found {value!r}")
+        return value
+    
+    def conditions(self) -> List[Dict[str, Any]]:
+        conditions = [self.condition()]
+        while self.accept('keyword', 'AND'):
+            conditions.append(self.condition())
+        if self.peek() == ('keyword', 'OR'):
+            raise UnsupportedQueryError("OR is not supported")
+        return conditions
+    
+    def condition(self) -> Dict[str, Any]:
+        if self.peek() == ('punct', '('):
+            raise UnsupportedQueryError("Grouped conditions are not supported")
+        
+        expression = self.expression()
+        negate = self.accept('keyword', 'NOT')
+        
+        if self.accept('keyword', 'LIKE'):
+            return {'expression': expression, 'op': 'NOT LIKE' if negate else 'LIKE', 'value': self.literal()}
+        
+        if self.accept('keyword', 'IN'):
+            self.expect('punct', '(')
+            values = [self.literal()]
+            while self.accept('punct', ','):
+                values.append(self.literal())
+            self.expect('punct', ')')
+            return {'expression': expression, 'op': 'NOT IN' if negate else 'IN', 'value': values}
+        
+        if self.accept('keyword', 'BETWEEN') and not negate:
+            low = self.literal()
+            self.expect('keyword', 'AND')
+            return {'expression': expression, 'op': 'BETWEEN', 'value': (low, self.literal())}
+        
+        if negate:
+            raise UnsupportedQueryError("Unsupported NOT condition")
+        
+        op = self.expect('op')
+        return {'expression': expression, 'op': '!=' if op == '<>' else op, 'value': self.literal()}
+
+def parse_query(query: str) -> Dict[str, Any]:
+    """Parse a ShopifyQL query into a plan dict, raising UnsupportedQueryError"""
+    return _Parser(query or '').parse()
+
+def expression_key(expression: Dict[str, Any]) -> str:
+    """Canonical text of an expression, used to match SELECT, HAVING and ORDER BY"""
+    if expression['type'] == 'aggregate':
+        distinct = 'DISTINCT ' if expression.get('distinct') else ''
+        return f"{expression['function']}({distinct}{expression['column']})"
+    if expression['type'] == 'date':
+        return f"DATE({expression['column']})"
+    if expression['type'] == 'star':
+        return '*'
+    return expression['column']
+
+# Tables
+
+class _Mapped:
+    """Read-only sequence applying fn to another sequence on access"""
+    
+    def __init__(self, values: Sequence, fn: Callable[[Any], Any]):
+        self.values = values
+        self.fn = fn
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def __getitem__(self, i: int) -> Any:
+        return self.fn(self.values[i])
+
+class _Column:
+    """
+    A table column as the engine sees it
+    
+    Args:
+        values: Raw value per row (codes for dictionary-encoded columns)
+        dictionary: Decoder for dictionary-encoded columns
+        to_output: Converts a raw value to its result form
+        from_literal: Converts a query literal to a comparable raw value
+    """
+    
+    def __init__(self, values: Sequence, dictionary: Optional[StringDictionary] = None,
+                 to_output: Optional[Callable[[Any], Any]] = None,
+                 from_literal: Optional[Callable[[Any], Any]] = None):
+        self.values = values
+        self.dictionary = dictionary
+        self.to_output = to_output or (lambda v: v)
+        self.from_literal = from_literal or (lambda v: v)
+    
+    def output(self, raw: Any) -> Any:
+        if self.dictionary is not None:
+            return self.dictionary.decode(raw)
+        return self.to_output(raw)
+
+def _null_id(value: int) -> Optional[int]:
+    return None if value == NULL_ID else value
+
+def _to_number(value: Any) -> Any:
+    """Numeric literal for a numeric column, quoted numbers included"""
+    if isinstance(value, str):
+        return int(value) if value.strip().lstrip('-').isdigit() else float(value)
+    return value
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _day_to_date(day: int) -> str:
+    return datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc).date().isoformat()
+
+def _literal_to_day(value: Any) -> int:
+    return int(to_epoch(value) // SECONDS_PER_DAY)
+
+class _OrdersTable:
+    """Engine view of an OrderStore"""
+    
+    def __init__(self, store: OrderStore):
+        self.store = store
+        self.columns = {
+            'order_id': _Column(store.order_ids, to_output=_null_id, from_literal=_to_number),
+            'product_id': _Column(store.product_ids, to_output=_null_id, from_literal=_to_number),
+            'product_title': _Column(store.title_codes, dictionary=store.titles),
+            'customer_id': _Column(store.customer_ids, to_output=_null_id, from_literal=_to_number),
+            'customer_email': _Column(store.email_codes, dictionary=store.emails),
+            'customer_name': _Column(store.name_codes, dictionary=store.names),
+            'quantity': _Column(store.quantities, from_literal=_to_number),
+            'total_price': _Column(store.prices, from_literal=_to_number),
+            'created_at': _Column(store.created_at, to_output=from_epoch, from_literal=to_epoch)
+        }
+    
+    def rows(self, since: Optional[float], until: Optional[float]) -> Sequence[int]:
+        return self.store.window(since, until)
+
+class _ListTable:
+    """Engine view of a list of row dicts (products, inventory, customers)"""
+    
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self._rows = rows
+        names = []
+        for row in rows:
+            names.extend(name for name in row if name not in names)
+        self.columns = {}
+        for name in names:
+            values = [row.get(name) for row in rows]
+            present = [v for v in values if v is not None]
+            numeric = bool(present) and all(_is_number(v) for v in present)
+            self.columns[name] = _Column(values, from_literal=_to_number if numeric else None)
+    
+    def rows(self, since: Optional[float], until: Optional[float]) -> Sequence[int]:
+        return range(len(self._rows))
+
+# Evaluation
+
+def _like_to_regex(pattern: str) -> 're.Pattern':
+    parts = ['.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in pattern]
+    return re.compile('^' + ''.join(parts) + '$', re.IGNORECASE | re.DOTALL)
+
+def _make_predicate(op: str, value: Any) -> Callable[[Any], bool]:
+    """
+    Predicate over a single (already converted) value
+    
+    Comparing values of different types raises UnsupportedQueryError.
+    """
+    predicate = _predicate(op, value)
+    
+    def checked(v: Any) -> bool:
+        try:
+            return predicate(v)
+        except TypeError:
+            raise UnsupportedQueryError(f"Cannot compare {v!r} with {value!r}")
+    return checked
+
+def _predicate(op: str, value: Any) -> Callable[[Any], bool]:
+    if op == 'LIKE':
+        regex = _like_to_regex(value)
+        return lambda v: v is not None and regex.match(str(v)) is not None
+    if op == 'NOT LIKE':
+        regex = _like_to_regex(value)
+        return lambda v: v is not None and regex.match(str(v)) is None
+    if op == 'IN':
+        values = set(value)
+        return lambda v: v in values
+    if op == 'NOT IN':
+        values = set(value)
+        return lambda v: v is not None and v not in values
+    if op == 'BETWEEN':
+        low, high = value
+        return lambda v: v is not None and low <= v <= high
+    
+    compare = {
+        '=': lambda v: v == value,
+        '!=': lambda v: v != value,
+        '<': lambda v: v < value,
+        '<=': lambda v: v <= value,
+        '>': lambda v: v > value,
+        '>=': lambda v: v >= value
+    }[op]
+    return lambda v: v is not None and compare(v)
+
+def _convert_literal(condition: Dict[str, Any], convert: Callable[[Any], Any]) -> Any:
+    value = condition['value']
+    if condition['op'] in ('LIKE', 'NOT LIKE'):
+        return value
+    try:
+        if isinstance(value, (list, tuple)):
+            return type(value)(convert(v) for v in value)
+        return convert(value)
+    except (TypeError, ValueError) as e:
+        raise UnsupportedQueryError(f"Cannot compare with {value!r}: {e}")
+
+class _Aggregate:
+    """Accumulator for one aggregate expression in one group"""
+    
+    __slots__ = ('function', 'total', 'count', 'seen', 'best')
+    
+    def __init__(self, function: str, distinct: bool):
+        self.function = function
+        self.total = 0
+        self.count = 0
+        self.seen: Optional[Set[Any]] = set() if distinct else None
+        self.best = None
+    
+    def add(self, value: Any) -> None:
+        if value is None:
+            return
+        if self.seen is not None:
+            if value in self.seen:
+                return
+            self.seen.add(value)
+        self.count += 1
+        if self.function in ('SUM', 'AVG'):
+            self.total += value
+        elif self.function == 'MIN' and (self.best is None or value < self.best):
+            self.best = value
+        elif self.function == 'MAX' and (self.best is None or value > self.best):
+            self.best = value
+    
+    def result(self) -> Any:
+        if self.function == 'COUNT':
+            return self.count
+        if self.function == 'SUM':
+            return self.total
+        if self.function == 'AVG':
+            return self.total / self.count if self.count else None
+        return self.best
+
+class QueryEngine:
+    """
+    Executes generated ShopifyQL against a shop's local data
+    
+    Supports single-table SELECT with column, DATE() and aggregate
+    (SUM/COUNT/AVG/MIN/MAX) expressions, WHERE/HAVING conditions joined by
+    AND, GROUP BY, ORDER BY and LIMIT. Anything else raises
+    UnsupportedQueryError so the caller can fall back.
+    
+    Plans run column-at-a-time: created_at bounds become a binary-searched
+    window over the time-sorted orders, predicates on dictionary-encoded
+    columns are decided once per distinct value, and groups are keyed on
+    raw codes that are only decoded for the output rows.
+    """
+    
+    def __init__(self, analytics):
+        self.analytics = analytics
+    
+    def _table(self, name: str):
+        if name in ('orders', 'order_line_items'):
+            return _OrdersTable(self.analytics.orders)
+        if name == 'products':
+            return _ListTable(self.analytics.products)
+        if name == 'inventory_levels':
+            return _ListTable(self.analytics.inventory)
+        if name == 'customers':
+            return _ListTable(self.analytics.customers)
+        raise UnsupportedQueryError(f"Unknown table '{name}'")
+    
+    def _column(self, table, expression: Dict[str, Any]) -> _Column:
+        """Resolve a column or DATE() expression against the table"""
+        column = table.columns.get(expression.get('column'))
+        if column is None:
+            raise UnsupportedQueryError(f"Unknown column '{expression.get('column')}'")
+        
+        if expression['type'] == 'date':
+            if column.from_literal is not to_epoch:
+                raise UnsupportedQueryError("DATE() needs a timestamp column")
+            return _Column(
+                _Mapped(column.values, lambda ts: int(ts // SECONDS_PER_DAY)),
+                to_output=_day_to_date,
+                from_literal=_literal_to_day
+            )
+        return column
+    
+    def execute(self, shopifyql: str) -> List[Dict[str, Any]]:
+        """Run a query and return result rows"""
+        query = parse_query(shopifyql)
+        table = self._table(query['table'])
+        
+        indices = self._filter(table, query['where'])
+        
+        has_aggregates = any(item['type'] == 'aggregate' for item in query['select'])
+        if has_aggregates or query['group_by']:
+            rows, hidden = self._aggregate(table, query, indices)
+        else:
+            rows, hidden = self._project(table, query, indices)
+        
+        rows = self._order(rows, query, query['limit'])
+        if query['limit'] is not None:
+            rows = rows[:query['limit']]
+        
+        if hidden:
+            for row in rows:
+                for name in hidden:
+                    row.pop(name, None)
+        return rows
+    
+    def _filter(self, table, conditions: List[Dict[str, Any]]) -> Sequence[int]:
+        """Row indices passing the WHERE clause"""
+        since = until = None
+        residual = []
+        
+        for condition in conditions:
+            expression = condition['expression']
+            if expression['type'] not in ('column', 'date'):
+                raise UnsupportedQueryError("Aggregates are not allowed in WHERE")
+            
+            # created_at bounds narrow the time window; `<= 'YYYY-MM-DD'` covers that whole day
+            op = condition['op']
+            if (expression['type'] == 'column' and expression['column'] == 'created_at'
+                    and isinstance(table, _OrdersTable)):
+                if op == '<=' and DATE_LITERAL_RE.match(str(condition['value'])):
+                    op = '<'
+                    bound = _convert_literal(condition, to_epoch) + SECONDS_PER_DAY
+                elif op in ('>=', '<'):
+                    bound = _convert_literal(condition, to_epoch)
+                else:
+                    residual.append(condition)
+                    continue
+                
+                if op == '>=':
+                    since = bound if since is None else max(since, bound)
+                else:
+                    until = bound if until is None else min(until, bound)
+                continue
+            residual.append(condition)
+        
+        indices: Sequence[int] = table.rows(since, until)
+        
+        for condition in residual:
+            column = self._column(table, condition['expression'])
+            values = column.values
+            
+            if column.dictionary is not None:
+                # Decide once per distinct value, then filter on codes
+                predicate = _make_predicate(condition['op'], condition['value'])
+                codes = {code for code, value in enumerate(column.dictionary.values) if predicate(value)}
+                indices = [i for i in indices if values[i] in codes]
+            else:
+                predicate = _make_predicate(condition['op'], _convert_literal(condition, column.from_literal))
+                indices = [i for i in indices if predicate(values[i])]
+        
+        return indices
+    
+    def _project(self, table, query: Dict[str, Any], indices: Sequence[int]):
+        """Rows for a query without aggregates"""
+        outputs = []
+        for item in query['select']:
+            if item['type'] == 'star':
+                outputs.extend((name, column) for name, column in table.columns.items())
+            else:
+                outputs.append((item.get('alias') or expression_key(item), self._column(table, item)))
+        
+        # ORDER BY may reference columns that are not selected
+        names = {name for name, _ in outputs}
+        hidden = []
+        for order in query['order_by']:
+            key = expression_key(order['expression'])
+            if key not in names and order['expression']['type'] in ('column', 'date'):
+                outputs.append((key, self._column(table, order['expression'])))
+                names.add(key)
+                hidden.append(key)
+        
+        rows = [
+            {name: column.output(column.values[i]) for name, column in outputs}
+            for i in indices
+        ]
+        return rows, hidden
+    
+    def _aggregate(self, table, query: Dict[str, Any], indices: Sequence[int]):
+        """Rows for a grouped or aggregate query"""
+        aliases = {item['alias']: item for item in query['select'] if item.get('alias')}
+        
+        group_exprs = [aliases.get(e['column'], e) if e['type'] == 'column' else e for e in query['group_by']]
+        group_columns = [self._column(table, e) for e in group_exprs]
+        group_keys = [expression_key(e) for e in group_exprs]
+        
+        # Output expressions, plus aggregates only used by HAVING / ORDER BY
+        outputs = []
+        for item in query['select']:
+            if item['type'] == 'star':
+                raise UnsupportedQueryError("SELECT * cannot be combined with aggregates")
+            outputs.append((item.get('alias') or expression_key(item), item))
+        
+        names = {expression_key(item): name for name, item in outputs}
+        names.update({name: name for name, _ in outputs})
+        hidden = []
+        for expression in [c['expression'] for c in query['having']] + [o['expression'] for o in query['order_by']]:
+            key = expression_key(expression)
+            if key not in names:
+                if expression['type'] == 'column':
+                    raise UnsupportedQueryError(f"Unknown column '{key}' in HAVING/ORDER BY")
+                outputs.append((key, expression))
+                names[key] = key
+                hidden.append(key)
+        
+        aggregates = [(name, item) for name, item in outputs if item['type'] == 'aggregate']
+        agg_columns = [
+            None if item['column'] == '*' else self._column(table, item)
+            for _, item in aggregates
+        ]
+        plain = [(name, item) for name, item in outputs if item['type'] != 'aggregate']
+        plain_columns = [self._column(table, item) for _, item in plain]
+        
+        # Aggregate over raw values; dictionary columns stay as codes unless
+        # MIN/MAX need the actual strings, and cannot be summed or averaged
+        agg_values = []
+        for (_, item), column in zip(aggregates, agg_columns):
+            if column is not None and column.dictionary is not None and item['function'] in ('SUM', 'AVG'):
+                raise UnsupportedQueryError(f"{item['function']} needs a numeric column, got '{item['column']}'")
+            if column is None:
+                agg_values.append(None)
+            elif column.dictionary is not None and item['function'] in ('MIN', 'MAX'):
+                agg_values.append(_Mapped(column.values, column.dictionary.decode))
+            else:
+                agg_values.append(column.values)
+        
+        group_values = [column.values for column in group_columns]
+        plain_values = [column.values for column in plain_columns]
+        
+        groups: Dict[tuple, Tuple[int, List[_Aggregate]]] = {}
+        for i in indices:
+            key = tuple(values[i] for values in group_values)
+            group = groups.get(key)
+            if group is None:
+                # The first row of a group supplies non-grouped columns
+                group = groups[key] = (i, [_Aggregate(item['function'], item['distinct']) for _, item in aggregates])
+            try:
+                for accumulator, values in zip(group[1], agg_values):
+                    accumulator.add(1 if values is None else values[i])
+            except TypeError:
+                raise UnsupportedQueryError("Aggregate over values of mismatched types")
+        
+        if not groups and not query['group_by']:
+            groups[()] = (None, [_Aggregate(item['function'], item['distinct']) for _, item in aggregates])
+        
+        rows = []
+        for key, (first, accumulators) in groups.items():
+            row = {}
+            for (name, item), column, values in zip(plain, plain_columns, plain_values):
+                key_position = group_keys.index(expression_key(item)) if expression_key(item) in group_keys else None
+                if key_position is not None:
+                    row[name] = group_columns[key_position].output(key[key_position])
+                else:
+                    row[name] = None if first is None else column.output(values[first])
+            for (name, item), column, accumulator in zip(aggregates, agg_columns, accumulators):
+                value = accumulator.result()
+                if column is not None and item['function'] in ('MIN', 'MAX') and column.dictionary is None:
+                    value = None if value is None else column.output(value)
+                row[name] = value
+            rows.append(row)
+        
+        rows = [row for row in rows if self._passes_having(row, query['having'], names)]
+        return rows, hidden
+    
+    def _passes_having(self, row: Dict[str, Any], having: List[Dict[str, Any]], names: Dict[str, str]) -> bool:
+        for condition in having:
+            value = row.get(names[expression_key(condition['expression'])])
+            if not _make_predicate(condition['op'], condition['value'])(value):
+                return False
+        return True
+    
+    def _order(self, rows: List[Dict[str, Any]], query: Dict[str, Any],
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Sort by ORDER BY keys, NULLs last, returning at least the first limit rows"""
+        aliases = {item.get('alias') or expression_key(item): item.get('alias') or expression_key(item)
+                   for item in query['select']}
+        for item in query['select']:
+            aliases[expression_key(item)] = item.get('alias') or expression_key(item)
+        
+        # One key with a LIMIT only needs the top rows, selected with a bounded heap
+        if limit is not None and len(query['order_by']) == 1:
+            order = query['order_by'][0]
+            key = expression_key(order['expression'])
+            name = aliases.get(key, key)
+            present = [row for row in rows if row.get(name) is not None]
+            select = heapq.nlargest if order['descending'] else heapq.nsmallest
+            top = select(limit, present, key=lambda row: row[name])
+            if len(top) < limit:
+                top += [row for row in rows if row.get(name) is None][:limit - len(top)]
+            return top
+        
+        # Stable sorts from the last key to the first give a multi-key sort
+        for order in reversed(query['order_by']):
+            key = expression_key(order['expression'])
+            name = aliases.get(key, key)
+            present = [row for row in rows if row.get(name) is not None]
+            missing = [row for row in rows if row.get(name) is None]
+            present.sort(key=lambda row: row[name], reverse=order['descending'])
+            rows = present + missing
+        return rows
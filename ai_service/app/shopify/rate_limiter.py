@@ -0,0 +1,215 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from typing import Dict, Any, List, Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Request priorities, lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+CALL_LIMIT_HEADER = 'X-Shopify-Shop-Api-Call-Limit'
+
+class ShopifyRateLimiter:
+    """
+    Per-shop request scheduler following Shopify's leaky bucket
+    
+    Shopify allows a burst of `bucket_size` calls that leaks at `leak_rate`
+    calls per second. The limiter mirrors the bucket locally, corrects it
+    from the X-Shopify-Shop-Api-Call-Limit header on every response and
+    holds callers back before the bucket overflows. Waiting callers are
+    served by priority, so interactive questions overtake background syncs.
+    
+    At most `max_concurrency` requests to the shop are in flight at once,
+    so a question fanning out over several resources cannot flood it.
+    
+    429 and 5xx responses are retried with jittered exponential backoff,
+    honouring Retry-After when Shopify sends it.
+    """
+    
+    def __init__(self, bucket_size: int = 40, leak_rate: float = 2.0, headroom: int = 2,
+                 max_retries: int = 4, base_backoff: float = 0.5, max_backoff: float = 20.0,
+                 max_concurrency: int = 8):
+        self.bucket_size = bucket_size
+        self.leak_rate = leak_rate
+        self.headroom = headroom
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_concurrency = max_concurrency
+        
+        self._level = 0.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._queue: List[List[int]] = []
+        self._sequence = itertools.count()
+        self._condition = asyncio.Condition()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        
+        self._stats = {
+            'requests': 0,
+            'throttled': 0,
+            'retries': 0,
+            'paced': 0
+        }
+    
+    @classmethod
+    def from_env(cls) -> 'ShopifyRateLimiter':
+        """Build a limiter from SHOPIFY_RATE_* environment variables"""
+        return cls(
+            bucket_size=int(os.getenv('SHOPIFY_RATE_BUCKET_SIZE', '40')),
+            leak_rate=float(os.getenv('SHOPIFY_RATE_LEAK_RATE', '2')),
+            headroom=int(os.getenv('SHOPIFY_RATE_HEADROOM', '2')),
+            max_retries=int(os.getenv('SHOPIFY_MAX_RETRIES', '4')),
+            max_concurrency=int(os.getenv('SHOPIFY_MAX_CONCURRENCY', '8'))
+        )
+    
+    def _current_level(self, now: float) -> float:
+        """Bucket level after leaking since the last update"""
+        return max(0.0, self._level - (now - self._updated) * self.leak_rate)
+    
+    def _delay_for(self, entry: List[int]) -> Optional[float]:
+        """
+        Seconds the entry must still wait, or None while it is not first in line
+        """
+        if self._queue[0] is not entry:
+            return None
+        
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        
+        overflow = self._current_level(now) + 1 - (self.bucket_size - self.headroom)
+        if overflow > 0:
+            return overflow / self.leak_rate
+        return 0.0
+    
+    async def acquire(self, priority: int = INTERACTIVE) -> None:
+        """Wait until a call can be sent without overflowing the bucket"""
+        entry = [priority, next(self._sequence)]
+        
+        async with self._condition:
+            heapq.heappush(self._queue, entry)
+            self._condition.notify_all()
+            paced = False
+            
+            try:
+                while True:
+                    delay = self._delay_for(entry)
+                    if delay == 0:
+                        break
+                    
+                    paced = paced or delay is not None
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._condition.notify_all()
+                raise
+            
+            heapq.heappop(self._queue)
+            now = time.monotonic()
+            self._level = self._current_level(now) + 1
+            self._updated = now
+            self._stats['requests'] += 1
+            if paced:
+                self._stats['paced'] += 1
+            self._condition.notify_all()
+    
+    def update_from_response(self, response: httpx.Response) -> Optional[float]:
+        """
+        Sync the local bucket with Shopify's view of it
+        
+        Returns:
+            Retry-After delay in seconds for throttled responses, else None
+        """
+        now = time.monotonic()
+        
+        call_limit = response.headers.get(CALL_LIMIT_HEADER)
+        if call_limit:
+            try:
+                used, size = call_limit.split('/')
+                self._level = float(used)
+                self.bucket_size = int(size)
+                self._updated = now
+            except ValueError:
+                logger.debug(f"Ignoring malformed {CALL_LIMIT_HEADER}: {call_limit}")
+        
+        if response.status_code != 429:
+            return None
+        
+        self._stats['throttled'] += 1
+        try:
+            retry_after = float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            retry_after = 1.0
+        
+        self._blocked_until = max(self._blocked_until, now + retry_after)
+        return retry_after
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+    
+    async def request(self, client: httpx.AsyncClient, method: str, url: str,
+                      priority: int = INTERACTIVE, **kwargs) -> httpx.Response:
+        """
+        Send a request through the scheduler, retrying throttling and server errors
+        
+        Args:
+            client: HTTP client to send with
+            method: HTTP method
+            url: Request URL
+            priority: INTERACTIVE or BACKGROUND
+            **kwargs: Passed through to client.request()
+        """
+        attempt = 0
+        while True:
+            await self.acquire(priority)
+            
+            try:
+                async with self._slots:
+                    self._in_flight += 1
+                    try:
+                        response = await client.request(method, url, **kwargs)
+                    finally:
+                        self._in_flight -= 1
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Shopify request failed ({e}), retrying in {delay:.1f}s")
+            else:
+                retry_after = self.update_from_response(response)
+                retryable = response.status_code == 429 or response.status_code >= 500
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                
+                # Throttled calls already wait out Retry-After in acquire()
+                delay = 0.0 if retry_after is not None else self._backoff(attempt)
+                logger.warning(f"Shopify returned {response.status_code}, retrying (attempt {attempt + 1})")
+            
+            attempt += 1
+            self._stats['retries'] += 1
+            if delay > 0:
+                await asyncio.sleep(delay)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Limiter statistics for monitoring"""
+        return {
+            **self._stats,
+            'bucket_size': self.bucket_size,
+            'bucket_level': round(self._current_level(time.monotonic()), 2),
+            'waiting': len(self._queue),
+            'in_flight': self._in_flight
+        }
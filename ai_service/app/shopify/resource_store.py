@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.shopify.shop_db import ShopDatabase
+
+logger = logging.getLogger(__name__)
+
+class ResourceStore:
+    """
+    A shop's local copy of a REST resource, rows grouped by their parent record
+    
+    A full fetch replaces every row; a webhook delta replaces the rows of
+    one record (e.g. the variants of one product). Rows are served
+    locally while fresh(), so reads between syncs do not call Shopify.
+    With a ShopDatabase the rows are also kept on disk and load() restores
+    them, with their age, in a restarted process.
+    
+    Args:
+        key: Row field identifying the parent record, e.g. 'product_id'
+        resource: Resource name in the database, 'inventory' or 'customers'
+        db: Optional on-disk store of the shop
+    """
+    
+    def __init__(self, key: str, resource: Optional[str] = None, db: Optional[ShopDatabase] = None):
+        self.key = key
+        self.resource = resource
+        self.db = db
+        self._loaded = db is None
+        self._rows: Dict[Any, List[Dict]] = {}
+        self.synced_at: Optional[float] = None
+        self.deltas = 0
+        # Keeps webhook writes to the database in arrival order
+        self._writes = asyncio.Lock()
+    
+    def fresh(self, max_age: float) -> bool:
+        """Whether a full fetch finished within max_age seconds"""
+        return self.synced_at is not None and time.monotonic() - self.synced_at < max_age
+    
+    def _take(self, rows: List[Dict], synced_at: float) -> None:
+        grouped: Dict[Any, List[Dict]] = {}
+        for row in rows:
+            grouped.setdefault(row[self.key], []).append(dict(row))
+        self._rows = grouped
+        self.synced_at = synced_at
+    
+    async def load(self) -> None:
+        """Restore the rows persisted by an earlier process, once"""
+        if self._loaded:
+            return
+        self._loaded = True
+        
+        stored = await asyncio.to_thread(self.db.load_resource, self.resource)
+        if stored is not None:
+            rows, synced_at = stored
+            # Carry the age over from wall-clock time to the monotonic clock
+            self._take(rows, time.monotonic() - max(0.0, time.time() - synced_at))
+            logger.info(f"Loaded {len(rows)} {self.resource} rows from {self.db.path}")
+    
+    async def replace(self, rows: List[Dict]) -> None:
+        """Take over the rows of a full fetch"""
+        self._take(rows, time.monotonic())
+        if self.db is not None:
+            await asyncio.to_thread(self.db.replace_resource, self.resource, rows, time.time())
+    
+    async def _write(self, write: Callable, *args: Any) -> None:
+        """Run a database write in a worker thread, after the earlier ones"""
+        async with self._writes:
+            await asyncio.to_thread(write, *args)
+    
+    async def upsert(self, key: Any, rows: List[Dict]) -> None:
+        """Replace one record's rows, ignored until a full fetch has been taken"""
+        if self.synced_at is None:
+            return
+        self._rows[key] = [dict(row) for row in rows]
+        self.deltas += 1
+        if self.db is not None:
+            await self._write(self.db.upsert_resource, self.resource, key, self.get(key))
+    
+    async def update_rows(self, field: str, value: Any, update: Callable[[Dict], None]) -> bool:
+        """
+        Apply update to every row whose field equals value
+        
+        Returns:
+            Whether any row matched
+        """
+        if self.synced_at is None:
+            return False
+        
+        changed = []
+        for key, rows in self._rows.items():
+            if any(row.get(field) == value for row in rows):
+                for row in rows:
+                    if row.get(field) == value:
+                        update(row)
+                changed.append(key)
+        
+        if not changed:
+            return False
+        self.deltas += 1
+        if self.db is not None:
+            for key in changed:
+                await self._write(self.db.upsert_resource, self.resource, key, self.get(key))
+        return True
+    
+    async def invalidate(self) -> None:
+        """Forget the local copy so the next read fetches it again"""
+        self._rows = {}
+        self.synced_at = None
+        if self.db is not None:
+            await self._write(self.db.clear_resource, self.resource)
+    
+    def get(self, key: Any) -> List[Dict]:
+        """Copies of one record's rows"""
+        return [dict(row) for row in self._rows.get(key, [])]
+    
+    def rows(self) -> List[Dict]:
+        """Callers' own copies of every row"""
+        return [dict(row) for rows in self._rows.values() for row in rows]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'records': len(self._rows),
+            'age': round(time.monotonic() - self.synced_at, 1) if self.synced_at is not None else None,
+            'deltas': self.deltas
+        }
@@ -0,0 +1,128 @@
+import math
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+SECONDS_PER_DAY = 86400
+
+def day_of(timestamp: float) -> int:
+    """UTC day number of an epoch timestamp"""
+    return int(timestamp // SECONDS_PER_DAY)
+
+class DailyRollups:
+    """
+    Per-day totals of an OrderStore's line items
+    
+    Each UTC day holds its line item count and revenue, units and revenue
+    per (product_id, title code), and line items and spend per customer
+    (with the customer's first email and name codes). Entries keep the
+    order of their first sale, so merging the days of a window in date
+    order gives the same totals and the same order as scanning its rows.
+    
+    The store marks the days its changes touch and only those days are
+    re-aggregated, from their rows, on the next read. A window answers
+    from one rollup per full day plus the rows of its partial first day,
+    so a year of sales is a few hundred rollups instead of every line item.
+    
+    Args:
+        orders: OrderStore the rollups summarize
+    """
+    
+    def __init__(self, orders):
+        self.orders = orders
+        self.days: Dict[int, Dict[str, Any]] = {}
+        self.dirty: Set[int] = set()
+        self.days_aggregated = 0
+    
+    @classmethod
+    def build(cls, orders) -> 'DailyRollups':
+        """Aggregate every day of orders in one pass over its rows"""
+        rollups = cls(orders)
+        created_at = orders.created_at
+        rows = orders.window()
+        start = rows.start
+        while start < rows.stop:
+            day = day_of(created_at[start])
+            end = bisect_left(created_at, (day + 1) * SECONDS_PER_DAY, start, rows.stop)
+            rollups.days[day] = rollups.aggregate(range(start, end))
+            start = end
+        return rollups
+    
+    def touch(self, day: int) -> None:
+        """Mark a day whose rows changed"""
+        self.dirty.add(day)
+    
+    def aggregate(self, indices: Sequence[int]) -> Dict[str, Any]:
+        """Totals of the given rows"""
+        self.days_aggregated += 1
+        orders = self.orders
+        products: Dict[Tuple[int, int], List] = {}
+        customers: Dict[int, List] = {}
+        revenue = 0
+        
+        for i in indices:
+            price = orders.prices[i]
+            revenue += price
+            
+            key = (orders.product_ids[i], orders.title_codes[i])
+            product = products.get(key)
+            if product is None:
+                product = products[key] = [0, 0]
+            product[0] += orders.quantities[i]
+            product[1] += price
+            
+            cid = orders.customer_ids[i]
+            customer = customers.get(cid)
+            if customer is None:
+                customer = customers[cid] = [0, 0, orders.email_codes[i], orders.name_codes[i]]
+            customer[0] += 1
+            customer[1] += price
+        
+        return {'line_items': len(indices), 'revenue': revenue, 'products': products, 'customers': customers}
+    
+    def _refresh(self) -> None:
+        """Re-aggregate the days marked since the last read"""
+        for day in self.dirty:
+            rollup = self.aggregate(self.orders.window(day * SECONDS_PER_DAY, (day + 1) * SECONDS_PER_DAY))
+            if rollup['line_items']:
+                self.days[day] = rollup
+            else:
+                self.days.pop(day, None)
+        self.dirty.clear()
+    
+    def window(self, since: float) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        (day, rollup) pairs covering the rows created at or after since, oldest first
+        
+        The first pair aggregates the rows of the partial day since falls
+        in; every later pair is a maintained daily rollup.
+        """
+        self._refresh()
+        first_full = math.ceil(since / SECONDS_PER_DAY)
+        head = self.aggregate(self.orders.window(since, first_full * SECONDS_PER_DAY))
+        return [(first_full - 1, head)] + [(day, self.days[day]) for day in sorted(self.days) if day >= first_full]
+    
+    def subset(self, orders, since: Optional[float] = None, until: Optional[float] = None) -> 'DailyRollups':
+        """
+        Rollups of a subset of the orders, see OrderStore.subset
+        
+        Days wholly inside [since, until) are shared, the partial days at
+        either end are re-aggregated from the subset's rows when read.
+        """
+        first = day_of(since) if since is not None else None
+        last = day_of(until) if until is not None else None
+        
+        def inside(day: int) -> bool:
+            return (first is None or day > first) and (last is None or day < last)
+        
+        rollups = DailyRollups(orders)
+        rollups.days = {day: rollup for day, rollup in self.days.items() if inside(day)}
+        rollups.dirty = {day for day in self.dirty if inside(day)}
+        rollups.dirty.update(day for day in (first, last) if day is not None)
+        return rollups
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'days': len(self.days),
+            'dirty_days': len(self.dirty),
+            'days_aggregated': self.days_aggregated
+        }
@@ -0,0 +1,249 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.shopify.order_store import to_epoch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY,
+    customer_id INTEGER,
+    customer_email TEXT,
+    customer_name TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS line_items (
+    order_id INTEGER NOT NULL,
+    product_id INTEGER,
+    product_title TEXT,
+    quantity INTEGER NOT NULL,
+    total_price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    product_id INTEGER PRIMARY KEY,
+    product_title TEXT
+);
+CREATE TABLE IF NOT EXISTS inventory (
+    product_id INTEGER NOT NULL,
+    sku TEXT,
+    quantity INTEGER NOT NULL,
+    variant_id INTEGER,
+    inventory_item_id INTEGER,
+    locations TEXT
+);
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id INTEGER PRIMARY KEY,
+    customer_email TEXT,
+    customer_name TEXT,
+    total_spent REAL NOT NULL,
+    order_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders (customer_id);
+CREATE INDEX IF NOT EXISTS idx_line_items_order_id ON line_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_line_items_product_id ON line_items (product_id);
+CREATE INDEX IF NOT EXISTS idx_inventory_product_id ON inventory (product_id);
+"""
+
+# Columns added to tables of existing databases since they were created
+ADDED_COLUMNS = {
+    'inventory': [('variant_id', 'INTEGER'), ('inventory_item_id', 'INTEGER'), ('locations', 'TEXT')]
+}
+
+# Order line item rows are stored split across orders and line_items
+ORDER_ROWS_SQL = """
+SELECT o.order_id, li.product_id, li.product_title, o.customer_id, o.customer_email,
+       o.customer_name, li.quantity, li.total_price, o.created_at
+FROM line_items li JOIN orders o ON o.order_id = li.order_id
+ORDER BY o.created_at, li.rowid
+"""
+
+ORDER_FIELDS = (
+    'order_id', 'product_id', 'product_title', 'customer_id', 'customer_email',
+    'customer_name', 'quantity', 'total_price', 'created_at'
+)
+INVENTORY_FIELDS = ('product_id', 'product_title', 'sku', 'quantity', 'variant_id', 'inventory_item_id', 'locations')
+CUSTOMER_FIELDS = ('customer_id', 'customer_email', 'customer_name', 'total_spent', 'order_count')
+
+UNSAFE_FILENAME_RE = re.compile(r'[^\w.-]')
+
+class ShopDatabase:
+    """
+    One shop's analytics data on disk, in an embedded SQLite file
+    
+    Holds the locally synced orders (split into orders and line items),
+    products, inventory and customers, with indexes on created_at,
+    product_id and customer_id, plus the sync state needed to resume
+    incremental syncs. A restarted process reads the shop's history from
+    here instead of downloading it from Shopify again.
+    
+    Calls are thread-safe so bulk reads and writes can run in a worker
+    thread with asyncio.to_thread.
+    
+    Args:
+        path: SQLite file, created with the schema on first use
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+            self._add_missing_columns()
+    
+    def _add_missing_columns(self) -> None:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {info[1] for info in self._conn.execute(f'PRAGMA table_info({table})')}
+            for name, kind in columns:
+                if name not in existing:
+                    self._conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {kind}')
+    
+    @staticmethod
+    def path_for(directory: str, host: str, suffix: str = '.sqlite3') -> str:
+        """File of a shop host within directory, the database by default"""
+        return os.path.join(directory, UNSAFE_FILENAME_RE.sub('_', host) + suffix)
+    
+    def _write_orders(self, rows: Iterable[Dict[str, Any]]) -> None:
+        orders = {}
+        line_items = []
+        for row in rows:
+            orders.setdefault(row['order_id'], (
+                row['order_id'], row.get('customer_id'), row.get('customer_email'),
+                row.get('customer_name'), to_epoch(row['created_at'])
+            ))
+            line_items.append((
+                row['order_id'], row.get('product_id'), row.get('product_title'),
+                int(row.get('quantity') or 0), float(row.get('total_price') or 0)
+            ))
+        
+        self._conn.executemany('INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?)', orders.values())
+        self._conn.executemany('INSERT INTO line_items VALUES (?, ?, ?, ?, ?)', line_items)
+    
+    def upsert_orders(self, rows: List[Dict[str, Any]], order_ids: Iterable[Any]) -> None:
+        """
+        Replace changed orders and their line items
+        
+        Args:
+            rows: Current line item rows of the changed orders
+            order_ids: Changed orders, including any that no longer have line items
+        """
+        ids = [(order_id,) for order_id in {row['order_id'] for row in rows} | set(order_ids)]
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM line_items WHERE order_id = ?', ids)
+            self._conn.executemany('DELETE FROM orders WHERE order_id = ?', ids)
+            self._write_orders(rows)
+    
+    def replace_orders(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Replace every stored order"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM line_items')
+            self._conn.execute('DELETE FROM orders')
+            self._write_orders(rows)
+    
+    def load_orders(self) -> List[Dict[str, Any]]:
+        """Every stored line item row, oldest first, created_at in epoch seconds"""
+        with self._lock:
+            return [dict(zip(ORDER_FIELDS, values)) for values in self._conn.execute(ORDER_ROWS_SQL)]
+    
+    def get_state(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._conn.execute('SELECT name, value FROM sync_state'))
+    
+    def set_state(self, **values: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO sync_state VALUES (?, ?)',
+                [(name, None if value is None else str(value)) for name, value in values.items()]
+            )
+    
+    def _write_resource(self, resource: str, rows: List[Dict[str, Any]]) -> None:
+        if resource == 'inventory':
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO products VALUES (?, ?)',
+                [(row['product_id'], row.get('product_title')) for row in rows]
+            )
+            self._conn.executemany(
+                'INSERT INTO inventory (product_id, sku, quantity, variant_id, inventory_item_id, locations) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (row['product_id'], row.get('sku'), int(row.get('quantity') or 0), row.get('variant_id'),
+                     row.get('inventory_item_id'), json.dumps(row.get('locations') or []))
+                    for row in rows
+                ]
+            )
+        else:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?)',
+                [tuple(row.get(field) for field in CUSTOMER_FIELDS) for row in rows]
+            )
+    
+    def _delete_resource(self, resource: str, key: Optional[Any] = None) -> None:
+        tables = ('inventory', 'products') if resource == 'inventory' else ('customers',)
+        column = 'product_id' if resource == 'inventory' else 'customer_id'
+        for table in tables:
+            if key is None:
+                self._conn.execute(f'DELETE FROM {table}')
+            else:
+                self._conn.execute(f'DELETE FROM {table} WHERE {column} = ?', (key,))
+    
+    def replace_resource(self, resource: str, rows: List[Dict[str, Any]], synced_at: float) -> None:
+        """
+        Replace every stored row of 'inventory' or 'customers'
+        
+        Args:
+            resource: Resource name
+            rows: Rows from a full fetch
+            synced_at: Wall-clock time the fetch finished
+        """
+        with self._lock, self._conn:
+            self._delete_resource(resource)
+            self._write_resource(resource, rows)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sync_state VALUES (?, ?)', (f'{resource}_synced_at', str(synced_at))
+            )
+    
+    def upsert_resource(self, resource: str, key: Any, rows: List[Dict[str, Any]]) -> None:
+        """Replace the stored rows of one product or customer"""
+        with self._lock, self._conn:
+            self._delete_resource(resource, key)
+            self._write_resource(resource, rows)
+    
+    def clear_resource(self, resource: str) -> None:
+        with self._lock, self._conn:
+            self._delete_resource(resource)
+            self._conn.execute('DELETE FROM sync_state WHERE name = ?', (f'{resource}_synced_at',))
+    
+    def load_resource(self, resource: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """Stored rows and wall-clock sync time, or None when never synced"""
+        with self._lock:
+            synced_at = self._conn.execute(
+                'SELECT value FROM sync_state WHERE name = ?', (f'{resource}_synced_at',)
+            ).fetchone()
+            if synced_at is None:
+                return None
+            
+            if resource == 'inventory':
+                cursor = self._conn.execute(
+                    'SELECT i.product_id, p.product_title, i.sku, i.quantity, i.variant_id, i.inventory_item_id, '
+                    'i.locations FROM inventory i LEFT JOIN products p ON p.product_id = i.product_id ORDER BY i.rowid'
+                )
+                rows = [dict(zip(INVENTORY_FIELDS, values)) for values in cursor]
+                for row in rows:
+                    row['locations'] = json.loads(row['locations'] or '[]')
+            else:
+                cursor = self._conn.execute(f"SELECT {', '.join(CUSTOMER_FIELDS)} FROM customers ORDER BY rowid")
+                rows = [dict(zip(CUSTOMER_FIELDS, values)) for values in cursor]
+            return rows, float(synced_at[0])
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,109 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Any, Dict, Optional, Tuple
+
+from app.shopify.order_store import OrderStore
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ORDSNAP1'
+HEADER_LENGTH = struct.Struct('<Q')
+ALIGNMENT = 8
+
+def _padding(offset: int) -> int:
+    return -offset % ALIGNMENT
+
+def write_snapshot(path: str, orders: OrderStore, since: float, updated_at_min: str) -> None:
+    """
+    Write a columnar orders snapshot that open_snapshot() maps without copying
+    
+    The file is MAGIC, the length of a JSON header, the header (column
+    offsets, string dictionaries and sync state) and then each column's
+    raw bytes, 8-byte aligned. It is written to a temporary file and
+    renamed into place, so readers never see a partial snapshot and
+    workers mapping the previous one keep their view.
+    
+    Args:
+        path: Snapshot file
+        orders: Orders to write, must not change while writing
+        since: Start of the window the orders cover
+        updated_at_min: High-water mark the orders are current to
+    """
+    columns = [getattr(orders, name) for name, _ in OrderStore.COLUMNS]
+    layout = {}
+    offset = 0
+    for (name, typecode), column in zip(OrderStore.COLUMNS, columns):
+        layout[name] = [typecode, offset]
+        size = len(column) * array(typecode).itemsize
+        offset += size + _padding(size)
+    
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'itemsizes': {typecode: array(typecode).itemsize for _, typecode in OrderStore.COLUMNS},
+        'rows': len(orders),
+        'columns': layout,
+        'titles': list(orders.titles.values),
+        'emails': list(orders.emails.values),
+        'names': list(orders.names.values),
+        'since': since,
+        'updated_at_min': updated_at_min,
+        'written_at': time.time()
+    }).encode()
+    header += b' ' * _padding(len(MAGIC) + HEADER_LENGTH.size + len(header))
+    
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        for column in columns:
+            data = memoryview(column).cast('B')
+            f.write(data)
+            f.write(b'\0' * _padding(len(data)))
+    os.replace(tmp_path, path)
+
+def open_snapshot(path: str) -> Optional[Tuple[OrderStore, Dict[str, Any]]]:
+    """
+    Map a snapshot written by write_snapshot()
+    
+    Columns are memoryviews over the mapped file, so every worker mapping
+    the same snapshot shares one copy in the page cache.
+    
+    Returns:
+        (orders, header) or None when the file is missing, unreadable or
+        was written on a platform with a different layout
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    
+    try:
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError("not an orders snapshot")
+        (length,) = HEADER_LENGTH.unpack_from(mapped, len(MAGIC))
+        start = len(MAGIC) + HEADER_LENGTH.size
+        header = json.loads(mapped[start:start + length])
+        
+        itemsizes = {typecode: array(typecode).itemsize for _, typecode in OrderStore.COLUMNS}
+        if header['byteorder'] != sys.byteorder or header['itemsizes'] != itemsizes:
+            raise ValueError("written on a platform with a different layout")
+        
+        data = memoryview(mapped)[start + length:]
+        rows = header['rows']
+        columns = {}
+        for name, (typecode, offset) in header['columns'].items():
+            columns[name] = data[offset:offset + rows * itemsizes[typecode]].cast(typecode)
+    except (ValueError, KeyError, struct.error) as e:
+        logger.warning(f"Ignoring orders snapshot {path}: {e}")
+        return None
+    
+    orders = OrderStore.from_buffers(columns, header['titles'], header['emails'], header['names'])
+    return orders, header
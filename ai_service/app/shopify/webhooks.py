@@ -0,0 +1,29 @@
+import base64
+import hashlib
+import hmac
+from typing import Dict, Optional, Tuple
+
+# Webhook topics handled, with the intent categories whose cached results
+# they make stale (None for every category). Orders feed sales and
+# customer analytics and move stock, so they touch everything.
+WEBHOOK_TOPICS: Dict[str, Optional[Tuple[str, ...]]] = {
+    'orders/create': None,
+    'orders/updated': None,
+    'products/update': ('inventory', 'sales', 'general'),
+    'inventory_levels/update': ('inventory',),
+    'customers/update': ('customers', 'sales', 'general')
+}
+
+def verify_webhook(body: bytes, hmac_header: Optional[str], secret: str) -> bool:
+    """
+    Check a webhook's X-Shopify-Hmac-Sha256 header
+    
+    Args:
+        body: Raw request body, exactly as received
+        hmac_header: Base64 HMAC-SHA256 of the body sent by Shopify
+        secret: The app's API secret key
+    """
+    if not hmac_header or not secret:
+        return False
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode(), hmac_header)
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import pytest
+from app.agent.answer_formatter import AnswerFormatter
+from app.cache.enhancement_cache import EnhancementCache
+
+INTENT = {'category': 'inventory', 'metrics': [], 'entities': []}
+ROWS = [{'product_id': 1, 'product_title': 'Mug', 'quantity': 4}]
+
+class SlowLLM:
+    """LLM client stub whose enhancement takes `delay` seconds"""
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+    
+    async def enhance_answer(self, answer, question, data_summary):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"Enhanced: {answer}"
+
+@pytest.mark.asyncio
+async def test_enhancement_within_budget(monkeypatch):
+    """Test a fast LLM answer replaces the template answer"""
+    monkeypatch.setenv('LLM_ENHANCE_TIMEOUT', '1')
+    formatter = AnswerFormatter(llm_client=SlowLLM(0))
+    
+    result = await formatter.format('stock?', INTENT, ROWS, '')
+    
+    assert result['answer'].startswith('Enhanced: ')
+
+@pytest.mark.asyncio
+async def test_slow_enhancement_falls_back_and_warms_cache(monkeypatch):
+    """Test a slow LLM returns the template answer and finishes into the cache"""
+    monkeypatch.setenv('LLM_ENHANCE_TIMEOUT', '0.01')
+    llm = SlowLLM(0.05)
+    formatter = AnswerFormatter(llm_client=llm, enhancement_cache=EnhancementCache())
+    
+    first = await formatter.format('stock?', INTENT, ROWS, '')
+    assert not first['answer'].startswith('Enhanced: ')
+    
+    await asyncio.sleep(0.1)
+    second = await formatter.format('stock?', INTENT, ROWS, '')
+    
+    assert second['answer'] == f"Enhanced: {first['answer']}"
+    assert llm.calls == 1
+
+@pytest.mark.asyncio
+async def test_budget_fallback_is_not_logged_as_enhanced(monkeypatch, caplog):
+    """Test a timed out enhancement is logged as the template fallback, not as enhanced"""
+    monkeypatch.setenv('LLM_ENHANCE_TIMEOUT', '0.01')
+    formatter = AnswerFormatter(llm_client=SlowLLM(0.05))
+    
+    with caplog.at_level(logging.INFO, logger='app.agent.answer_formatter'):
+        await formatter.format('stock?', INTENT, ROWS, '')
+    
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Answer enhanced with LLM" not in messages
+    assert any('using template answer' in message for message in messages)
+
+class StreamingLLM(SlowLLM):
+    """LLM client stub that also streams its enhancement"""
+    
+    async def stream_enhance_answer(self, answer, question, data_summary):
+        self.calls += 1
+        for token in ['Stock ', 'is ', 'fine.']:
+            await asyncio.sleep(self.delay)
+            yield token
+
+@pytest.mark.asyncio
+async def test_stream_relays_llm_tokens(monkeypatch):
+    """Test LLM tokens are streamed and the full text is cached"""
+    monkeypatch.setenv('LLM_ENHANCE_TIMEOUT', '1')
+    cache = EnhancementCache()
+    formatter = AnswerFormatter(llm_client=StreamingLLM(0), enhancement_cache=cache)
+    answer = formatter.build_answer('stock?', INTENT, ROWS)['answer']
+    
+    chunks = [c async for c in formatter.stream_answer(answer, 'stock?', INTENT, ROWS)]
+    
+    assert chunks == ['Stock ', 'is ', 'fine.']
+    assert cache.get(answer, 'stock?', formatter._data_summary(INTENT, ROWS)) == 'Stock is fine.'
+
+@pytest.mark.asyncio
+async def test_stream_chunks_answer_without_llm_stream(monkeypatch):
+    """Test clients without a streaming method get the answer in word chunks"""
+    monkeypatch.setenv('LLM_ENHANCE_TIMEOUT', '1')
+    formatter = AnswerFormatter(llm_client=SlowLLM(0))
+    answer = formatter.build_answer('stock?', INTENT, ROWS)['answer']
+    
+    chunks = [c async for c in formatter.stream_answer(answer, 'stock?', INTENT, ROWS)]
+    
+    assert len(chunks) > 1
+    assert ''.join(chunks) == f"Enhanced: {answer}"
+
+class FailingStreamLLM(SlowLLM):
+    """LLM client stub whose stream breaks after its first token"""
+    
+    async def stream_enhance_answer(self, answer, question, data_summary):
+        yield 'Stock '
+        raise RuntimeError("connection reset")
+
+@pytest.mark.asyncio
+async def test_stream_failing_midway_is_not_cached(monkeypatch):
+    """Test a stream that fails after a token raises and leaves the cache empty"""
+    monkeypatch.setenv('LLM_ENHANCE_TIMEOUT', '1')
+    cache = EnhancementCache()
+    formatter = AnswerFormatter(llm_client=FailingStreamLLM(0), enhancement_cache=cache)
+    answer = formatter.build_answer('stock?', INTENT, ROWS)['answer']
+    chunks = []
+    
+    with pytest.raises(RuntimeError):
+        async for chunk in formatter.stream_answer(answer, 'stock?', INTENT, ROWS):
+            chunks.append(chunk)
+    
+    assert chunks == ['Stock ']
+    assert cache.get(answer, 'stock?', formatter._data_summary(INTENT, ROWS)) is None
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from app.cache.enhancement_cache import EnhancementCache
+from app.cache.single_flight import SingleFlight
+
+class FakeLLM:
+    """Counts enhancement calls, each taking a moment like a real LLM"""
+    
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+    
+    async def enhance_answer(self, answer, question, data_summary):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("LLM unavailable")
+        return f"Enhanced: {answer}"
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_llm_call():
+    """Test single-flight deduplicates concurrent enhancements"""
+    llm = FakeLLM()
+    cache = EnhancementCache()
+    
+    results = await asyncio.gather(*[
+        cache.get_or_call('Sold 5 units', 'top products?', '1 rows',
+                          lambda: llm.enhance_answer('Sold 5 units', 'top products?', '1 rows'))
+        for _ in range(5)
+    ])
+    
+    assert results == ['Enhanced: Sold 5 units'] * 5
+    assert llm.calls == 1
+    assert cache.stats()['calls_saved'] == 4
+
+@pytest.mark.asyncio
+async def test_repeated_calls_are_served_from_cache():
+    """Test a finished enhancement is reused and different answers are not"""
+    llm = FakeLLM()
+    cache = EnhancementCache()
+    
+    async def enhance(answer):
+        return await cache.get_or_call(answer, 'q', 's', lambda: llm.enhance_answer(answer, 'q', 's'))
+    
+    await enhance('a')
+    await enhance('a')
+    await enhance('b')
+    
+    assert llm.calls == 2
+    assert cache.stats()['hits'] == 1
+
+@pytest.mark.asyncio
+async def test_failures_are_shared_but_not_cached():
+    """Test an LLM error reaches every waiter and the next call retries"""
+    llm = FakeLLM(fail=True)
+    flight = SingleFlight()
+    cache = EnhancementCache()
+    cache.single_flight = flight
+    
+    call = lambda: cache.get_or_call('a', 'q', 's', lambda: llm.enhance_answer('a', 'q', 's'))
+    results = await asyncio.gather(call(), call(), return_exceptions=True)
+    
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert llm.calls == 1
+    
+    llm.fail = False
+    assert await call() == 'Enhanced: a'
+    assert flight.stats()['in_flight'] == 0
@@ -0,0 +1,47 @@
+import pytest
+from datetime import datetime, timedelta
+from app.shopify import forecast
+from app.shopify.forecast import InventoryForecast
+from app.shopify.order_store import OrderStore
+
+RECENT = (datetime.utcnow() - timedelta(days=1)).isoformat()
+
+def line_item(order_id, product_id, title, quantity):
+    return {
+        'order_id': order_id, 'product_id': product_id, 'product_title': title, 'customer_id': 1,
+        'quantity': quantity, 'total_price': 10.0, 'created_at': RECENT
+    }
+
+ORDERS = OrderStore.from_rows([
+    line_item(1, 7, 'Mug', 14), line_item(2, 8, 'Cap', 7), line_item(3, 7, 'Mug', 7), line_item(4, 9, 'Hat', 1)
+])
+INVENTORY = [
+    {'product_id': 7, 'product_title': 'Mug', 'sku': 'MUG-S', 'quantity': 3},
+    {'product_id': 7, 'product_title': 'Mug', 'sku': 'MUG-L', 'quantity': 3},
+    {'product_id': 8, 'product_title': 'Cap', 'sku': 'CAP', 'quantity': 50}
+]
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'python'])
+def numpy_available(request, monkeypatch):
+    if request.param and not forecast.NUMPY_AVAILABLE:
+        pytest.skip("numpy is not installed")
+    monkeypatch.setattr(forecast, 'NUMPY_AVAILABLE', request.param)
+
+def test_project_joins_velocity_and_inventory(numpy_available):
+    """Test cover, stockout date and reorder quantity use summed variant stock"""
+    rows = InventoryForecast(ORDERS, INVENTORY).project(7)
+    
+    assert [row['product_id'] for row in rows] == [7, 8, 9]
+    mug = rows[0]
+    assert (mug['total_sold'], mug['avg_daily_sales'], mug['current_stock']) == (21, 3.0, 6)
+    assert mug['days_of_cover'] == 2.0
+    assert mug['stockout_date'] == (datetime.utcnow() + timedelta(days=2)).date().isoformat()
+    assert mug['reorder_quantity'] == 50
+    assert rows[2]['current_stock'] is None and rows[2]['days_of_cover'] is None
+
+def test_project_filters_by_cover_and_title(numpy_available):
+    """Test only stocked products running out in time and matching titles are kept"""
+    projection = InventoryForecast(ORDERS, INVENTORY)
+    
+    assert [row['product_id'] for row in projection.project(7, max_days_of_cover=7)] == [7]
+    assert [row['product_id'] for row in projection.project(7, ORDERS.titles.codes_containing(['cap']))] == [8]
@@ -0,0 +1,75 @@
+from app.cache.intent_cache import IntentCache, normalize_question
+
+TOP_PRODUCTS = {
+    'category': 'sales',
+    'time_period': {'value': 7, 'unit': 'days'},
+    'entities': [],
+    'metrics': ['top_products']
+}
+
+def test_normalize_question():
+    """Test case, punctuation, number words and dates are canonicalized"""
+    assert normalize_question("What were my Top FIVE products since 2025-12-01?") == \
+        ('what were my top # products since #date', ['5', '2025-12-01'])
+
+def test_paraphrase_hits_same_intent():
+    """Test equivalent questions share a cached intent"""
+    cache = IntentCache()
+    cache.set('Top products in the last 7 days', TOP_PRODUCTS)
+    
+    assert cache.get('top products, in the last seven days?') == TOP_PRODUCTS
+    assert cache.get('top products this year') is None
+
+def test_number_slots_are_rewritten():
+    """Test a cached intent is reused with the new question's numbers"""
+    cache = IntentCache()
+    cache.set('Top products in the last 7 days', TOP_PRODUCTS)
+    
+    intent = cache.get('Top products in the last 30 days')
+    
+    assert intent['time_period'] == {'value': 30, 'unit': 'days'}
+    assert TOP_PRODUCTS['time_period']['value'] == 7
+
+def test_ambiguous_slots_need_exact_values():
+    """Test entries whose slots cannot be told apart only serve identical questions"""
+    cache = IntentCache()
+    cache.set('Top 7 products in the last 7 days', {**TOP_PRODUCTS, 'limit': 7})
+    
+    assert cache.get('Top 5 products in the last 30 days') is None
+    assert cache.get('top 7 products in the last 7 days')['limit'] == 7
+
+def test_slots_matching_period_words_need_exact_values():
+    """Test a slot value that a period word could also have set is not rewritten"""
+    cache = IntentCache()
+    cache.set('Top 7 products last week', {**TOP_PRODUCTS, 'limit': 7})
+    cache.set('Best 7 sellers this week', TOP_PRODUCTS)
+    
+    assert cache.get('Top 3 products last week') is None
+    assert cache.get('Best 3 sellers this week') is None
+    assert cache.get('best 7 sellers this week') == TOP_PRODUCTS
+
+def test_converted_week_slots_need_exact_values():
+    """Test a number of weeks stored as days is not copied into the next question"""
+    cache = IntentCache()
+    cache.set('Sales in the last 2 weeks', {**TOP_PRODUCTS, 'time_period': {'value': 14, 'unit': 'days'}})
+    
+    assert cache.get('Sales in the last 3 weeks') is None
+    assert cache.get('sales in the last two weeks')['time_period']['value'] == 14
+
+def test_converted_month_slots_need_exact_values():
+    """Test a number of months stored as days keeps the whole entry exact"""
+    cache = IntentCache()
+    cache.set('top 5 products in the last 2 months',
+              {**TOP_PRODUCTS, 'time_period': {'value': 60, 'unit': 'days'}, 'limit': 5})
+    
+    assert cache.get('top 10 products in the last 6 months') is None
+    assert cache.get('top 5 products in the last 2 months')['limit'] == 5
+
+def test_bounded_size():
+    """Test the least recently used question is evicted"""
+    cache = IntentCache(max_size=1)
+    cache.set('top products', TOP_PRODUCTS)
+    cache.set('low stock', {'category': 'inventory'})
+    
+    assert cache.get('top products') is None
+    assert cache.stats()['evictions'] == 1
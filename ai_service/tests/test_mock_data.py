@@ -0,0 +1,45 @@
+from datetime import timedelta
+from app.shopify.mock_data import MockShopifyData, get_mock_data, reset_mock_data
+
+def test_mock_data_is_shared_per_store():
+    """Test the same dataset is reused for a store"""
+    reset_mock_data()
+
+    first = get_mock_data('test-store.myshopify.com')
+    second = get_mock_data('test-store.myshopify.com')
+    other = get_mock_data('other-store.myshopify.com')
+
+    assert first is second
+    assert first is not other
+
+def test_stale_mock_data_is_regenerated():
+    """Test a dataset generated on an earlier day is rebuilt with current dates"""
+    reset_mock_data()
+    stale = get_mock_data('test-store.myshopify.com')
+    stale.generated_at -= timedelta(days=1)
+
+    fresh = get_mock_data('test-store.myshopify.com')
+
+    assert fresh is not stale
+    assert fresh is get_mock_data('test-store.myshopify.com')
+
+def test_mock_data_is_deterministic():
+    """Test seeded datasets generate identical orders"""
+    first = MockShopifyData(seed=42)
+    second = MockShopifyData(seed=42)
+
+    def strip_timestamps(orders):
+        return [{k: v for k, v in o.items() if k != 'created_at'} for o in orders]
+
+    assert strip_timestamps(first.orders.to_rows()) == strip_timestamps(second.orders.to_rows())
+
+def test_mock_data_returns_copies():
+    """Test callers cannot modify the shared dataset"""
+    reset_mock_data()
+    mock = get_mock_data('test-store.myshopify.com')
+
+    inventory = mock.get_inventory_levels([])
+    inventory[0]['quantity'] = -1
+
+    assert len(inventory) == 10
+    assert mock.get_inventory_levels([])[0]['quantity'] != -1
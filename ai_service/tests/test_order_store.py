@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from app.shopify.order_store import OrderStore, to_epoch
+
+NOW = datetime(2026, 1, 10, 12, 0, 0)
+
+def make_row(order_id, title, days_ago, customer_id=1):
+    return {
+        'order_id': order_id,
+        'product_id': order_id % 3,
+        'product_title': title,
+        'customer_id': customer_id,
+        'customer_email': f'customer{customer_id}@email.com',
+        'customer_name': f'Customer {customer_id}',
+        'quantity': 2,
+        'total_price': 19.98,
+        'created_at': (NOW - timedelta(days=days_ago)).isoformat()
+    }
+
+def test_rows_round_trip_in_time_order():
+    """Test rows come back out of the columns unchanged, oldest first"""
+    rows = [make_row(1, 'Yoga Mat Pro', 1), make_row(2, 'Bamboo Sunglasses', 2, customer_id=None)]
+    
+    store = OrderStore.from_rows(rows)
+    
+    assert len(store) == 2
+    assert store.to_rows() == rows[::-1]
+
+def test_titles_are_dictionary_encoded():
+    """Test repeated titles are stored once"""
+    store = OrderStore.from_rows(make_row(i, 'Yoga Mat Pro', i) for i in range(50))
+    
+    assert len(store.titles) == 1
+    assert len(store.emails) == 1
+
+def test_select_filters_by_date_and_title():
+    """Test date and title filters combine"""
+    store = OrderStore.from_rows([
+        make_row(1, 'Yoga Mat Pro', 1),
+        make_row(2, 'Bamboo Sunglasses', 2),
+        make_row(3, 'Yoga Mat Pro', 20)
+    ])
+    since = to_epoch(NOW - timedelta(days=7))
+    
+    assert list(store.select(since=since)) == [1, 2]
+    assert store.select(since=since, title_codes=store.titles.codes_containing(['yoga'])) == [2]
+
+def test_window_uses_time_order():
+    """Test windows are contiguous index ranges over sorted timestamps"""
+    store = OrderStore.from_rows(make_row(i, 'Yoga Mat Pro', days_ago=i) for i in range(10))
+    store.append(make_row(99, 'Yoga Mat Pro', days_ago=4.5))
+    
+    window = store.window(since=to_epoch(NOW - timedelta(days=5)), until=to_epoch(NOW - timedelta(days=2)))
+    
+    assert [store.order_ids[i] for i in window] == [5, 99, 4, 3]
+    assert list(store.created_at) == sorted(store.created_at)
@@ -0,0 +1,84 @@
+import pytest
+from app.cache.ttl_cache import TTLCache
+from app.cache.query_cache import QueryCache, normalize_shopifyql
+from app.shopify.client import ShopifyClient
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+TOP_PRODUCTS = {'category': 'sales', 'metrics': ['top_products'], 'time_period': {'value': 7, 'unit': 'days'}}
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test the oldest untouched entry is evicted past max_size"""
+    cache = TTLCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+def test_ttl_cache_expires_entries():
+    """Test entries are dropped once their TTL has passed"""
+    clock = FakeClock()
+    cache = TTLCache(clock=clock)
+    cache.set('a', 1, ttl=10)
+    
+    clock.now += 9
+    assert cache.get('a') == 1
+    clock.now += 1
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+def test_normalize_keeps_string_literals():
+    """Test normalization ignores case and spacing but not literal values"""
+    assert normalize_shopifyql("SELECT  *\n FROM Orders WHERE product_title = 'Yoga Mat';") == \
+        "select * from orders where product_title = 'Yoga Mat'"
+
+@pytest.mark.asyncio
+async def test_query_cache_buckets_by_category_ttl():
+    """Test equivalent queries hit and results roll over with the time bucket"""
+    clock = FakeClock(now=3600.0)
+    cache = QueryCache(ttls={'inventory': 60}, clock=clock)
+    intent = {'category': 'inventory', 'metrics': []}
+    
+    await cache.set('shop', 'SELECT * FROM inventory_levels', intent, [{'quantity': 4}])
+    assert await cache.get('shop', 'select *  from inventory_levels', intent) == [{'quantity': 4}]
+    assert await cache.get('other-shop', 'SELECT * FROM inventory_levels', intent) is None
+    
+    clock.now += 60
+    assert await cache.get('shop', 'SELECT * FROM inventory_levels', intent) is None
+
+@pytest.mark.asyncio
+async def test_client_serves_repeated_queries_from_cache():
+    """Test ShopifyClient stores results and returns copies on repeat"""
+    cache = QueryCache()
+    client = ShopifyClient('cache-test.myshopify.com', 'token', query_cache=cache)
+    
+    first = await client.execute_query('', TOP_PRODUCTS)
+    first[0]['total_sold'] = -1
+    second = await client.execute_query('', TOP_PRODUCTS)
+    
+    assert second[0]['total_sold'] != -1
+    assert cache.stats()['hits'] == 1
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_store_categories():
+    """Test invalidation only drops the given store's affected categories"""
+    cache = QueryCache()
+    inventory = {'category': 'inventory', 'metrics': [], 'time_period': {}}
+    
+    await cache.set('test-store.myshopify.com', 'q', TOP_PRODUCTS, [{'a': 1}])
+    await cache.set('test-store.myshopify.com', 'q', inventory, [{'b': 2}])
+    await cache.set('other.myshopify.com', 'q', inventory, [{'c': 3}])
+    
+    assert await cache.invalidate('test-store.myshopify.com', ['inventory']) == 1
+    assert await cache.get('test-store.myshopify.com', 'q', inventory) is None
+    assert await cache.get('test-store.myshopify.com', 'q', TOP_PRODUCTS) == [{'a': 1}]
+    assert await cache.get('other.myshopify.com', 'q', inventory) == [{'c': 3}]
@@ -0,0 +1,109 @@
+import pytest
+from app.shopify.analytics import ShopAnalytics
+from app.shopify.order_store import OrderStore
+from app.shopify.query_engine import QueryEngine, UnsupportedQueryError
+
+ROWS = [
+    {'order_id': 1, 'product_id': 7, 'product_title': 'Mug', 'customer_id': 1,
+     'customer_email': 'a@example.com', 'customer_name': 'Ann', 'quantity': 2,
+     'total_price': 10.0, 'created_at': '2026-01-03T09:00:00'},
+    {'order_id': 2, 'product_id': 8, 'product_title': 'Cup', 'customer_id': 2,
+     'customer_email': 'b@example.com', 'customer_name': 'Bob', 'quantity': 1,
+     'total_price': 4.0, 'created_at': '2026-01-04T10:00:00'},
+    {'order_id': 3, 'product_id': 7, 'product_title': 'Mug', 'customer_id': 1,
+     'customer_email': 'a@example.com', 'customer_name': 'Ann', 'quantity': 3,
+     'total_price': 15.0, 'created_at': '2026-01-05T18:30:00'},
+    {'order_id': 4, 'product_id': 9, 'product_title': 'Travel Mug', 'customer_id': None,
+     'customer_email': None, 'customer_name': None, 'quantity': 1,
+     'total_price': 12.0, 'created_at': '2026-01-06T08:00:00'}
+]
+
+INVENTORY = [
+    {'product_id': 7, 'product_title': 'Mug', 'quantity': 4},
+    {'product_id': 8, 'product_title': 'Cup', 'quantity': 40},
+    {'product_id': 9, 'product_title': 'Travel Mug', 'quantity': 0}
+]
+
+@pytest.fixture
+def engine():
+    return QueryEngine(ShopAnalytics(OrderStore.from_rows(ROWS), inventory=INVENTORY))
+
+def test_group_order_and_limit(engine):
+    """Test a generated top products query with a whole-day upper bound"""
+    rows = engine.execute(
+        "SELECT product_id, product_title, SUM(quantity) as total_sold FROM orders "
+        "WHERE created_at >= '2026-01-03' AND created_at <= '2026-01-05' "
+        "GROUP BY product_id, product_title ORDER BY total_sold DESC LIMIT 5"
+    )
+    
+    assert rows == [
+        {'product_id': 7, 'product_title': 'Mug', 'total_sold': 5},
+        {'product_id': 8, 'product_title': 'Cup', 'total_sold': 1}
+    ]
+
+def test_having_on_aggregate(engine):
+    """Test HAVING filters groups on an aggregate that is also selected"""
+    rows = engine.execute(
+        "SELECT customer_id, customer_email, COUNT(*) as order_count, SUM(total_price) as total_spent "
+        "FROM orders GROUP BY customer_id, customer_email HAVING COUNT(*) > 1 ORDER BY order_count DESC"
+    )
+    
+    assert rows == [{'customer_id': 1, 'customer_email': 'a@example.com', 'order_count': 2, 'total_spent': 25.0}]
+
+def test_like_and_date_grouping(engine):
+    """Test LIKE matches titles case-insensitively and DATE() groups by day"""
+    rows = engine.execute(
+        "SELECT DATE(created_at) as date, SUM(quantity) as units FROM orders "
+        "WHERE product_title LIKE '%mug%' GROUP BY date ORDER BY date"
+    )
+    
+    assert rows == [
+        {'date': '2026-01-03', 'units': 2},
+        {'date': '2026-01-05', 'units': 3},
+        {'date': '2026-01-06', 'units': 1}
+    ]
+
+def test_inventory_table(engine):
+    """Test queries over list tables such as inventory_levels"""
+    rows = engine.execute(
+        "SELECT product_title, quantity FROM inventory_levels WHERE quantity < 10 ORDER BY quantity"
+    )
+    
+    assert rows == [
+        {'product_title': 'Travel Mug', 'quantity': 0},
+        {'product_title': 'Mug', 'quantity': 4}
+    ]
+
+def test_limit_keeps_ties_in_order_and_nulls_last(engine):
+    """Test a single-key ORDER BY with LIMIT gives the head of the full sort"""
+    rows = engine.execute("SELECT order_id, customer_id FROM orders ORDER BY customer_id DESC LIMIT 4")
+    
+    assert [row['order_id'] for row in rows] == [2, 1, 3, 4]
+    assert engine.execute("SELECT order_id FROM orders ORDER BY customer_id LIMIT 2") == [
+        {'order_id': 1}, {'order_id': 3}
+    ]
+
+def test_quoted_numbers_compare_with_numeric_columns(engine):
+    """Test quoted numeric literals are compared as numbers"""
+    assert engine.execute("SELECT product_title FROM inventory_levels WHERE quantity < '20'") == [
+        {'product_title': 'Mug'}, {'product_title': 'Travel Mug'}
+    ]
+    assert engine.execute("SELECT order_id FROM orders WHERE quantity > '2'") == [{'order_id': 3}]
+
+@pytest.mark.parametrize('query', [
+    "SELECT p.product_id FROM products p JOIN inventory_levels i ON p.product_id = i.product_id",
+    "SELECT product_id FROM orders WHERE quantity > (SELECT AVG(quantity) FROM orders)",
+    "SELECT product_id FROM orders WHERE quantity > 1 OR quantity < 1",
+    "SELECT missing_column FROM orders",
+    "SELECT order_id FROM orders WHERE quantity > 'two'",
+    "SELECT product_title FROM inventory_levels WHERE product_title > 3",
+    "SELECT SUM(product_title) FROM orders",
+    "SELECT AVG(customer_email) FROM orders GROUP BY product_id",
+    "SELECT SUM(product_title) FROM inventory_levels",
+    "SELECT product_id FROM orders LIMIT 2.5",
+    ""
+])
+def test_unsupported_queries(engine, query):
+    """Test queries outside the supported subset raise UnsupportedQueryError"""
+    with pytest.raises(UnsupportedQueryError):
+        engine.execute(query)
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+import httpx
+from app.shopify.rate_limiter import ShopifyRateLimiter, INTERACTIVE, BACKGROUND
+
+def mock_shopify(responses):
+    """Local mock Shopify server replaying canned responses in order"""
+    calls = []
+    
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+    
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), calls
+
+@pytest.mark.asyncio
+async def test_retries_throttled_request_after_retry_after():
+    """Test a 429 is retried once Retry-After has passed"""
+    client, calls = mock_shopify([
+        httpx.Response(429, headers={'Retry-After': '0.05'}),
+        httpx.Response(200, json={}, headers={'X-Shopify-Shop-Api-Call-Limit': '3/40'})
+    ])
+    limiter = ShopifyRateLimiter()
+    
+    response = await limiter.request(client, 'GET', 'https://shop.myshopify.com/orders.json')
+    
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert limiter.stats()['throttled'] == 1
+    assert limiter.stats()['bucket_size'] == 40
+
+@pytest.mark.asyncio
+async def test_retries_server_errors_then_gives_up():
+    """Test 5xx responses are retried up to max_retries"""
+    client, calls = mock_shopify([httpx.Response(503)])
+    limiter = ShopifyRateLimiter(max_retries=2, base_backoff=0.001)
+    
+    response = await limiter.request(client, 'GET', 'https://shop.myshopify.com/orders.json')
+    
+    assert response.status_code == 503
+    assert len(calls) == 3
+
+@pytest.mark.asyncio
+async def test_paces_calls_when_bucket_is_full():
+    """Test calls wait for the bucket to leak when Shopify reports it full"""
+    client, calls = mock_shopify([
+        httpx.Response(200, json={}, headers={'X-Shopify-Shop-Api-Call-Limit': '4/4'})
+    ])
+    limiter = ShopifyRateLimiter(leak_rate=50.0, headroom=0)
+    
+    await limiter.request(client, 'GET', 'https://shop.myshopify.com/orders.json')
+    await limiter.request(client, 'GET', 'https://shop.myshopify.com/orders.json')
+    
+    assert limiter.stats()['paced'] == 1
+
+@pytest.mark.asyncio
+async def test_interactive_requests_go_first():
+    """Test interactive callers overtake queued background callers"""
+    limiter = ShopifyRateLimiter()
+    limiter.update_from_response(httpx.Response(429, headers={'Retry-After': '0.05'}))
+    order = []
+    
+    async def call(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+    
+    background = asyncio.create_task(call('background', BACKGROUND))
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call('interactive', INTERACTIVE))
+    await asyncio.gather(background, interactive)
+    
+    assert order == ['interactive', 'background']
+
+@pytest.mark.asyncio
+async def test_caps_requests_in_flight():
+    """Test no more than max_concurrency requests are sent at once"""
+    active = []
+    overlap = []
+    
+    async def handler(request):
+        active.append(request)
+        overlap.append(len(active))
+        await asyncio.sleep(0.01)
+        active.remove(request)
+        return httpx.Response(200, json={})
+    
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    limiter = ShopifyRateLimiter(max_concurrency=2)
+    
+    await asyncio.gather(*[
+        limiter.request(client, 'GET', 'https://shop.myshopify.com/orders.json') for _ in range(5)
+    ])
+    
+    assert max(overlap) == 2
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+from app.shopify.analytics import ShopAnalytics
+from app.shopify.order_store import OrderStore, to_epoch
+
+NOW = datetime.utcnow()
+
+def make_row(order_id, product_id, title, days_ago, customer_id=1, price=10.0):
+    return {
+        'order_id': order_id,
+        'product_id': product_id,
+        'product_title': title,
+        'customer_id': customer_id,
+        'customer_email': f'customer{customer_id}@email.com',
+        'customer_name': f'Customer {customer_id}',
+        'quantity': 1,
+        'total_price': price,
+        'created_at': (NOW - timedelta(days=days_ago)).isoformat()
+    }
+
+ROWS = [
+    make_row(1, 7, 'Mug', 40),
+    make_row(2, 8, 'Cap', 20, customer_id=2),
+    make_row(3, 7, 'Mug', 5),
+    make_row(4, 8, 'Cap', 2, customer_id=2),
+    make_row(5, 8, 'Cap', 1)
+]
+
+def test_rollups_follow_upserts():
+    """Test only the days a change touches are re-aggregated"""
+    store = OrderStore.from_rows(ROWS)
+    analytics = ShopAnalytics(store)
+    analytics.get_top_products({'value': 30}, [])
+    aggregated = store.rollups().days_aggregated
+    
+    store.upsert([make_row(3, 7, 'Mug', 5, price=25.0)])
+    top = analytics.get_top_products({'value': 30}, [])
+    
+    assert top == [
+        {'product_id': 8, 'product_title': 'Cap', 'total_sold': 3, 'revenue': 30.0},
+        {'product_id': 7, 'product_title': 'Mug', 'total_sold': 1, 'revenue': 25.0}
+    ]
+    # The touched day plus the partial first day of the window
+    assert store.rollups().days_aggregated == aggregated + 2
+
+def test_rollups_match_line_item_totals():
+    """Test rollup answers equal the totals of the window's line items"""
+    store = OrderStore.from_rows(ROWS)
+    analytics = ShopAnalytics(store)
+    
+    customers = analytics.get_top_customers({'value': 30})
+    summary = analytics.get_sales_summary({'value': 90})
+    subset = ShopAnalytics(store.subset(since=to_epoch(NOW - timedelta(days=10))))
+    
+    assert [(c['customer_id'], c['order_count'], c['total_spent']) for c in customers] == [(2, 2, 20.0), (1, 2, 20.0)]
+    assert [day['order_count'] for day in summary] == [1, 1, 1, 1, 1]
+    assert subset.get_top_products({'value': 90}, ['mug']) == [
+        {'product_id': 7, 'product_title': 'Mug', 'total_sold': 1, 'revenue': 10.0}
+    ]
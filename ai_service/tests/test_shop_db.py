@@ -0,0 +1,33 @@
+from app.shopify.shop_db import ShopDatabase
+
+def order_row(order_id, product_id, quantity):
+    return {
+        'order_id': order_id, 'product_id': product_id, 'product_title': f'Product {product_id}',
+        'customer_id': 1, 'customer_email': 'a@email.com', 'customer_name': 'A B',
+        'quantity': quantity, 'total_price': 10.0, 'created_at': '2024-01-0%dT10:00:00' % order_id
+    }
+
+def test_upsert_replaces_order_line_items(tmp_path):
+    """Test an upserted order keeps only its current line items"""
+    db = ShopDatabase(ShopDatabase.path_for(str(tmp_path), 'test-store.myshopify.com'))
+    db.replace_orders([order_row(1, 7, 1), order_row(1, 8, 1), order_row(2, 7, 3)])
+    db.upsert_orders([order_row(1, 7, 5)], [1])
+    
+    rows = db.load_orders()
+    
+    assert [(row['order_id'], row['product_id'], row['quantity']) for row in rows] == [(1, 7, 5), (2, 7, 3)]
+
+def test_resources_round_trip(tmp_path):
+    """Test stored inventory is returned with its sync time, and cleared"""
+    db = ShopDatabase(str(tmp_path / 'shop.sqlite3'))
+    inventory = [{
+        'product_id': 7, 'product_title': 'Mug', 'sku': 'MUG-1', 'quantity': 4, 'variant_id': 70,
+        'inventory_item_id': 700, 'locations': [{'location_id': 1, 'available': 4}]
+    }]
+    
+    assert db.load_resource('inventory') is None
+    db.replace_resource('inventory', inventory, 1700000000.0)
+    assert db.load_resource('inventory') == (inventory, 1700000000.0)
+    
+    db.clear_resource('inventory')
+    assert db.load_resource('inventory') is None
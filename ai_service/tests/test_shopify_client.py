@@ -0,0 +1,349 @@
+import asyncio
+import json
+import pytest
+import httpx
+from datetime import datetime, timedelta
+from app.shopify.client import ShopifyClient
+from app.shopify.http_pool import ShopifyHTTPPool
+
+STORE = 'test-store.myshopify.com'
+YESTERDAY = (datetime.utcnow() - timedelta(days=1)).isoformat()
+TOP_PRODUCTS = {'category': 'sales', 'metrics': ['top_products'], 'time_period': {'value': 7}}
+
+def make_order(order_id):
+    return {
+        'id': order_id,
+        'created_at': YESTERDAY,
+        'customer': {'id': 1, 'email': 'a@email.com', 'first_name': 'A', 'last_name': 'B'},
+        'line_items': [{'product_id': 7, 'title': 'Mug', 'quantity': 2, 'price': '9.50'}]
+    }
+
+def orders_api(request):
+    """Two pages of orders linked with a page_info cursor"""
+    if request.url.params.get('page_info') == 'next-page':
+        return httpx.Response(200, json={'orders': [make_order(3)]})
+    
+    link = f'<https://{STORE}/admin/api/2024-01/orders.json?limit=250&page_info=next-page>; rel="next"'
+    return httpx.Response(200, json={'orders': [make_order(1), make_order(2)]}, headers={'Link': link})
+
+@pytest.fixture
+def real_client(monkeypatch):
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(orders_api))
+    return ShopifyClient(STORE, 'token', http_pool=pool)
+
+@pytest.mark.asyncio
+async def test_fetch_orders_follows_pagination(real_client):
+    """Test every page of orders is fetched"""
+    rows = await real_client.execute_query('', TOP_PRODUCTS)
+    
+    assert rows == [{'product_id': 7, 'product_title': 'Mug', 'total_sold': 6, 'revenue': 28.5}]
+
+@pytest.mark.asyncio
+async def test_fetch_orders_respects_page_budget(real_client):
+    """Test paging stops once the page budget is used"""
+    real_client.max_pages = 1
+    
+    rows = await real_client.execute_query('', TOP_PRODUCTS)
+    
+    assert rows[0]['total_sold'] == 4
+
+def line_item(item_id, order_id, product_id, title, quantity, price):
+    return {
+        'id': f'gid://shopify/LineItem/{item_id}',
+        'title': title,
+        'quantity': quantity,
+        'product': {'id': f'gid://shopify/Product/{product_id}'},
+        'originalUnitPriceSet': {'shopMoney': {'amount': price}},
+        '__parentId': f'gid://shopify/Order/{order_id}'
+    }
+
+BULK_RESULT = '\n'.join(json.dumps(node) for node in [
+    {'id': 'gid://shopify/Order/10', 'createdAt': YESTERDAY, 'customer': {
+        'id': 'gid://shopify/Customer/1', 'email': 'a@email.com', 'firstName': 'A', 'lastName': 'B'
+    }},
+    line_item(1, 10, 7, 'Mug', 2, '9.50'),
+    line_item(2, 10, 8, 'Cup', 1, '4.00'),
+    {'id': 'gid://shopify/Order/11', 'createdAt': YESTERDAY, 'customer': None},
+    line_item(3, 11, 7, 'Mug', 1, '9.50')
+])
+
+def bulk_api(request):
+    """GraphQL endpoint running a bulk operation that completes immediately"""
+    if request.url.host == 'storage.example.com':
+        return httpx.Response(200, text=BULK_RESULT)
+    
+    body = request.read().decode()
+    if 'bulkOperationRunQuery' in body:
+        return httpx.Response(200, json={'data': {'bulkOperationRunQuery': {
+            'bulkOperation': {'id': 'gid://shopify/BulkOperation/1', 'status': 'CREATED'},
+            'userErrors': []
+        }}})
+    return httpx.Response(200, json={'data': {'currentBulkOperation': {
+        'id': 'gid://shopify/BulkOperation/1',
+        'status': 'COMPLETED',
+        'objectCount': '5',
+        'url': 'https://storage.example.com/result.jsonl'
+    }}})
+
+@pytest.mark.asyncio
+async def test_long_periods_use_bulk_operation(monkeypatch):
+    """Test long order histories are read from a bulk operation"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(bulk_api))
+    client = ShopifyClient(STORE, 'token', http_pool=pool)
+    
+    rows = await client.execute_query(
+        "SELECT * FROM orders",
+        {'category': 'sales', 'metrics': ['top_products'], 'time_period': {'value': 90}}
+    )
+    
+    assert rows == [
+        {'product_id': 7, 'product_title': 'Mug', 'total_sold': 3, 'revenue': 19.0},
+        {'product_id': 8, 'product_title': 'Cup', 'total_sold': 1, 'revenue': 4.0}
+    ]
+
+@pytest.mark.asyncio
+async def test_batch_fetches_shared_orders_once(monkeypatch):
+    """Test a batch of order questions shares one fetch of the orders"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    calls = []
+    
+    def counting_api(request):
+        calls.append(request.url.path)
+        return orders_api(request)
+    
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(counting_api))
+    client = ShopifyClient(STORE, 'token', http_pool=pool)
+    
+    results = await client.execute_batch([
+        ('', TOP_PRODUCTS, ['orders', 'products']),
+        ('', {'category': 'sales', 'metrics': [], 'time_period': {'value': 3}}, ['orders'])
+    ])
+    
+    assert results[0] == [{'product_id': 7, 'product_title': 'Mug', 'total_sold': 6, 'revenue': 28.5}]
+    assert results[1][0]['order_count'] == 3
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_inflight_fetch(monkeypatch):
+    """Test concurrent requests for a shop join the wider in-flight orders fetch"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    calls = []
+    
+    def counting_api(request):
+        calls.append(request.url.path)
+        return orders_api(request)
+    
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(counting_api))
+    narrower = {**TOP_PRODUCTS, 'time_period': {'value': 3}}
+    
+    results = await asyncio.gather(
+        ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', TOP_PRODUCTS),
+        ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', narrower)
+    )
+    
+    assert results[0] == results[1] == [{'product_id': 7, 'product_title': 'Mug', 'total_sold': 6, 'revenue': 28.5}]
+    assert len(calls) == 2
+    assert pool.stats()['coalesced_fetches'][STORE]['coalesced'] == 1
+
+@pytest.mark.asyncio
+async def test_repeat_queries_only_fetch_changed_orders(monkeypatch):
+    """Test later queries fetch orders updated since the last sync and merge them"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    calls = []
+    
+    def syncing_api(request):
+        calls.append(dict(request.url.params))
+        if 'updated_at_min' in request.url.params:
+            updated = make_order(2)
+            updated['line_items'][0]['quantity'] = 5
+            return httpx.Response(200, json={'orders': [updated]})
+        return orders_api(request)
+    
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(syncing_api))
+    await ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', TOP_PRODUCTS)
+    assert calls[0]['created_at_min'].endswith('+00:00')
+    calls.clear()
+    
+    narrower = {**TOP_PRODUCTS, 'time_period': {'value': 3}}
+    rows = await ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', narrower)
+    
+    assert rows[0]['total_sold'] == 9
+    assert len(calls) == 1
+    assert 'created_at_min' not in calls[0]
+    assert calls[0]['updated_at_min'].endswith('+00:00')
+    assert pool.stats()['order_sync'][STORE]['incremental_syncs'] == 1
+
+@pytest.mark.asyncio
+async def test_order_webhook_updates_local_orders(monkeypatch):
+    """Test an orders/updated delta is served locally without calling Shopify"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    monkeypatch.setenv('SHOPIFY_LOCAL_MAX_AGE', '300')
+    calls = []
+    
+    def counting_api(request):
+        calls.append(request.url.path)
+        return orders_api(request)
+    
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(counting_api))
+    await ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', TOP_PRODUCTS)
+    calls.clear()
+    
+    updated = make_order(3)
+    updated['line_items'][0]['quantity'] = 10
+    assert await ShopifyClient(STORE, '', http_pool=pool).apply_webhook('orders/updated', updated)
+    
+    rows = await ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', TOP_PRODUCTS)
+    
+    assert rows[0]['total_sold'] == 14
+    assert calls == []
+
+@pytest.mark.asyncio
+async def test_restart_resumes_from_shop_database(monkeypatch, tmp_path):
+    """Test a new process reads orders from disk and only fetches changes"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    calls = []
+    
+    def counting_api(request):
+        calls.append(dict(request.url.params))
+        if 'updated_at_min' in request.url.params:
+            return httpx.Response(200, json={'orders': []})
+        return orders_api(request)
+    
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(counting_api), db_dir=str(tmp_path))
+    await ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', TOP_PRODUCTS)
+    await pool.aclose()
+    calls.clear()
+    
+    restarted = ShopifyHTTPPool(transport=httpx.MockTransport(counting_api), db_dir=str(tmp_path))
+    rows = await ShopifyClient(STORE, 'token', http_pool=restarted).execute_query('', TOP_PRODUCTS)
+    
+    assert rows == [{'product_id': 7, 'product_title': 'Mug', 'total_sold': 6, 'revenue': 28.5}]
+    assert len(calls) == 1
+    assert 'updated_at_min' in calls[0]
+    assert restarted.get_order_sync(STORE).orders.mapped
+
+@pytest.mark.asyncio
+async def test_order_webhook_is_written_to_shop_database(monkeypatch, tmp_path):
+    """Test a webhook delta reaches the on-disk store"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(orders_api), db_dir=str(tmp_path))
+    await ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', TOP_PRODUCTS)
+    
+    updated = make_order(3)
+    updated['line_items'][0]['quantity'] = 10
+    await ShopifyClient(STORE, '', http_pool=pool).apply_webhook('orders/updated', updated)
+    
+    stored = pool.get_shop_database(STORE).load_orders()
+    assert sorted(row['quantity'] for row in stored) == [2, 2, 10]
+
+def inventory_api(request):
+    """Two products, three variants, stock at two locations"""
+    if request.url.path.endswith('/products.json'):
+        return httpx.Response(200, json={'products': [
+            {'id': 7, 'title': 'Mug', 'variants': [
+                {'id': 70, 'inventory_item_id': 700, 'sku': 'MUG-S', 'inventory_quantity': 0},
+                {'id': 71, 'inventory_item_id': 701, 'sku': 'MUG-L', 'inventory_quantity': 0}
+            ]},
+            {'id': 8, 'title': 'Cap', 'variants': [
+                {'id': 80, 'inventory_item_id': 800, 'sku': 'CAP', 'inventory_quantity': 0}
+            ]}
+        ]})
+    
+    item_ids = [int(i) for i in request.url.params['inventory_item_ids'].split(',')]
+    return httpx.Response(200, json={'inventory_levels': [
+        {'inventory_item_id': item_id, 'location_id': location_id, 'available': item_id // 100 + location_id}
+        for item_id in item_ids for location_id in (1, 2)
+    ]})
+
+INVENTORY = {'category': 'inventory', 'metrics': [], 'time_period': {}}
+
+@pytest.mark.asyncio
+async def test_inventory_levels_fetched_in_batches(monkeypatch):
+    """Test inventory totals come from per-location levels fetched in batches"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    monkeypatch.setattr('app.shopify.client.INVENTORY_LEVELS_BATCH', 2)
+    calls = []
+    
+    def counting_api(request):
+        calls.append(request.url.path)
+        return inventory_api(request)
+    
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(counting_api))
+    rows = await ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', INVENTORY)
+    
+    assert [(row['sku'], row['quantity']) for row in rows] == [('MUG-S', 17), ('MUG-L', 17), ('CAP', 19)]
+    assert rows[2]['locations'] == [{'location_id': 1, 'available': 9}, {'location_id': 2, 'available': 10}]
+    assert sum(path.endswith('/inventory_levels.json') for path in calls) == 2
+
+@pytest.mark.asyncio
+async def test_inventory_level_webhook_updates_total(monkeypatch):
+    """Test an inventory_levels/update delta changes one location and the total"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    monkeypatch.setenv('SHOPIFY_LOCAL_MAX_AGE', '300')
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(inventory_api))
+    await ShopifyClient(STORE, 'token', http_pool=pool).execute_query('', INVENTORY)
+    
+    client = ShopifyClient(STORE, '', http_pool=pool)
+    await client.apply_webhook('inventory_levels/update', {'inventory_item_id': 800, 'location_id': 2, 'available': 1})
+    rows = await client.execute_query('', INVENTORY)
+    
+    assert rows[2]['quantity'] == 10
+    assert rows[2]['locations'] == [{'location_id': 1, 'available': 9}, {'location_id': 2, 'available': 1}]
+
+@pytest.mark.asyncio
+async def test_planned_sources_are_fetched_concurrently(monkeypatch):
+    """Test orders and inventory are fetched side by side and joined locally"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    active = []
+    overlap = []
+    
+    async def slow_api(request):
+        active.append(request)
+        overlap.append(len(active))
+        await asyncio.sleep(0.01)
+        active.remove(request)
+        if request.url.path.endswith('/orders.json'):
+            return orders_api(request)
+        return inventory_api(request)
+    
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(slow_api))
+    rows = await ShopifyClient(STORE, 'token', http_pool=pool).execute_query(
+        '',
+        {'category': 'inventory', 'metrics': ['reorder_quantity'], 'time_period': {'value': 7}},
+        ['inventory_levels', 'products', 'orders']
+    )
+    
+    assert [(row['product_id'], row['total_sold'], row['current_stock']) for row in rows] == [(7, 6, 34)]
+    assert max(overlap) > 1
+
+@pytest.mark.asyncio
+async def test_customer_questions_only_fetch_sources_they_read(monkeypatch):
+    """Test repeat customers come from the orders and other customer questions skip them"""
+    monkeypatch.setenv('SHOPIFY_MODE', 'real')
+    calls = []
+    
+    def counting_api(request):
+        calls.append(request.url.path)
+        if request.url.path.endswith('/customers.json'):
+            return httpx.Response(200, json={'customers': [
+                {'id': 1, 'email': 'a@email.com', 'first_name': 'A', 'last_name': 'B',
+                 'total_spent': '28.50', 'orders_count': 3}
+            ]})
+        return orders_api(request)
+    
+    pool = ShopifyHTTPPool(transport=httpx.MockTransport(counting_api))
+    client = ShopifyClient(STORE, 'token', http_pool=pool)
+    plan = ['customers', 'orders']
+    
+    repeat = await client.execute_query(
+        '', {'category': 'customers', 'metrics': ['repeat_customers'], 'time_period': {'value': 7}}, plan
+    )
+    assert [(c['customer_id'], c['order_count']) for c in repeat] == [(1, 3)]
+    assert not any(path.endswith('/customers.json') for path in calls)
+    
+    calls.clear()
+    customers = await client.execute_query('', {'category': 'customers', 'metrics': [], 'time_period': {}}, plan)
+    assert customers[0]['customer_id'] == 1
+    assert all(path.endswith('/customers.json') for path in calls)
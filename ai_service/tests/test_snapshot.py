@@ -0,0 +1,40 @@
+from app.shopify.order_store import OrderStore
+from app.shopify.snapshot import open_snapshot, write_snapshot
+
+ROWS = [
+    {'order_id': 1, 'product_id': 7, 'product_title': 'Mug', 'customer_id': 1, 'customer_email': 'a@email.com',
+     'customer_name': 'A B', 'quantity': 2, 'total_price': 9.5, 'created_at': '2024-01-01T10:00:00'},
+    {'order_id': 2, 'product_id': 8, 'product_title': 'Cap', 'customer_id': None, 'customer_email': None,
+     'customer_name': '', 'quantity': 1, 'total_price': 15.0, 'created_at': '2024-01-02T10:00:00'}
+]
+
+def test_snapshot_maps_columns_without_copying(tmp_path):
+    """Test a mapped snapshot reads back the same rows from memoryview columns"""
+    path = str(tmp_path / 'orders.snapshot')
+    write_snapshot(path, OrderStore.from_rows(ROWS), 1700000000.0, '2024-01-03T00:00:00')
+    
+    orders, header = open_snapshot(path)
+    
+    assert isinstance(orders.created_at, memoryview)
+    assert orders.to_rows() == OrderStore.from_rows(ROWS).to_rows()
+    assert header['updated_at_min'] == '2024-01-03T00:00:00'
+
+def test_mapped_store_copies_on_write(tmp_path):
+    """Test changing a mapped store leaves the snapshot file untouched"""
+    path = str(tmp_path / 'orders.snapshot')
+    write_snapshot(path, OrderStore.from_rows(ROWS), 1700000000.0, '2024-01-03T00:00:00')
+    orders, _ = open_snapshot(path)
+    
+    orders.upsert([{**ROWS[0], 'quantity': 5}], [1])
+    
+    assert not orders.mapped
+    assert sorted(orders.quantities) == [1, 5]
+    assert open_snapshot(path)[0].quantities.tolist() == [2, 1]
+
+def test_open_snapshot_rejects_other_files(tmp_path):
+    """Test missing or foreign files are not mapped"""
+    other = tmp_path / 'other'
+    other.write_bytes(b'not a snapshot')
+    
+    assert open_snapshot(str(tmp_path / 'missing')) is None
+    assert open_snapshot(str(other)) is None
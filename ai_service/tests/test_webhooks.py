@@ -0,0 +1,16 @@
+import base64
+import hashlib
+import hmac
+from app.shopify.webhooks import verify_webhook
+
+def sign(body, secret='shpss_test'):
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+
+def test_verify_webhook_checks_signature():
+    """Test only bodies signed with the app secret are accepted"""
+    body = b'{"id": 1}'
+    
+    assert verify_webhook(body, sign(body), 'shpss_test')
+    assert not verify_webhook(body + b' ', sign(body), 'shpss_test')
+    assert not verify_webhook(body, sign(body, 'other'), 'shpss_test')
+    assert not verify_webhook(body, None, 'shpss_test')
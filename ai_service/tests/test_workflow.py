@@ -61,3 +61,39 @@ async def test_workflow_with_product_entity():
     assert result.metadata is not None
     # Check that entity was extracted
     assert len(result.metadata.entities) > 0 or 'Wireless' in result.shopifyql
+
+@pytest.mark.asyncio
+async def test_workflow_stream_events():
+    """Test streamed workflow emits each step before the answer tokens"""
+    workflow = AgentWorkflow(
+        store_id='test-store.myshopify.com',
+        access_token='mock_token'
+    )
+    
+    events = [event async for event in workflow.stream("What were my top 5 selling products last week?")]
+    names = [name for name, _ in events]
+    
+    assert names[:3] == ['intent', 'shopifyql', 'data_quality']
+    assert names[-1] == 'done'
+    assert set(names[3:-1]) == {'token'}
+    assert ''.join(data['text'] for name, data in events if name == 'token') == events[-1][1]['answer']
+
+@pytest.mark.asyncio
+async def test_workflow_batch():
+    """Test a batch answers every question and reports failures per question"""
+    workflow = AgentWorkflow(
+        store_id='test-store.myshopify.com',
+        access_token='mock_token'
+    )
+    
+    results = await workflow.execute_batch([
+        "What were my top 5 selling products last week?",
+        "Which customers placed repeat orders in the last 90 days?"
+    ])
+    
+    assert [r['question'] for r in results] == [
+        "What were my top 5 selling products last week?",
+        "Which customers placed repeat orders in the last 90 days?"
+    ]
+    assert all(isinstance(r['response'], QueryResponse) for r in results)
+    assert results[1]['response'].intent == 'customers'